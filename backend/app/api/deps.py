@@ -1,5 +1,5 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
@@ -10,6 +10,7 @@ from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import TokenPayload
+from app.services import resource_versions
 
 # =============================================================================
 # API 依赖项 (API Dependencies)
@@ -22,6 +23,18 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login/access-token"
 )
 
+def decode_token(token: Optional[str]) -> Optional[TokenPayload]:
+    """解析并校验 JWT，无效或过期时返回 None。"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        return TokenPayload(**payload)
+    except (jwt.JWTError, ValidationError):
+        return None
+
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> User:
@@ -30,12 +43,8 @@ def get_current_user(
     如果 Token 无效或过期，抛出 403 错误。
     如果用户不存在，抛出 404 错误。
     """
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
+    token_data = decode_token(token)
+    if token_data is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
@@ -76,14 +85,30 @@ def get_optional_current_user(
     依赖项：可选的获取当前用户。
     如果没有 Token 或 Token 无效，返回 None，不抛出错误。
     """
-    if not token:
-        return None
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
+    token_data = decode_token(token)
+    if token_data is None:
         return None
     user = db.query(User).filter(User.id == token_data.sub).first()
     return user
+
+def get_query_token_user(db: Session, token: Optional[str]) -> Optional[User]:
+    """
+    长连接鉴权 (WebSocket / SSE)：浏览器无法为 WebSocket 与 EventSource 设置 Authorization 头，
+    Token 通过查询参数传入，校验规则与 get_current_active_user 一致。
+    """
+    token_data = decode_token(token)
+    if token_data is None:
+        return None
+    user = db.query(User).filter(User.id == token_data.sub).first()
+    return user if user and user.is_active else None
+
+def not_modified(request: Request, response: Response, etag: str, private: bool = True) -> Optional[Response]:
+    """
+    条件请求：为响应设置 ETag；请求的 If-None-Match 与之相同时返回 304 响应，
+    接口应直接返回它而不再执行列表查询。ETag 由 resource_versions.etag 计算。
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if resource_versions.matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
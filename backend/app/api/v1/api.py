@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, core, content, association, match, admin, files, aid, conversations, notifications
+from app.api.v1.endpoints import auth, core, content, association, match, admin, files, aid, conversations, notifications, me
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -12,3 +12,4 @@ api_router.include_router(files.router, prefix="/files", tags=["files"])
 api_router.include_router(aid.router, prefix="/aid", tags=["aid"])
 api_router.include_router(conversations.router, prefix="/conversations", tags=["conversations"])
 api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
+api_router.include_router(me.router, prefix="/me", tags=["me"])
@@ -11,11 +11,15 @@ from app.models.user import User, AdminRole, AdminOnboardingRequest, Verificatio
 from app.models.core import Organization, Announcement
 from app.models.content import CampusPost, CampusTopic, CommunityPost
 from app.models.teacher_pool import TeacherPoolEntry
-from app.models.match import MatchRequest, PointTxn
+from app.models.match import MatchRequest
 from app.models.files import FileAsset
 from app.models.conversation import Conversation, ConversationParticipant, Message
-from app.models.notification import Notification
 from app.core import security
+from app.services import feed_cache
+from app.services import notifications as notifications_service
+from app.services import points as points_service
+from app.services import resource_versions, teacher_index
+from app.services import verification as verification_service
 from app.schemas.admin import (
     AdminRoleCreate,
     AdminUserResponse,
@@ -40,18 +44,9 @@ def _parse_profile(profile_text: str | None) -> dict:
 
 def _write_profile(user: User, profile: dict) -> None:
     user.profile = json.dumps(profile, ensure_ascii=False)
+    verification_service.sync_columns(user, profile)
 
 
-def _notify(db: Session, user_id: str, type: str, payload: dict) -> None:
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-
 # =============================================================================
 # 管理员管理 API (Admin Management API)
 # 功能：超级管理员创建/管理高校和协会管理员。
@@ -214,10 +209,12 @@ def delete_user(
         db.query(VerificationRequest).filter(VerificationRequest.applicant_id == user_id).delete()
         db.query(AdminOnboardingRequest).filter(AdminOnboardingRequest.user_id == user_id).delete()
         db.query(TeacherPoolEntry).filter(TeacherPoolEntry.user_id == user_id).delete()
+        teacher_index.drop_entries(db, user_id=user_id)
         db.query(MatchRequest).filter(MatchRequest.student_id == user_id).delete()
-        db.query(PointTxn).filter(PointTxn.user_id == user_id).delete()
+        points_service.delete_user(db, user_id)
         db.query(FileAsset).filter(FileAsset.uploader_id == user_id).delete()
         db.query(CommunityPost).filter(CommunityPost.author_id == user_id).delete()
+        feed_cache.mark_dirty(db, feed_cache.COMMUNITY_POSTS)
 
         conv_rows = (
             db.query(ConversationParticipant.conversation_id)
@@ -226,6 +223,13 @@ def delete_user(
         )
         conv_ids = [c[0] for c in conv_rows]
         if conv_ids:
+            member_rows = (
+                db.query(ConversationParticipant.user_id)
+                .filter(ConversationParticipant.conversation_id.in_(conv_ids))
+                .distinct()
+                .all()
+            )
+            resource_versions.touch(db, *[resource_versions.conversations_key(r[0]) for r in member_rows])
             db.query(Message).filter(Message.conversation_id.in_(conv_ids)).delete(synchronize_session=False)
             db.query(ConversationParticipant).filter(ConversationParticipant.conversation_id.in_(conv_ids)).delete(synchronize_session=False)
             db.query(Conversation).filter(Conversation.id.in_(conv_ids)).delete(synchronize_session=False)
@@ -250,7 +254,7 @@ def delete_user(
                 u.role = "general_student"
                 u.school_id = None
                 db.add(u)
-                _notify(
+                notifications_service.notify(
                     db,
                     u.id,
                     "verification_revoked",
@@ -258,9 +262,11 @@ def delete_user(
                 )
 
             db.query(TeacherPoolEntry).filter(TeacherPoolEntry.school_id == sid).delete()
+            teacher_index.drop_entries(db, school_id=sid)
             db.query(CampusTopic).filter(CampusTopic.school_id == sid).delete()
             db.query(CampusPost).filter(CampusPost.school_id == sid).delete()
             db.query(Announcement).filter(Announcement.scope == "campus").filter(Announcement.school_id == sid).delete()
+            resource_versions.touch(db, resource_versions.ANNOUNCEMENTS)
             db.query(Organization).filter(Organization.type == "university").filter(Organization.school_id == sid).delete()
 
         db.delete(user)
@@ -270,6 +276,7 @@ def delete_user(
     user.is_active = False
     user.admin_roles = []
     db.add(user)
+    teacher_index.reindex_user(db, user)
     db.commit()
     return {"status": "disabled"}
 
@@ -324,7 +331,7 @@ def purge_orphan_university_boards(
             u.role = "general_student"
             u.school_id = None
             db.add(u)
-            _notify(
+            notifications_service.notify(
                 db,
                 u.id,
                 "verification_revoked",
@@ -332,9 +339,11 @@ def purge_orphan_university_boards(
             )
 
         db.query(TeacherPoolEntry).filter(TeacherPoolEntry.school_id == sid).delete()
+        teacher_index.drop_entries(db, school_id=sid)
         db.query(CampusTopic).filter(CampusTopic.school_id == sid).delete()
         db.query(CampusPost).filter(CampusPost.school_id == sid).delete()
         db.query(Announcement).filter(Announcement.scope == "campus").filter(Announcement.school_id == sid).delete()
+        resource_versions.touch(db, resource_versions.ANNOUNCEMENTS)
         db.query(Organization).filter(Organization.type == "university").filter(Organization.school_id == sid).delete()
         deleted += 1
 
@@ -383,6 +392,7 @@ def create_org_admin(
             is_active=True,
         )
         db.add(user)
+        points_service.grant_signup_bonus(db, user_id)
         db.commit()
         db.refresh(user)
     
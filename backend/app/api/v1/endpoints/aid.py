@@ -2,12 +2,12 @@ from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 import json
-import uuid
 
 from app.api import deps
 from app.db.session import get_db
 from app.models.user import User
-from app.models.notification import Notification
+from app.services import notifications as notifications_service
+from app.services import verification as verification_service
 from app.schemas.user import User as UserSchema
 
 
@@ -34,17 +34,7 @@ def _parse_profile(profile_text: str | None) -> dict:
 
 def _write_profile(user: User, profile: dict) -> None:
     user.profile = json.dumps(profile, ensure_ascii=False)
-
-def _notify(db: Session, user_id: str, type: str, payload: dict) -> None:
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-
+    verification_service.sync_columns(user, profile)
 
 @router.get("/students", response_model=List[UserSchema])
 def list_aid_students(
@@ -99,6 +89,6 @@ def revoke_aid_student(
     user.role = "general_student"
     user.school_id = None
     db.add(user)
-    _notify(db, user.id, "verification_revoked", {"verification_type": "special_aid", "reason": "revoked"})
+    notifications_service.notify(db, user.id, "verification_revoked", {"verification_type": "special_aid", "reason": "revoked"})
     db.commit()
     return {"status": "revoked"}
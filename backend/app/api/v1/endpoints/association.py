@@ -13,21 +13,12 @@ from app.models.user import User, VerificationRequest
 from app.models.core import Organization
 from app.schemas.user import User as UserSchema
 from app.models.teacher_pool import TeacherPoolEntry
-from app.models.notification import Notification
+from app.services import teacher_index
+from app.services import verification as verification_service
 
 router = APIRouter()
 
 
-def _notify(db: Session, user_id: str, type: str, payload: dict) -> None:
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-
 # =============================================================================
 # 协会与认证 API (Association & Verification API)
 # 功能：管理身份认证、志愿者协会任务、规则和工时。
@@ -53,9 +44,7 @@ def create_verification_request(
             raise HTTPException(status_code=400, detail="target_school_id required")
         if not current_user.school_id:
             raise HTTPException(status_code=403, detail="University student verification required")
-        profile = load_profile(current_user)
-        verification = profile.get("verification") if isinstance(profile.get("verification"), dict) else {}
-        if verification.get("student") != "verified" and current_user.role not in {"university_student", "volunteer_teacher"}:
+        if current_user.student_verification != "verified" and current_user.role not in {"university_student", "volunteer_teacher"}:
             raise HTTPException(status_code=403, detail="University student verification required")
         if request_in.target_school_id != current_user.school_id:
             raise HTTPException(status_code=403, detail="Cross-school teacher application not allowed")
@@ -140,6 +129,7 @@ def load_profile(user: User) -> dict:
 
 def write_profile(user: User, profile: dict) -> None:
     user.profile = json.dumps(profile, ensure_ascii=False)
+    verification_service.sync_columns(user, profile)
 
 @router.get("/verifications/requests", response_model=List[schemas.VerificationRequest])
 def read_verification_requests(
@@ -279,6 +269,7 @@ def review_verification_request(
         profile["verification"] = verification
         write_profile(applicant, profile)
         db.add(applicant)
+        teacher_index.reindex_user(db, applicant)
     
     db.add(request)
     db.commit()
@@ -333,39 +324,31 @@ def list_teacher_pool(
     if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    entries = (
-        db.query(TeacherPoolEntry)
+    # 讲师资格在 SQL 中判断：不再属于本校或已失去讲师资格的条目视为孤儿条目
+    eligible_user_ids = (
+        db.query(User.id)
+        .filter(User.school_id == target)
+        .filter(verification_service.verified_teacher_clause())
+    )
+    orphan_entry_ids = [
+        r[0]
+        for r in db.query(TeacherPoolEntry.id)
         .filter(TeacherPoolEntry.school_id == target)
-        .order_by(TeacherPoolEntry.updated_at.desc())
+        .filter(~TeacherPoolEntry.user_id.in_(eligible_user_ids))
         .all()
-    )
-    users = (
-        db.query(User)
-        .filter(User.id.in_([e.user_id for e in entries]))
-        .filter(User.is_active == True)
+    ]
+    rows = (
+        db.query(TeacherPoolEntry, User)
+        .join(User, User.id == TeacherPoolEntry.user_id)
+        .filter(TeacherPoolEntry.school_id == target)
+        .filter(User.school_id == target)
+        .filter(verification_service.verified_teacher_clause())
+        .order_by(TeacherPoolEntry.updated_at.desc())
         .all()
-        if entries
-        else []
     )
-    user_map = {u.id: u for u in users}
 
     result: list[dict] = []
-    orphan_entry_ids: list[str] = []
-    for e in entries:
-        u = user_map.get(e.user_id)
-        if not u or u.school_id != target:
-            orphan_entry_ids.append(e.id)
-            continue
-        try:
-            p = json.loads(u.profile or "{}")
-            v = p.get("verification") if isinstance(p, dict) else {}
-            teacher_ok = isinstance(v, dict) and v.get("teacher") == "verified"
-        except Exception:
-            teacher_ok = False
-        if u.role != "volunteer_teacher" or not teacher_ok:
-            orphan_entry_ids.append(e.id)
-            continue
-
+    for e, u in rows:
         result.append({
             "id": e.id,
             "user_id": e.user_id,
@@ -386,6 +369,7 @@ def list_teacher_pool(
         })
     if orphan_entry_ids:
         db.query(TeacherPoolEntry).filter(TeacherPoolEntry.id.in_(orphan_entry_ids)).delete(synchronize_session=False)
+        teacher_index.drop_entries(db, entry_ids=orphan_entry_ids)
         db.commit()
     return result
 
@@ -413,6 +397,7 @@ def update_teacher_pool(
         raise HTTPException(status_code=404, detail="Teacher not found")
     entry.in_pool = bool(payload.in_pool)
     db.add(entry)
+    teacher_index.reindex_entry(db, entry)
     db.commit()
     db.refresh(entry)
     return {
@@ -13,6 +13,7 @@ from app.db.session import get_db
 from app.models.user import User, AdminOnboardingRequest
 from app.models.core import Organization
 from app.schemas.user import Token, UserCreate, User as UserSchema
+from app.services import points as points_service
 
 router = APIRouter()
 
@@ -90,6 +91,8 @@ def signup(
         is_superuser=user_in.is_superuser,
     )
     db.add(user_obj)
+    # 新用户初始积分与用户在同一事务内入账
+    points_service.grant_signup_bonus(db, user_id)
     
     # Create onboarding request if needed
     if user_in.account_type == "org_admin_applicant":
@@ -199,10 +202,8 @@ def compute_capabilities(user: User) -> dict:
     if user.role == "university_student":
         caps["can_access_campus"] = True
     elif user.role == "volunteer_teacher":
-        profile = parse_profile(user.profile)
-        verification = profile.get("verification") if isinstance(profile, dict) else None
-        teacher_ok = isinstance(verification, dict) and verification.get("teacher") == "verified"
-        student_ok = isinstance(verification, dict) and verification.get("student") == "verified"
+        teacher_ok = user.teacher_verification == "verified"
+        student_ok = user.student_verification == "verified"
         caps["can_access_campus"] = bool(student_ok)
         caps["can_access_association"] = bool(teacher_ok and student_ok)
     
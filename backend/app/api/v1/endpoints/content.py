@@ -1,16 +1,21 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Body
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import uuid
-import json
 from pydantic import BaseModel
 
 from app.api import deps
 from app.db.session import get_db
 from app.models.content import CommunityPost, CommunityComment, CampusTopic, CampusPost, CampusPostComment, QaQuestion, QaAnswer
-from app.models.notification import Notification
 from app.schemas import content as schemas
 from app.models.user import User
+from app.services import conversations as conversations_service
+from app.services import escrow as escrow_service
+from app.services import feed_cache
+from app.services import notifications as notifications_service
+from app.services import points as points_service
 
 router = APIRouter()
 
@@ -20,17 +25,6 @@ class ToggleHiddenRequest(BaseModel):
     hidden: bool
 
 
-def _notify(db: Session, user_id: str, type: str, payload: dict) -> None:
-    """Helper to create a notification record."""
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-
 # =============================================================================
 # 内容 API (Content API)
 # 功能：管理公共社区、校内论坛和问答模块。
@@ -44,14 +38,18 @@ def read_community_posts(
     skip: int = 0,
     limit: int = 10,
     show_hidden: bool = False,
+    before: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_optional_current_user)
 ):
     """
-    获取公共社区帖子列表。
+    获取公共社区帖子列表 (按 created_at, id 倒序)。
     - 全站可见
-    - 默认只返回未隐藏(hidden=False或NULL)的帖子
+    - 默认只返回未隐藏(hidden=False)的帖子
     - HQ管理员可以通过 show_hidden=True 查看所有帖子
+    - 分页使用帖子上的 cursor 字段：before=<最后一条的 cursor> 加载下一页；
+      skip 为旧的偏移分页参数，传 before 时忽略
+    - 不含隐藏内容的列表与用户无关，经 feed_cache 缓存
     """
     query = db.query(CommunityPost)
     
@@ -61,11 +59,26 @@ def read_community_posts(
         role_codes = {r.role_code for r in (current_user.admin_roles or []) if r and r.role_code}
         is_hq_admin = current_user.is_superuser or "association_hq" in role_codes
     
+    limit = max(1, min(limit, 1000))
+    skip = 0 if before else max(0, skip)
+    cache_key = None
     # 普通用户或未请求显示隐藏内容时，过滤已隐藏的帖子
     if not (is_hq_admin and show_hidden):
-        query = query.filter((CommunityPost.hidden == False) | (CommunityPost.hidden == None))
-    
-    posts = query.order_by(CommunityPost.created_at.desc()).offset(skip).limit(limit).all()
+        cache_key = feed_cache.key(feed_cache.COMMUNITY_POSTS, skip, limit, before)
+        cached = feed_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        query = query.filter(CommunityPost.hidden == False)
+
+    if before:
+        try:
+            query = query.filter(conversations_service.keyset_clause(CommunityPost.created_at, CommunityPost.id, before))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    query = query.order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+    if skip:
+        query = query.offset(skip)
+    posts = query.limit(limit).all()
     user_ids = list({p.author_id for p in posts})
     users = db.query(User).filter(User.id.in_(user_ids)).all() if user_ids else []
     user_map = {u.id: u for u in users}
@@ -84,8 +97,11 @@ def read_community_posts(
                 "comments_count": p.comments_count,
                 "shares_count": p.shares_count,
                 "hidden": p.hidden,
+                "cursor": conversations_service.encode_cursor(p),
             }
         )
+    if cache_key is not None:
+        feed_cache.put(cache_key, result)
     return result
 
 @router.post("/community/posts", response_model=schemas.CommunityPost)
@@ -103,6 +119,7 @@ def create_community_post(
         **post_in.dict()
     )
     db.add(post)
+    feed_cache.mark_dirty(db, feed_cache.COMMUNITY_POSTS)
     db.commit()
     db.refresh(post)
     return post
@@ -190,10 +207,11 @@ def create_community_post_comment(
     post.comments_count = int(post.comments_count or 0) + 1
     db.add(post)
     db.add(comment)
+    feed_cache.mark_dirty(db, feed_cache.COMMUNITY_POSTS)
     
     # 通知帖子作者（如果评论者不是作者本人）
     if post.author_id and post.author_id != current_user.id:
-        _notify(
+        notifications_service.notify(
             db,
             post.author_id,
             "post_commented",
@@ -205,6 +223,8 @@ def create_community_post_comment(
                 "comment_preview": (comment.content[:50] + "...") if len(comment.content) > 50 else comment.content,
                 "scope": "community",
             },
+            group_key=f"post:{post.id}",
+            actor={"id": current_user.id, "name": current_user.full_name or current_user.username},
         )
     
     db.commit()
@@ -516,7 +536,7 @@ def create_campus_post_comment(
     
     # 通知帖子作者（如果评论者不是作者本人）
     if post.author_id and post.author_id != current_user.id:
-        _notify(
+        notifications_service.notify(
             db,
             post.author_id,
             "post_commented",
@@ -529,6 +549,8 @@ def create_campus_post_comment(
                 "scope": "campus",
                 "school_id": school_id,
             },
+            group_key=f"post:{post.id}",
+            actor={"id": current_user.id, "name": current_user.full_name or current_user.username},
         )
     
     db.commit()
@@ -655,6 +677,7 @@ def read_qa_questions(
     - 按创建时间降序排列
     - 默认只返回未隐藏(hidden=False或NULL)的问题
     - HQ管理员可以通过 show_hidden=True 查看所有问题
+    - 不含隐藏内容的列表与用户无关，经 feed_cache 缓存
     """
     query = db.query(QaQuestion)
     
@@ -664,8 +687,13 @@ def read_qa_questions(
         role_codes = {r.role_code for r in (current_user.admin_roles or []) if r and r.role_code}
         is_hq_admin = current_user.is_superuser or "association_hq" in role_codes
     
+    cache_key = None
     # 普通用户或未请求显示隐藏内容时，过滤已隐藏的问题
     if not (is_hq_admin and show_hidden):
+        cache_key = feed_cache.key(feed_cache.QA_QUESTIONS, skip, limit, subject, solved)
+        cached = feed_cache.get(cache_key)
+        if cached is not None:
+            return cached
         query = query.filter((QaQuestion.hidden == False) | (QaQuestion.hidden == None))
     
     if subject:
@@ -698,26 +726,70 @@ def read_qa_questions(
             "created_at": q.created_at.isoformat() if q.created_at else None,
             "hidden": q.hidden,
         })
+    if cache_key is not None:
+        feed_cache.put(cache_key, result)
     return result
 
+def _question_for_escrow(db: Session, escrow) -> Optional[QaQuestion]:
+    if escrow is None or not escrow.ref_id:
+        return None
+    return db.query(QaQuestion).filter(QaQuestion.id == escrow.ref_id).first()
+
 @router.post("/qa/questions", response_model=schemas.QaQuestion)
 def create_qa_question(
     question_in: schemas.QaQuestionCreate,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """
     发布悬赏提问。
-    - 待实现：积分冻结事务
+    - 悬赏积分在同一事务内冻结 (托管)，余额不足时返回 400
+    - 携带 Idempotency-Key 时重复提交返回首次创建的问题，不会重复冻结
     """
-    # TODO: Transaction to freeze points
+    reward = int(question_in.reward_points or 0)
+    if reward < 0:
+        raise HTTPException(status_code=400, detail="Invalid reward_points")
+    key = (
+        escrow_service.escrow_key("qa_question_request", f"{current_user.id}:{idempotency_key}")
+        if idempotency_key and reward > 0
+        else None
+    )
+    if key:
+        existing = _question_for_escrow(db, escrow_service.find(db, key))
+        if existing is not None:
+            return existing
+
     question = QaQuestion(
         id=str(uuid.uuid4()),
         author_id=current_user.id,
         **question_in.dict()
     )
     db.add(question)
-    db.commit()
+    if reward > 0:
+        try:
+            escrow_service.hold(
+                db,
+                key or escrow_service.escrow_key("qa_question", question.id),
+                current_user.id,
+                reward,
+                f"发布悬赏提问：{question.title}",
+                ref_type="qa_question",
+                ref_id=question.id,
+            )
+        except points_service.InsufficientPoints:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Insufficient points")
+    feed_cache.mark_dirty(db, feed_cache.QA_QUESTIONS)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 同一幂等键的并发请求：唯一索引冲突的一方返回先提交的问题
+        db.rollback()
+        existing = _question_for_escrow(db, escrow_service.find(db, key)) if key else None
+        if existing is None:
+            raise
+        return existing
     db.refresh(question)
     return question
 
@@ -743,10 +815,11 @@ def create_qa_answer(
     if question:
         question.answers_count += 1
         db.add(question)
+        feed_cache.mark_dirty(db, feed_cache.QA_QUESTIONS)
         
         # 通知提问者（如果回答者不是提问者本人）
         if question.author_id and question.author_id != current_user.id:
-            _notify(
+            notifications_service.notify(
                 db,
                 question.author_id,
                 "question_answered",
@@ -757,6 +830,8 @@ def create_qa_answer(
                     "answerer_name": current_user.full_name or current_user.username,
                     "answer_preview": (answer_in.content[:80] + "...") if len(answer_in.content) > 80 else answer_in.content,
                 },
+                group_key=f"question:{question.id}",
+                actor={"id": current_user.id, "name": current_user.full_name or current_user.username},
             )
     
     db.add(answer)
@@ -813,7 +888,7 @@ def accept_qa_answer(
     """
     采纳答案。
     - 仅提问者可采纳
-    - 待实现：积分结算事务
+    - 同一事务内把托管的悬赏积分结算给回答者；重复采纳同一回答直接返回
     """
     question = db.query(QaQuestion).filter(QaQuestion.id == question_id).first()
     if not question:
@@ -823,19 +898,36 @@ def accept_qa_answer(
         raise HTTPException(status_code=403, detail="Only question author can accept answer")
     
     if question.solved:
+        if question.accepted_answer_id == answer_id:
+            return question
         raise HTTPException(status_code=400, detail="Question already solved")
     
     answer = db.query(QaAnswer).filter(QaAnswer.id == answer_id).filter(QaAnswer.question_id == question_id).first()
     if not answer:
         raise HTTPException(status_code=404, detail="Answer not found")
     
-    question.solved = True
-    question.accepted_answer_id = answer_id
-    db.add(question)
+    # 条件更新抢占采纳：并发采纳时只有一个请求生效
+    claimed = (
+        db.query(QaQuestion)
+        .filter(QaQuestion.id == question_id)
+        .filter(or_(QaQuestion.solved.is_(None), QaQuestion.solved == False))
+        .update({QaQuestion.solved: True, QaQuestion.accepted_answer_id: answer_id}, synchronize_session=False)
+    )
+    if not claimed:
+        db.rollback()
+        db.refresh(question)
+        if question.accepted_answer_id == answer_id:
+            return question
+        raise HTTPException(status_code=400, detail="Question already solved")
+    
+    feed_cache.mark_dirty(db, feed_cache.QA_QUESTIONS)
+    escrow = escrow_service.find_by_ref(db, "qa_question", question.id)
+    if escrow is not None and answer.author_id:
+        escrow_service.settle(db, escrow, answer.author_id)
     
     # 通知回答者（如果回答者不是提问者本人）
     if answer.author_id and answer.author_id != current_user.id:
-        _notify(
+        notifications_service.notify(
             db,
             answer.author_id,
             "answer_accepted",
@@ -848,8 +940,6 @@ def accept_qa_answer(
             },
         )
     
-    # TODO: 积分结算事务 - 将悬赏积分转给回答者
-    
     db.commit()
     db.refresh(question)
     return question
@@ -887,6 +977,7 @@ def delete_community_post(
     
     # 删除帖子
     db.delete(post)
+    feed_cache.mark_dirty(db, feed_cache.COMMUNITY_POSTS)
     db.commit()
     return {"status": "deleted", "id": post_id}
 
@@ -918,11 +1009,17 @@ def delete_qa_question(
     if not (is_super or is_hq or is_author):
         raise HTTPException(status_code=403, detail="Not authorized to delete this question")
     
+    # 未结算的悬赏积分退还提问者
+    escrow = escrow_service.find_by_ref(db, "qa_question", question_id)
+    if escrow is not None:
+        escrow_service.refund(db, escrow)
+    
     # 删除相关回答
     db.query(QaAnswer).filter(QaAnswer.question_id == question_id).delete()
     
     # 删除问题
     db.delete(question)
+    feed_cache.mark_dirty(db, feed_cache.QA_QUESTIONS)
     db.commit()
     return {"status": "deleted", "id": question_id}
 
@@ -956,6 +1053,7 @@ def toggle_community_post_hidden(
     # 更新隐藏状态
     post.hidden = request.hidden
     db.add(post)
+    feed_cache.mark_dirty(db, feed_cache.COMMUNITY_POSTS)
     db.commit()
     return {"status": "success", "hidden": request.hidden}
 
@@ -989,5 +1087,6 @@ def toggle_qa_question_hidden(
     # 更新隐藏状态
     question.hidden = request.hidden
     db.add(question)
+    feed_cache.mark_dirty(db, feed_cache.QA_QUESTIONS)
     db.commit()
     return {"status": "success", "hidden": request.hidden}
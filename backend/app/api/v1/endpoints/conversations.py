@@ -1,15 +1,18 @@
 from typing import Any, List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+import asyncio
+import json
 import uuid
 
 from app.api import deps
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.models.user import User
-from app.models.conversation import Conversation, ConversationParticipant, Message
+from app.models.conversation import ConversationParticipant, Message
 from app.schemas import conversation as schemas
+from app.services import conversations as conversations_service
+from app.services import realtime, resource_versions
 
 router = APIRouter()
 
@@ -26,90 +29,16 @@ def _is_participant(db: Session, conversation_id: str, user_id: str) -> bool:
 
 @router.get("", response_model=List[schemas.ConversationListItem])
 def list_conversations(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
-    conv_ids = (
-        db.query(ConversationParticipant.conversation_id)
-        .filter(ConversationParticipant.user_id == current_user.id)
-        .all()
-    )
-    ids = [c[0] for c in conv_ids]
-    if not ids:
-        return []
-
-    last_by_conv = (
-        db.query(Message.conversation_id, func.max(Message.created_at).label("last_at"))
-        .filter(Message.conversation_id.in_(ids))
-        .group_by(Message.conversation_id)
-        .all()
-    )
-    last_time_map = {cid: last_at for cid, last_at in last_by_conv}
-
-    last_messages = {}
-    if last_time_map:
-        rows = (
-            db.query(Message)
-            .filter(Message.conversation_id.in_(list(last_time_map.keys())))
-            .all()
-        )
-        for m in rows:
-            if last_time_map.get(m.conversation_id) == m.created_at:
-                last_messages[m.conversation_id] = m
-
-    participants = (
-        db.query(ConversationParticipant)
-        .filter(ConversationParticipant.conversation_id.in_(ids))
-        .all()
-    )
-    peer_by_conv: dict[str, Optional[str]] = {}
-    for p in participants:
-        if p.user_id == current_user.id:
-            continue
-        peer_by_conv[p.conversation_id] = p.user_id
-
-    peer_users = db.query(User).filter(User.id.in_(list(peer_by_conv.values()))).all() if peer_by_conv else []
-    peer_user_map = {u.id: u for u in peer_users}
-
-    min_dt = datetime(1970, 1, 1)
-    unread_rows = (
-        db.query(Message.conversation_id, func.count(Message.id))
-        .join(
-            ConversationParticipant,
-            and_(
-                ConversationParticipant.conversation_id == Message.conversation_id,
-                ConversationParticipant.user_id == current_user.id,
-            ),
-        )
-        .filter(Message.conversation_id.in_(ids))
-        .filter(Message.sender_id != current_user.id)
-        .filter(Message.created_at > func.coalesce(ConversationParticipant.last_read_at, min_dt))
-        .group_by(Message.conversation_id)
-        .all()
-    )
-    unread_map = {cid: int(cnt or 0) for cid, cnt in unread_rows}
-
-    result: list[dict] = []
-    for cid in ids:
-        peer_id = peer_by_conv.get(cid)
-        peer = peer_user_map.get(peer_id) if peer_id else None
-        last = last_messages.get(cid)
-        unread_count = unread_map.get(cid, 0)
-        result.append(
-            {
-                "id": cid,
-                "peer_user": (
-                    {"id": peer.id, "username": peer.username, "full_name": peer.full_name}
-                    if peer
-                    else None
-                ),
-                "last_message": last.content if last else None,
-                "last_message_at": last.created_at if last else None,
-                "unread_count": unread_count,
-            }
-        )
-    result.sort(key=lambda x: x["last_message_at"] or x["id"], reverse=True)
-    return result
+    etag = resource_versions.etag(db, [resource_versions.conversations_key(current_user.id)], current_user.id)
+    cached = deps.not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return conversations_service.inbox(db, current_user.id)
 
 
 @router.get("/unread-count", response_model=dict)
@@ -117,33 +46,7 @@ def get_unread_conversations_count(
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
-    conv_ids = (
-        db.query(ConversationParticipant.conversation_id)
-        .filter(ConversationParticipant.user_id == current_user.id)
-        .all()
-    )
-    ids = [c[0] for c in conv_ids]
-    if not ids:
-        return {"unread_conversations_count": 0}
-
-    min_dt = datetime(1970, 1, 1)
-    unread_rows = (
-        db.query(Message.conversation_id, func.count(Message.id))
-        .join(
-            ConversationParticipant,
-            and_(
-                ConversationParticipant.conversation_id == Message.conversation_id,
-                ConversationParticipant.user_id == current_user.id,
-            ),
-        )
-        .filter(Message.conversation_id.in_(ids))
-        .filter(Message.sender_id != current_user.id)
-        .filter(Message.created_at > func.coalesce(ConversationParticipant.last_read_at, min_dt))
-        .group_by(Message.conversation_id)
-        .all()
-    )
-    unread_conversations_count = sum(1 for _, cnt in unread_rows if (cnt or 0) > 0)
-    return {"unread_conversations_count": unread_conversations_count}
+    return {"unread_conversations_count": conversations_service.unread_conversations_count(db, current_user.id)}
 
 
 @router.post("", response_model=schemas.ConversationListItem)
@@ -158,35 +61,12 @@ def create_or_get_conversation(
     if not peer or not peer.is_active:
         raise HTTPException(status_code=404, detail="User not found")
 
-    c1 = db.query(ConversationParticipant.conversation_id).filter(ConversationParticipant.user_id == current_user.id).subquery()
-    c2 = db.query(ConversationParticipant.conversation_id).filter(ConversationParticipant.user_id == payload.peer_user_id).subquery()
-    existing = db.query(Conversation).filter(Conversation.id.in_(c1)).filter(Conversation.id.in_(c2)).first()
-
-    if not existing:
-        existing = Conversation(id=str(uuid.uuid4()))
-        db.add(existing)
-        db.add(
-            ConversationParticipant(
-                id=str(uuid.uuid4()),
-                conversation_id=existing.id,
-                user_id=current_user.id,
-            )
-        )
-        db.add(
-            ConversationParticipant(
-                id=str(uuid.uuid4()),
-                conversation_id=existing.id,
-                user_id=payload.peer_user_id,
-            )
-        )
-        db.commit()
-        db.refresh(existing)
-
+    existing = conversations_service.get_or_create_direct(db, current_user.id, payload.peer_user_id)
     return {
         "id": existing.id,
         "peer_user": {"id": peer.id, "username": peer.username, "full_name": peer.full_name},
-        "last_message": None,
-        "last_message_at": None,
+        "last_message": existing.last_message_preview,
+        "last_message_at": existing.last_message_at,
     }
 
 
@@ -194,40 +74,35 @@ def create_or_get_conversation(
 def list_messages(
     conversation_id: str,
     page_size: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     page_cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
+    """
+    消息历史 (按时间正序)。分页使用消息上的 cursor 字段：
+    - before=<最早一条的 cursor> 加载更早的消息；after=<最新一条的 cursor> 加载更新的消息。
+    - page_cursor 为旧参数名，等同于 before。
+    """
     if not _is_participant(db, conversation_id, current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    q = db.query(Message).filter(Message.conversation_id == conversation_id)
-    if page_cursor:
-        q = q.filter(Message.id < page_cursor)
-    q = q.order_by(Message.created_at.desc()).limit(max(1, min(page_size, 200)))
-    items = list(reversed(q.all()))
+    try:
+        items = conversations_service.message_page(
+            db,
+            conversation_id,
+            max(1, min(page_size, 200)),
+            before=before or page_cursor,
+            after=after,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
     sender_ids = list({m.sender_id for m in items})
     senders = db.query(User).filter(User.id.in_(sender_ids)).all() if sender_ids else []
     sender_map = {u.id: u for u in senders}
-
-    result: list[dict] = []
-    for m in items:
-        u = sender_map.get(m.sender_id)
-        result.append(
-            {
-                "id": m.id,
-                "conversation_id": m.conversation_id,
-                "sender": {
-                    "id": u.id if u else m.sender_id,
-                    "username": u.username if u else "",
-                    "full_name": u.full_name if u else None,
-                },
-                "content": m.content,
-                "created_at": m.created_at,
-            }
-        )
-    return result
+    return [conversations_service.message_out(m, sender_map.get(m.sender_id)) for m in items]
 
 
 @router.post("/{conversation_id}/read", response_model=dict)
@@ -244,9 +119,9 @@ def mark_conversation_read(
     )
     if not participant:
         raise HTTPException(status_code=403, detail="Not authorized")
-    participant.last_read_at = datetime.utcnow()
-    db.add(participant)
+    conversations_service.mark_read(db, participant)
     db.commit()
+    conversations_service.publish_read(db, participant)
     return {"status": "ok"}
 
 
@@ -272,12 +147,71 @@ def send_message(
         content=content,
     )
     db.add(msg)
+    conversations_service.record_message(db, msg)
     db.commit()
-    db.refresh(msg)
-    return {
-        "id": msg.id,
-        "conversation_id": msg.conversation_id,
-        "sender": {"id": current_user.id, "username": current_user.username, "full_name": current_user.full_name},
-        "content": msg.content,
-        "created_at": msg.created_at,
-    }
+    conversations_service.publish_message(db, msg, current_user)
+    return conversations_service.message_out(msg, current_user)
+
+
+@router.websocket("/ws")
+async def conversations_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    会话实时通道：推送新消息 (message.created)、已读状态 (conversation.read) 与输入状态 (typing)。
+    鉴权：查询参数 token 为登录获得的 JWT。
+    客户端可发送 {"type": "typing", "conversation_id": ...} 与 {"type": "ping"}。
+    """
+    user_id = await run_in_threadpool(_websocket_user_id, token)
+    if not user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    conn = realtime.Connection(websocket, user_id)
+    realtime.registry.add(conn)
+    sender = asyncio.create_task(conn.sender())
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            if data.get("type") == "ping":
+                conn.offer(json.dumps({"type": "pong"}))
+            elif data.get("type") == "typing":
+                conversation_id = str(data.get("conversation_id") or "")
+                members = conn.conversation_members.get(conversation_id)
+                if members is None:
+                    members = await run_in_threadpool(_conversation_members, conversation_id)
+                    conn.conversation_members[conversation_id] = members
+                if user_id not in members:
+                    continue
+                # 发布可能涉及网络 I/O (Redis 后端)，不在事件循环线程中执行
+                await run_in_threadpool(
+                    realtime.publish,
+                    [m for m in members if m != user_id],
+                    {"type": "typing", "conversation_id": conversation_id, "user_id": user_id},
+                )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        realtime.registry.remove(conn)
+        sender.cancel()
+
+
+def _websocket_user_id(token: Optional[str]) -> Optional[str]:
+    # 仅在握手时短暂使用数据库会话，空闲连接不占用连接池
+    db = SessionLocal()
+    try:
+        user = deps.get_query_token_user(db, token)
+        return user.id if user else None
+    finally:
+        db.close()
+
+
+def _conversation_members(conversation_id: str) -> list[str]:
+    db = SessionLocal()
+    try:
+        return conversations_service.member_ids(db, conversation_id)
+    finally:
+        db.close()
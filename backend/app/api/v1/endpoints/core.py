@@ -1,31 +1,19 @@
 from typing import List, Optional, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 import uuid
-import json
 
 from app.api import deps
 from app.db.session import get_db
-from app.models.core import Organization, Tag, Announcement
-from app.models.notification import Notification
+from app.models.core import Organization, Tag, Announcement, AnnouncementDelivery
 from app.schemas import core as schemas
 from app.models.user import User, AdminRole
+from app.services import announcement_fanout, resource_versions
 
 router = APIRouter()
 
 
-def _create_notification(db: Session, user_id: str, type: str, payload: dict) -> None:
-    """Helper to create a notification record."""
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-
 # =============================================================================
 # 核心业务 API (Core Business API)
 # 功能：管理组织目录、标签字典和公告。
@@ -242,11 +230,17 @@ def create_organization(
 # Tags (标签)
 # -----------------------------------------------------------------------------
 @router.get("/tags", response_model=List[schemas.Tag])
-def read_tags(db: Session = Depends(get_db)):
+def read_tags(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     获取所有启用标签。
     - 用于用户画像、需求匹配等标签选择
+    - 支持 If-None-Match 条件请求
     """
+    cached = deps.not_modified(
+        request, response, resource_versions.etag(db, [resource_versions.TAGS]), private=False
+    )
+    if cached is not None:
+        return cached
     return db.query(Tag).filter(Tag.enabled == True).all()
 
 @router.get("/tags/admin", response_model=List[schemas.Tag])
@@ -308,6 +302,8 @@ def delete_tag(
 # -----------------------------------------------------------------------------
 @router.get("/announcements", response_model=List[schemas.Announcement])
 def read_announcements(
+    request: Request,
+    response: Response,
     scope: Optional[str] = None,      # public, campus, aid
     school_id: Optional[str] = None,  # 筛选特定高校的公告
     db: Session = Depends(get_db)
@@ -315,7 +311,12 @@ def read_announcements(
     """
     获取公告列表。
     - 支持按发布范围和学校 ID 筛选
+    - 支持 If-None-Match 条件请求
     """
+    etag = resource_versions.etag(db, [resource_versions.ANNOUNCEMENTS], scope, school_id)
+    cached = deps.not_modified(request, response, etag, private=False)
+    if cached is not None:
+        return cached
     query = db.query(Announcement)
     if scope:
         query = query.filter(Announcement.scope == scope)
@@ -400,50 +401,15 @@ def create_announcement(
 
     ann = Announcement(id=str(uuid.uuid4()), created_by=current_user.id, **ann_in.dict())
     db.add(ann)
-    
-    # 通知目标用户（根据 scope 和 audience 确定推送范围）
-    notify_user_ids: list[str] = []
-    
-    if scope == "public" and audience == "public_all":
-        # 全站公告：显示在公告列表，不单独推送通知（用户进入平台时查看）
-        pass
-    elif scope == "campus":
-        if audience == "campus_all":
-            # 校园全体公告：推送给该校所有在校用户
-            campus_users = db.query(User.id).filter(User.school_id == ann_in.school_id).filter(User.id != current_user.id).all()
-            notify_user_ids = [u.id for u in campus_users]
-        elif audience == "association_teachers_only":
-            # 志愿者师资公告：推送给该校的志愿者老师
-            teacher_users = (
-                db.query(User.id)
-                .filter(User.school_id == ann_in.school_id)
-                .filter(User.is_volunteer_teacher == True)
-                .filter(User.id != current_user.id)
-                .all()
-            )
-            notify_user_ids = [u.id for u in teacher_users]
-    elif scope == "aid":
-        # 支教学校公告：显示在公告列表
-        pass
-    
-    # 创建通知（限制最多 1000 人，超出则不发个人通知，依赖公告列表展示）
-    if notify_user_ids and len(notify_user_ids) <= 1000:
-        for user_id in notify_user_ids:
-            _create_notification(
-                db,
-                user_id,
-                "announcement_published",
-                {
-                    "announcement_id": ann.id,
-                    "title": ann.title,
-                    "scope": scope,
-                    "publisher_id": current_user.id,
-                    "publisher_name": current_user.full_name or current_user.username,
-                },
-            )
-    
+
+    # 校内公告的站内通知由后台任务分批投递 (全站/支教学校公告只在公告列表展示)，
+    # 接口只登记任务，提交后入队
+    delivery = announcement_fanout.schedule(db, ann)
+
     db.commit()
     db.refresh(ann)
+    if delivery is not None:
+        announcement_fanout.enqueue(ann.id)
     return {
         "id": ann.id,
         "title": ann.title,
@@ -458,6 +424,7 @@ def create_announcement(
         "created_by_user": {"id": current_user.id, "username": current_user.username, "full_name": current_user.full_name},
         "created_at": ann.created_at,
         "updated_at": ann.updated_at,
+        "delivery": announcement_fanout.delivery_out(delivery),
     }
 
 
@@ -524,3 +491,25 @@ def delete_announcement(
     db.delete(ann)
     db.commit()
     return {"ok": True}
+
+
+@router.get("/announcements/{ann_id}/delivery", response_model=dict)
+def read_announcement_delivery(
+    ann_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    公告站内通知的投递进度 (发布人、HQ 与超级管理员可查看)。
+    - status: pending / running / done / failed，无需逐人通知的公告为 none
+    """
+    ann = db.query(Announcement).filter(Announcement.id == ann_id).first()
+    if not ann:
+        raise HTTPException(status_code=404, detail="Announcement not found")
+
+    role_codes = {r.role_code for r in (current_user.admin_roles or []) if r and r.role_code}
+    if not (current_user.is_superuser or "association_hq" in role_codes or ann.created_by == current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    delivery = db.query(AnnouncementDelivery).filter(AnnouncementDelivery.announcement_id == ann_id).first()
+    return announcement_fanout.delivery_out(delivery) or {"status": "none", "total": 0, "delivered": 0}
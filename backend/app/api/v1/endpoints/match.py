@@ -1,7 +1,6 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 import uuid
 import json
 
@@ -10,52 +9,17 @@ from app.db.session import get_db
 from app.models.match import PointTxn, MatchRequest
 from app.schemas import match as schemas
 from app.models.user import User
-from app.models.teacher_pool import TeacherPoolEntry
 from app.models.match import MatchOffer
-from app.models.notification import Notification
 from app.models.core import Organization
-from app.models.conversation import Conversation, ConversationParticipant, Message
+from app.models.conversation import Message
+from app.services import conversations as conversations_service
+from app.services import point_rollups, points as points_service
+from app.services import candidate_cache, match_dispatch, matching, notifications as notifications_service, resource_versions, teacher_index, teacher_load, time_slots
+from app.services.verification import is_verified_teacher
 
 router = APIRouter()
 
 
-def _notify(db: Session, user_id: str, type: str, payload: dict) -> None:
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-
-
-def _get_or_create_conversation(db: Session, user_id: str, peer_user_id: str) -> str:
-    c1 = db.query(ConversationParticipant.conversation_id).filter(ConversationParticipant.user_id == user_id).subquery()
-    c2 = db.query(ConversationParticipant.conversation_id).filter(ConversationParticipant.user_id == peer_user_id).subquery()
-    existing = db.query(Conversation).filter(Conversation.id.in_(c1)).filter(Conversation.id.in_(c2)).first()
-    if existing:
-        return existing.id
-    conv = Conversation(id=str(uuid.uuid4()))
-    db.add(conv)
-    db.add(
-        ConversationParticipant(
-            id=str(uuid.uuid4()),
-            conversation_id=conv.id,
-            user_id=user_id,
-        )
-    )
-    db.add(
-        ConversationParticipant(
-            id=str(uuid.uuid4()),
-            conversation_id=conv.id,
-            user_id=peer_user_id,
-        )
-    )
-    db.commit()
-    db.refresh(conv)
-    return conv.id
-
 # =============================================================================
 # 匹配与积分 API (Match & Points API)
 # 功能：管理积分流水、余额查询和匹配请求。
@@ -71,10 +35,36 @@ def read_points_balance(
 ):
     """
     查询当前用户积分余额。
-    - 通过聚合所有积分流水计算得出
+    - 读取物化余额 (point_balances)，与每笔流水在同一事务内更新
     """
-    balance = db.query(func.sum(PointTxn.points)).filter(PointTxn.user_id == current_user.id).scalar()
-    return balance or 0
+    return points_service.balance(db, current_user.id)
+
+@router.get("/points/leaderboard", response_model=List[dict])
+def read_points_leaderboard(
+    period: str = Query(default="week", pattern="^(day|week|month)$"),
+    school_id: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    积分收入排行榜。
+    - 周期：day (今日) / week (近 7 天) / month (近 30 天)，可按高校筛选
+    - 读取积分日汇总的缓存排名，数据随汇总任务延迟更新
+    """
+    return point_rollups.top_earners(db, period, school_id, limit)
+
+@router.get("/points/schools", response_model=List[dict])
+def read_points_school_flow(
+    period: str = Query(default="week", pattern="^(day|week|month)$"),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    各高校积分流向 (收入/支出/净额)，按收入降序。
+    """
+    return point_rollups.school_flow(db, period, limit)
 
 @router.get("/points/transactions", response_model=List[schemas.PointTxn])
 def read_point_transactions(
@@ -109,9 +99,13 @@ def create_match_request(
         student_id=current_user.id,
         **request_in.dict()
     )
+    match_dispatch.schedule(request)
     db.add(request)
     db.commit()
     db.refresh(request)
+    # 即时求助交给后台派单线程自动分波次邀约
+    if request.dispatch_next_at is not None:
+        match_dispatch.enqueue(request.id)
     return request
 
 @router.get("/requests/{id}", response_model=schemas.MatchRequest)
@@ -152,46 +146,11 @@ def read_match_candidates(
     if request.student_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    try:
-        want_tags = json.loads(request.tags or "[]")
-        want_tags = [str(x) for x in want_tags] if isinstance(want_tags, list) else []
-    except Exception:
-        want_tags = []
-
-    entries = db.query(TeacherPoolEntry).filter(TeacherPoolEntry.in_pool == True).all()
-    users = (
-        db.query(User)
-        .filter(User.id.in_([e.user_id for e in entries]))
-        .filter(User.is_active == True)
-        .all()
-        if entries
-        else []
-    )
-    user_map = {u.id: u for u in users}
+    want_tags = teacher_index.parse_tags(request.tags)
+    req_masks = matching.request_slot_masks(request)
+    ranked = matching.cached_candidates(db, request, max(1, min(limit, 50)))
 
-    scored: list[tuple[int, TeacherPoolEntry]] = []
-    for e in entries:
-        u = user_map.get(e.user_id)
-        if not u:
-            continue
-        try:
-            p = json.loads(u.profile or "{}")
-            v = p.get("verification") if isinstance(p, dict) else {}
-            teacher_ok = isinstance(v, dict) and v.get("teacher") == "verified"
-        except Exception:
-            teacher_ok = False
-        if u.role != "volunteer_teacher" or not teacher_ok:
-            continue
-        try:
-            t_tags = json.loads(e.tags or "[]")
-            t_tags = [str(x) for x in t_tags] if isinstance(t_tags, list) else []
-        except Exception:
-            t_tags = []
-        score = len(set(want_tags) & set(t_tags))
-        scored.append((score, e))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    school_ids = sorted({e.school_id for _, e in scored if e.school_id})
+    school_ids = sorted({e.school_id for _, e, _ in ranked if e.school_id})
     orgs = (
         db.query(Organization)
         .filter(Organization.type == "university")
@@ -202,24 +161,20 @@ def read_match_candidates(
     )
     school_name_by_id = {o.school_id: (o.display_name or o.school_id) for o in orgs}
     result: list[schemas.MatchCandidate] = []
-    for score, e in scored[: max(1, min(limit, 50))]:
-        u = user_map.get(e.user_id)
-        if not u:
-            continue
-        try:
-            t_tags = json.loads(e.tags or "[]")
-            t_tags = [str(x) for x in t_tags] if isinstance(t_tags, list) else []
-        except Exception:
-            t_tags = []
+    for score, e, u in ranked:
+        t_tags = teacher_index.parse_tags(e.tags)
         matched = [t for t in want_tags if t in set(t_tags)]
         explain = f"标签匹配：{('、'.join(matched) if matched else '无')}"
+        if req_masks:
+            overlap = time_slots.overlap_minutes(req_masks, time_slots.slot_masks(e.time_slots))
+            explain += f"；时间重合：{overlap / 60:g} 小时" if overlap else "；时间重合：无"
         result.append({
             "user_id": e.user_id,
             "username": u.username if u else "",
             "full_name": u.full_name if u else None,
             "school_id": e.school_id,
             "school_display_name": school_name_by_id.get(e.school_id),
-            "tags": json.loads(e.tags or "[]"),
+            "tags": t_tags,
             "time_slots": json.loads(e.time_slots or "[]"),
             "in_pool": bool(e.in_pool),
             "explain": explain,
@@ -252,13 +207,7 @@ def create_match_offer(
     teacher = db.query(User).filter(User.id == teacher_id).first()
     if not teacher or not teacher.is_active:
         raise HTTPException(status_code=404, detail="Teacher not found")
-    try:
-        p = json.loads(teacher.profile or "{}")
-        v = p.get("verification") if isinstance(p, dict) else {}
-        teacher_ok = isinstance(v, dict) and v.get("teacher") == "verified"
-    except Exception:
-        teacher_ok = False
-    if teacher.role != "volunteer_teacher" or not teacher_ok:
+    if not is_verified_teacher(teacher):
         raise HTTPException(status_code=400, detail="Teacher not eligible")
 
     existing = (
@@ -278,7 +227,8 @@ def create_match_offer(
         status="pending",
     )
     db.add(offer)
-    _notify(
+    teacher_load.offers_opened(db, [teacher_id])
+    notifications_service.notify(
         db,
         teacher_id,
         "match_offer_created",
@@ -291,17 +241,17 @@ def create_match_offer(
 
 @router.get("/offers/inbox", response_model=List[dict])
 def list_teacher_offers_inbox(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
-    try:
-        p = json.loads(current_user.profile or "{}")
-        v = p.get("verification") if isinstance(p, dict) else {}
-        teacher_ok = isinstance(v, dict) and v.get("teacher") == "verified"
-    except Exception:
-        teacher_ok = False
-    if current_user.role != "volunteer_teacher" or not teacher_ok:
+    if not is_verified_teacher(current_user):
         raise HTTPException(status_code=403, detail="Not authorized")
+    etag = resource_versions.etag(db, [resource_versions.offers_key(current_user.id)], current_user.id)
+    cached = deps.not_modified(request, response, etag)
+    if cached is not None:
+        return cached
     offers = (
         db.query(MatchOffer)
         .filter(MatchOffer.teacher_id == current_user.id)
@@ -365,38 +315,48 @@ def accept_match_offer(
     if not req:
         raise HTTPException(status_code=404, detail="Request not found")
 
-    offer.status = "accepted"
-    req.status = "matched"
-    db.add(offer)
-    db.add(req)
-
-    db.query(MatchOffer).filter(MatchOffer.request_id == offer.request_id).filter(MatchOffer.id != offer.id).filter(MatchOffer.status == "pending").update(
-        {"status": "declined"},
-        synchronize_session=False,
+    # 条件更新依次抢占请求与邀约：同一请求的其他邀约被并发接受、或派单线程已过期本邀约时返回 409
+    if not match_dispatch.claim_request(db, req.id):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Request already matched")
+    if not teacher_load.claim_offer(db, offer.id, "accepted"):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Offer already handled")
+
+    others = db.query(MatchOffer).filter(MatchOffer.request_id == offer.request_id).filter(MatchOffer.id != offer.id)
+    closed_teacher_ids = teacher_load.close_pending(db, others, "declined")
+    resource_versions.touch(
+        db, *[resource_versions.offers_key(t) for t in closed_teacher_ids + [offer.teacher_id]]
     )
+    teacher_load.offer_accepted(db, offer.teacher_id)
+    db.commit()
+    candidate_cache.invalidate_request(req.id)
 
-    conversation_id = _get_or_create_conversation(db, offer.student_id, offer.teacher_id)
-    db.add(
-        Message(
-            id=str(uuid.uuid4()),
-            conversation_id=conversation_id,
-            sender_id=offer.teacher_id,
-            content="我已接受你的求助，我们可以开始沟通。",
-        )
+    # 抢占成功后再取得会话 (创建会话会单独提交)，失败方不会留下会话
+    conversation_id = conversations_service.get_or_create_direct(db, offer.student_id, offer.teacher_id).id
+
+    msg = Message(
+        id=str(uuid.uuid4()),
+        conversation_id=conversation_id,
+        sender_id=offer.teacher_id,
+        content="我已接受你的求助，我们可以开始沟通。",
     )
-    _notify(
+    db.add(msg)
+    conversations_service.record_message(db, msg)
+    notifications_service.notify(
         db,
         offer.student_id,
         "match_offer_accepted",
         {"request_id": offer.request_id, "offer_id": offer.id, "conversation_id": conversation_id},
     )
-    _notify(
+    notifications_service.notify(
         db,
         offer.teacher_id,
         "match_offer_accepted",
         {"request_id": offer.request_id, "offer_id": offer.id, "conversation_id": conversation_id},
     )
     db.commit()
+    conversations_service.publish_message(db, msg, current_user)
     return {"status": "accepted", "conversation_id": conversation_id}
 
 
@@ -413,9 +373,15 @@ def decline_match_offer(
         raise HTTPException(status_code=403, detail="Not authorized")
     if offer.status != "pending":
         raise HTTPException(status_code=400, detail="Offer already handled")
-    offer.status = "declined"
-    db.add(offer)
-    _notify(db, offer.student_id, "match_offer_declined", {"request_id": offer.request_id, "offer_id": offer.id})
-    _notify(db, offer.teacher_id, "match_offer_declined", {"request_id": offer.request_id, "offer_id": offer.id})
+    if not teacher_load.claim_offer(db, offer.id, "declined"):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Offer already handled")
+    resource_versions.touch(db, resource_versions.offers_key(offer.teacher_id))
+    teacher_load.offers_closed(db, [offer.teacher_id])
+    notifications_service.notify(db, offer.student_id, "match_offer_declined", {"request_id": offer.request_id, "offer_id": offer.id})
+    notifications_service.notify(db, offer.teacher_id, "match_offer_declined", {"request_id": offer.request_id, "offer_id": offer.id})
     db.commit()
+    # 自动派单的邀约被拒后立即检查是否可以提前发出下一波
+    if offer.dispatch_wave:
+        match_dispatch.enqueue(offer.request_id)
     return {"status": "declined"}
@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.db.session import get_db
+from app.models.user import User
+from app.services import summary as summary_service
+
+router = APIRouter()
+
+
+@router.get("/summary", response_model=dict)
+def get_badge_summary(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """导航栏/首页角标汇总：通知与会话未读数、待处理邀约数及版本号。"""
+    return summary_service.badge_summary(db, current_user)
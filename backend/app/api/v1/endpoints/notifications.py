@@ -1,59 +1,53 @@
 from typing import Any, List, Optional
-from datetime import datetime
-import uuid
-import json
+import asyncio
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api import deps
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import SessionLocal, get_db
 from app.models.notification import Notification
 from app.models.user import User
 from app.schemas.notification import NotificationOut
+from app.services import notification_retention, resource_versions
+from app.services import notifications as notifications_service
 
 
 router = APIRouter()
 
 
-def create_notification(db: Session, user_id: str, type: str, payload: Any) -> None:
-    db.add(
-        Notification(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            type=type,
-            payload=json.dumps(payload, ensure_ascii=False) if payload is not None else None,
-        )
-    )
-
-
 @router.get("", response_model=List[NotificationOut])
 def list_notifications(
+    request: Request,
+    response: Response,
     unread_only: bool = False,
     limit: int = Query(default=50, ge=1, le=200),
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
+    # 保留期下界：过期通知不会返回，分区表上据此只扫描保留期内的分区
+    horizon = notification_retention.horizon()
+    etag = resource_versions.etag(
+        db,
+        [resource_versions.notifications_key(current_user.id)],
+        current_user.id,
+        unread_only,
+        limit,
+        horizon.date() if horizon else None,
+    )
+    cached = deps.not_modified(request, response, etag)
+    if cached is not None:
+        return cached
     q = db.query(Notification).filter(Notification.user_id == current_user.id)
+    if horizon is not None:
+        q = q.filter(Notification.created_at >= horizon)
     if unread_only:
         q = q.filter(Notification.read_at.is_(None))
-    items = q.order_by(Notification.created_at.desc()).limit(limit).all()
-    result: list[dict] = []
-    for n in items:
-        try:
-            payload = json.loads(n.payload) if n.payload else None
-        except Exception:
-            payload = None
-        result.append(
-            {
-                "id": n.id,
-                "type": n.type,
-                "payload": payload,
-                "read_at": n.read_at,
-                "created_at": n.created_at,
-            }
-        )
-    return result
+    items = q.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit).all()
+    return [notifications_service.notification_out(n) for n in items]
 
 
 @router.get("/unread-count", response_model=dict)
@@ -61,13 +55,84 @@ def get_unread_notifications_count(
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
-    cnt = (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .filter(Notification.read_at.is_(None))
-        .count()
+    return {"unread_count": notifications_service.unread_count(db, current_user.id)}
+
+
+@router.get("/stream")
+async def notifications_stream(
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = Query(default=None),
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    authorization: Optional[str] = Header(default=None),
+):
+    """
+    通知推送 (Server-Sent Events)：
+    - notification：新通知，事件 ID 为通知游标；
+    - unread_count：最新未读数，连接建立时先推送一次；
+    - 每隔 NOTIFICATION_STREAM_HEARTBEAT_SECONDS 发送一次注释行作为心跳。
+    鉴权：查询参数 token，或 Authorization: Bearer 头。
+    重连时通过 Last-Event-ID 头 (或 last_event_id 参数) 补发断线期间的通知。
+    """
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    user_id = await run_in_threadpool(_stream_user_id, token)
+    if not user_id:
+        raise HTTPException(status_code=403, detail="Could not validate credentials")
+
+    # 先登记连接再读取补发数据，避免两者之间产生的通知丢失 (重复的由客户端按 ID 去重)
+    subscriber = notifications_service.StreamSubscriber(user_id)
+    notifications_service.stream_registry.add(subscriber)
+    try:
+        backlog = await run_in_threadpool(_stream_backlog, user_id, last_event_id_header or last_event_id)
+    except Exception:
+        notifications_service.stream_registry.remove(subscriber)
+        raise
+
+    async def events():
+        try:
+            yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+            for event in backlog:
+                yield subscriber.encode(event)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if frame is None:
+                    # 消费过慢被断开，客户端重连后按 Last-Event-ID 补发
+                    return
+                yield frame
+        finally:
+            notifications_service.stream_registry.remove(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return {"unread_count": int(cnt)}
+
+
+def _stream_user_id(token: Optional[str]) -> Optional[str]:
+    # 仅在建立连接时短暂使用数据库会话，空闲连接不占用连接池
+    db = SessionLocal()
+    try:
+        user = deps.get_query_token_user(db, token)
+        return user.id if user else None
+    finally:
+        db.close()
+
+
+def _stream_backlog(user_id: str, last_event_id: Optional[str]) -> list[dict]:
+    db = SessionLocal()
+    try:
+        events = notifications_service.replay(db, user_id, last_event_id)
+        events.append(notifications_service.unread_event(notifications_service.unread_count(db, user_id)))
+        return events
+    finally:
+        db.close()
 
 
 @router.post("/{notification_id}/read", response_model=dict)
@@ -84,8 +149,7 @@ def mark_notification_read(
     )
     if not n:
         raise HTTPException(status_code=404, detail="Notification not found")
-    if not n.read_at:
-        n.read_at = datetime.utcnow()
-        db.add(n)
+    if notifications_service.mark_read(db, n):
         db.commit()
+        notifications_service.publish_unread(current_user.id)
     return {"status": "ok"}
@@ -29,6 +29,90 @@ class Settings(BaseSettings):
     # 数据库连接字符串，默认使用 SQLite，生产环境应配置为 PostgreSQL
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
     
+    # -------------------------------------------------------------------------
+    # 匹配引擎 (Matching)
+    # -------------------------------------------------------------------------
+    # 预约类求助单中时间重合度的权重：完全覆盖所需时段时加上该分值
+    MATCH_TIME_SLOT_WEIGHT: float = 1.0
+    # 各标签分类 (Tag.category，如 subject/grade/skill) 的匹配权重，未配置的分类权重为 1
+    MATCH_TAG_CATEGORY_WEIGHTS: dict[str, float] = {}
+    # 向量化匹配引擎 (需安装 numpy)：师资池位图常驻内存，适合 10 万级以上师资池
+    MATCH_VECTOR_ENGINE: bool = False
+    # 即时求助自动派单：每波邀约人数、每波超时时间、最多波次、到期扫描间隔
+    MATCH_DISPATCH_ENABLED: bool = True
+    MATCH_DISPATCH_WAVE_SIZE: int = 3
+    MATCH_DISPATCH_WAVE_TIMEOUT_SECONDS: int = 90
+    MATCH_DISPATCH_MAX_WAVES: int = 3
+    MATCH_DISPATCH_POLL_SECONDS: float = 5.0
+    # 候选讲师缓存：最多缓存的请求数、过期时间、每个请求缓存的候选深度
+    MATCH_CANDIDATE_CACHE_SIZE: int = 1024
+    MATCH_CANDIDATE_CACHE_TTL_SECONDS: int = 300
+    MATCH_CANDIDATE_CACHE_DEPTH: int = 50
+    # 负载均衡：讲师同时待回复邀约上限、负载扣分权重、近期接单的衰减时间 (小时)、
+    # 负载重排时考察的候选数倍数 (limit * 倍数)
+    MATCH_TEACHER_CAPACITY: int = 5
+    MATCH_LOAD_WEIGHT: float = 0.5
+    MATCH_LOAD_WINDOW_HOURS: float = 24.0
+    MATCH_LOAD_RERANK_FACTOR: int = 2
+
+    # -------------------------------------------------------------------------
+    # 通知推送 (Notifications)
+    # -------------------------------------------------------------------------
+    # SSE 通知流的心跳间隔 (秒，需小于反向代理的读超时) 与客户端断线重连间隔 (毫秒)
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    NOTIFICATION_STREAM_RETRY_MS: int = 3000
+    # 未读计数校准间隔 (秒)：按 notifications 实际数据修正 notification_counters 的漂移
+    NOTIFICATION_COUNTER_RECONCILE_SECONDS: int = 3600
+    # 公告站内通知后台投递的每批人数 (每批一次批量 INSERT 与一个事务)
+    ANNOUNCEMENT_FANOUT_BATCH_SIZE: int = 1000
+    # 通知保留期 (天，0 表示永久保留)，按创建时间计算，已读与未读分别配置；
+    # 按类型覆盖，如 {"announcement_published": {"read": 7, "unread": 30}}
+    NOTIFICATION_RETENTION_READ_DAYS: int = 90
+    NOTIFICATION_RETENTION_UNREAD_DAYS: int = 365
+    NOTIFICATION_RETENTION_TYPE_DAYS: dict[str, dict[str, int]] = {}
+    # 过期通知清理：每批删除行数、清理间隔 (秒)
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 1000
+    NOTIFICATION_RETENTION_INTERVAL_SECONDS: int = 3600
+    # PostgreSQL 按月分区 (需先执行 python -m app.services.notification_retention --partition 转换)：
+    # 预先创建的未来月份数
+    NOTIFICATION_PARTITION_MONTHS_AHEAD: int = 2
+    # 通知合并：同一用户、同类型、同目标 (如同一帖子的评论) 的未读通知在窗口 (秒) 内合并为一行，
+    # 每次新事件把窗口向后顺延；合并行保留最近的若干位触发者
+    NOTIFICATION_COALESCE_WINDOW_SECONDS: int = 3600
+    NOTIFICATION_COALESCE_MAX_ACTORS: int = 3
+
+    # -------------------------------------------------------------------------
+    # 积分 (Points)
+    # -------------------------------------------------------------------------
+    # 每位用户每累计多少笔积分流水记录一次余额快照 (账本增量校验的检查点)
+    POINTS_SNAPSHOT_INTERVAL: int = 100
+    # 积分日汇总任务的执行间隔 (秒) 与每批处理的用户数
+    POINTS_ROLLUP_INTERVAL_SECONDS: int = 300
+    POINTS_ROLLUP_BATCH_SIZE: int = 500
+    # 排行榜缓存的名次数 (接口 limit 上限)
+    POINTS_LEADERBOARD_SIZE: int = 100
+    # 排行榜缓存的最多条目数 (类型/周期/高校组合，超出按 LRU 淘汰)
+    POINTS_LEADERBOARD_CACHE_SIZE: int = 256
+    # 新用户初始积分 (作为一笔 signup_bonus 流水入账)。默认 0 不发放；
+    # 启用后已有用户在下次启动时补发一次
+    POINTS_SIGNUP_BONUS: int = 0
+
+    # -------------------------------------------------------------------------
+    # 内容 (Content)
+    # -------------------------------------------------------------------------
+    # 公共社区 / 问答列表的响应缓存：最多缓存的查询数 (0 关闭)、过期时间 (秒，兜底跨进程失效)
+    CONTENT_FEED_CACHE_SIZE: int = 256
+    CONTENT_FEED_CACHE_TTL_SECONDS: int = 30
+
+    # -------------------------------------------------------------------------
+    # 消息总线 (Pub/Sub)
+    # -------------------------------------------------------------------------
+    # 多 worker / 多节点部署时实时推送的跨进程广播：留空为进程内 (单 worker)；
+    # 设置为 redis://[:密码@]主机:端口 时使用 Redis 协议后端 (可用 app.services.pubsub_server 替身)
+    PUBSUB_URL: str = ""
+    # 频道名前缀，多个环境共用同一 Redis 时区分
+    PUBSUB_CHANNEL_PREFIX: str = "cloudedu:"
+
     # -------------------------------------------------------------------------
     # 跨域配置 (CORS)
     # -------------------------------------------------------------------------
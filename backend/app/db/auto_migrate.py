@@ -1,26 +1,116 @@
-from sqlalchemy import text
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from app.db.session import Base
+from app.models.core import SchemaMigration
+
+# 模型新增的列：(表名, 列名)。列类型取自模型定义，存量行的新列为 NULL。
+ADDED_COLUMNS: list[tuple[str, str]] = [
+    # 认证状态物化列（启动时由 services.verification 回填）
+    ("users", "student_verification"),
+    ("users", "teacher_verification"),
+    # 自动派单
+    ("match_requests", "dispatch_wave"),
+    ("match_requests", "dispatch_next_at"),
+    ("match_offers", "dispatch_wave"),
+    # 会话摘要与未读计数、一对一会话规范键（启动时由 services.conversations 回填）
+    ("conversations", "pair_key"),
+    ("conversations", "last_message_id"),
+    ("conversations", "last_message_at"),
+    ("conversations", "last_message_preview"),
+    ("conversation_participants", "peer_user_id"),
+    ("conversation_participants", "unread_count"),
+    ("conversation_participants", "last_message_at"),
+    # 通知合并
+    ("notifications", "group_key"),
+    ("notifications", "event_count"),
+    ("notifications", "actors"),
+    # 积分流水序号 (启动时由 services.points 回填并初始化余额)
+    ("point_transactions", "seq"),
+    ("point_balances", "rolled_seq"),
+]
+
+# 存量表上新增索引的表名 (ADDED_COLUMNS 涉及的表会自动补建索引，无需重复列出)
+ADDED_INDEX_TABLES: list[str] = [
+    "messages",
+    "notifications",
+    "community_posts",
+]
+
+
+# 按 (created_at, id) 键集分页的时间列。SQLite 以文本存储时间：server_default 写入的
+# "YYYY-MM-DD HH:MM:SS" 与应用写入的 "YYYY-MM-DD HH:MM:SS.ffffff" 按字符串比较时同一秒内顺序错乱，
+# 升级后首次启动时把存量的秒级值补齐为带微秒的格式 (每列只执行一次)
+KEYSET_TIMESTAMP_COLUMNS: list[tuple[str, str]] = [
+    ("messages", "created_at"),
+    ("notifications", "created_at"),
+    ("community_posts", "created_at"),
+]
+
+
+def _existing_columns(conn, table: str) -> set[str]:
+    return {str(c["name"]) for c in inspect(conn).get_columns(table)}
+
+
+def is_applied(conn: Connection, name: str) -> bool:
+    """一次性数据迁移是否已执行 (schema_migrations 中有记录)。"""
+    table = SchemaMigration.__table__
+    return conn.execute(table.select().where(table.c.name == name)).first() is not None
+
+
+def mark_applied(conn: Connection, name: str) -> None:
+    """记录一次性数据迁移已执行；多进程同时启动时重复记录不报错。"""
+    table = SchemaMigration.__table__
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    conn.execute(insert(table).values(name=name).on_conflict_do_nothing(index_elements=[table.c.name]))
 
 
 def ensure_schema(engine) -> None:
     url = str(getattr(engine, "url", ""))
-    if "sqlite" not in url:
-        return
+    if "sqlite" in url:
+        with engine.begin() as conn:
+            # 添加 conversation_participants.last_read_at
+            rows = conn.execute(text("PRAGMA table_info(conversation_participants)")).fetchall()
+            existing = {str(r[1]) for r in rows if r and len(r) > 1}
+            if "last_read_at" not in existing:
+                conn.execute(text("ALTER TABLE conversation_participants ADD COLUMN last_read_at DATETIME"))
+
+            # 添加 community_posts.hidden
+            rows = conn.execute(text("PRAGMA table_info(community_posts)")).fetchall()
+            existing = {str(r[1]) for r in rows if r and len(r) > 1}
+            if "hidden" not in existing:
+                conn.execute(text("ALTER TABLE community_posts ADD COLUMN hidden BOOLEAN DEFAULT 0"))
+
+            # 添加 qa_questions.hidden
+            rows = conn.execute(text("PRAGMA table_info(qa_questions)")).fetchall()
+            existing = {str(r[1]) for r in rows if r and len(r) > 1}
+            if "hidden" not in existing:
+                conn.execute(text("ALTER TABLE qa_questions ADD COLUMN hidden BOOLEAN DEFAULT 0"))
+
+            for table, col in KEYSET_TIMESTAMP_COLUMNS:
+                name = f"keyset_timestamp:{table}.{col}"
+                if not is_applied(conn, name):
+                    conn.execute(text(f"UPDATE {table} SET {col} = {col} || '.000000' WHERE length({col}) = 19"))
+                    mark_applied(conn, name)
 
+    # 以下迁移同时适用于 SQLite 与 PostgreSQL
     with engine.begin() as conn:
-        # 添加 conversation_participants.last_read_at
-        rows = conn.execute(text("PRAGMA table_info(conversation_participants)")).fetchall()
-        existing = {str(r[1]) for r in rows if r and len(r) > 1}
-        if "last_read_at" not in existing:
-            conn.execute(text("ALTER TABLE conversation_participants ADD COLUMN last_read_at DATETIME"))
-        
-        # 添加 community_posts.hidden
-        rows = conn.execute(text("PRAGMA table_info(community_posts)")).fetchall()
-        existing = {str(r[1]) for r in rows if r and len(r) > 1}
-        if "hidden" not in existing:
-            conn.execute(text("ALTER TABLE community_posts ADD COLUMN hidden BOOLEAN DEFAULT 0"))
-        
-        # 添加 qa_questions.hidden
-        rows = conn.execute(text("PRAGMA table_info(qa_questions)")).fetchall()
-        existing = {str(r[1]) for r in rows if r and len(r) > 1}
-        if "hidden" not in existing:
-            conn.execute(text("ALTER TABLE qa_questions ADD COLUMN hidden BOOLEAN DEFAULT 0"))
+        tables = sorted({t for t, _ in ADDED_COLUMNS})
+        for table in tables:
+            existing = _existing_columns(conn, table)
+            for t, col in ADDED_COLUMNS:
+                if t != table or col in existing:
+                    continue
+                col_type = Base.metadata.tables[table].c[col].type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
+        # 信息流部分索引按 hidden = false 过滤，存量 NULL 统一回填为 false (只执行一次)
+        if not is_applied(conn, "community_posts.hidden_not_null"):
+            conn.execute(text("UPDATE community_posts SET hidden = false WHERE hidden IS NULL"))
+            mark_applied(conn, "community_posts.hidden_not_null")
+        # 补建模型上声明但存量表中缺失的索引
+        for table in sorted(set(tables) | set(ADDED_INDEX_TABLES)):
+            for index in Base.metadata.tables[table].indexes:
+                index.create(conn, checkfirst=True)
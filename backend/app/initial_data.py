@@ -4,6 +4,8 @@ from app.db.session import SessionLocal, engine, Base
 from app.models.user import User, AdminRole
 from app.models.core import Organization, Tag
 from app.core.security import get_password_hash
+from app.services.points import grant_signup_bonus
+from app.services.verification import sync_columns
 import uuid
 
 logging.basicConfig(level=logging.INFO)
@@ -252,6 +254,7 @@ def init_db():
             user.is_superuser = user_data.get("is_superuser", False)
             user.onboarding_status = "approved"
             user.profile = json.dumps(profile_data, ensure_ascii=False)
+            sync_columns(user, profile_data)
 
             db.add(user)
             db.commit()
@@ -268,6 +271,8 @@ def init_db():
                     organization_id=role_data.get("organization_id"),
                 )
                 db.add(admin_role)
+            # 初始积分 (启用 POINTS_SIGNUP_BONUS 时入账，已发放过的用户跳过)
+            grant_signup_bonus(db, user.id)
             db.commit()
                 
         logger.info("Initialization completed successfully!")
@@ -2,6 +2,8 @@ from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
 from starlette.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.services import announcement_fanout, match_dispatch, notification_retention, point_rollups, pubsub
+from app.services import notifications as notifications_service
 import os
 
 # =============================================================================
@@ -52,5 +54,53 @@ from app.models import user, core, content, association, match, files, teacher_p
 Base.metadata.create_all(bind=engine)
 ensure_schema(engine)
 
+# 首次升级时回填物化数据：用户认证状态列、师资池标签索引、讲师负载计数、会话摘要、通知未读计数、积分余额、初始积分
+from app.db.session import SessionLocal
+from app.services.teacher_index import ensure_index
+from app.services.verification import backfill_columns
+from app.services.teacher_load import backfill as backfill_teacher_loads
+from app.services.conversations import backfill_pair_keys, backfill_summaries
+from app.services.notifications import reconcile_counters
+from app.services.points import backfill as backfill_point_balances
+from app.services.points import backfill_signup_bonus
+
+_db = SessionLocal()
+try:
+    backfill_columns(_db)
+    ensure_index(_db)
+    backfill_teacher_loads(_db)
+    backfill_summaries(_db)
+    backfill_pair_keys(_db)
+    reconcile_counters(_db)
+    backfill_point_balances(_db)
+    backfill_signup_bonus(_db)
+finally:
+    _db.close()
+
 # 挂载 V1 版本 API 路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+# -----------------------------------------------------------------------------
+# 后台线程：消息总线订阅 (Redis 协议后端时)、即时求助自动派单、通知未读计数校准、
+# 公告通知批量投递、过期通知清理 / 分区维护、积分日汇总。按顺序启动，逆序停止
+# -----------------------------------------------------------------------------
+background_workers = [
+    pubsub.broker,
+    *([match_dispatch.worker] if settings.MATCH_DISPATCH_ENABLED else []),
+    notifications_service.reconciler,
+    announcement_fanout.worker,
+    notification_retention.worker,
+    point_rollups.worker,
+]
+
+
+@app.on_event("startup")
+def start_background_workers():
+    for worker in background_workers:
+        worker.start()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    for worker in reversed(background_workers):
+        worker.stop()
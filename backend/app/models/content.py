@@ -1,6 +1,8 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Index, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.db.session import Base
 
 class CommunityPost(Base):
@@ -10,20 +12,33 @@ class CommunityPost(Base):
     功能：全站可见的动态信息流，支持点赞、评论和分享。
     """
     __tablename__ = "community_posts"
+    __table_args__ = (
+        # 信息流按 (created_at, id) 键集分页：全部帖子 (管理员查看隐藏内容)
+        Index("ix_community_posts_created_id", "created_at", "id"),
+        # 未隐藏帖子的部分索引 (PostgreSQL / SQLite)，查询条件需为 hidden = false
+        Index(
+            "ix_community_posts_visible_created_id",
+            "created_at",
+            "id",
+            postgresql_where=text("hidden = false"),
+            sqlite_where=text("hidden = 0"),
+        ),
+    )
     
     id = Column(String, primary_key=True, index=True)
     author_id = Column(String, index=True) # 发帖人 ID
     content = Column(Text)                 # 帖子内容
     tags = Column(String)                  # 标签列表 (JSON 字符串或逗号分隔)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 由应用写入带微秒的 UTC 时间 (同 Message.created_at)，信息流按 (created_at, id) 键集分页
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
     
     # 互动计数 (便于快速查询，实际业务中可配合 Redis 计数器)
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
     shares_count = Column(Integer, default=0)
     
-    # 管理员隐藏功能
-    hidden = Column(Boolean, default=False)
+    # 管理员隐藏功能 (存量 NULL 在启动迁移时回填为 false)
+    hidden = Column(Boolean, default=False, server_default=text("false"))
 
 
 class CommunityComment(Base):
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, DateTime, String
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -8,10 +10,21 @@ class Conversation(Base):
 
     id = Column(String, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 一对一会话的规范键 "较小用户ID:较大用户ID"，唯一索引保证同一对用户只有一个会话
+    pair_key = Column(String, nullable=True, unique=True, index=True)
+
+    # 会话摘要 (由 app.services.conversations 在写入消息时同步维护)
+    last_message_id = Column(String, nullable=True)                             # 最后一条消息 ID
+    last_message_at = Column(DateTime(timezone=True), nullable=True, index=True) # 最后一条消息时间
+    last_message_preview = Column(String, nullable=True)                        # 最后一条消息预览 (截断)
 
 
 class ConversationParticipant(Base):
     __tablename__ = "conversation_participants"
+    __table_args__ = (
+        # 会话列表：按用户取出参与记录并按最后消息时间倒序
+        Index("ix_conversation_participants_user_last_message", "user_id", "last_message_at"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     conversation_id = Column(String, index=True)
@@ -19,12 +32,21 @@ class ConversationParticipant(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_read_at = Column(DateTime(timezone=True), nullable=True)
 
+    peer_user_id = Column(String, nullable=True)                 # 一对一会话中的对方用户 ID
+    unread_count = Column(Integer, default=0)                    # 该参与者的未读消息数
+    last_message_at = Column(DateTime(timezone=True), nullable=True) # 会话最后消息时间 (冗余，用于排序)
+
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # 消息历史按 (created_at, id) 键集分页
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     conversation_id = Column(String, index=True)
     sender_id = Column(String, index=True)
     content = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 由应用写入带微秒的 UTC 时间：SQLite 的 server_default 只精确到秒，键集分页在同一秒内会错位
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, DateTime, Text
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -77,3 +77,51 @@ class Announcement(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     version = Column(String)                        # 版本号 (用于内容修订记录)
+
+
+class AnnouncementDelivery(Base):
+    """
+    公告通知投递进度 (Announcement Delivery)
+    对应数据库表：announcement_deliveries
+    功能：记录公告站内通知的后台批量投递任务，按受众用户 ID 顺序分批写入，
+    last_user_id 为已完成的位置，进程重启后从该位置继续。由 app.services.announcement_fanout 维护。
+    """
+    __tablename__ = "announcement_deliveries"
+
+    announcement_id = Column(String, primary_key=True)   # 公告 ID
+    # 状态: pending, running, done, failed
+    status = Column(String, default="pending", index=True)
+    total = Column(Integer, default=0)                   # 受众人数 (创建时统计)
+    delivered = Column(Integer, default=0)               # 已写入的通知数
+    last_user_id = Column(String, nullable=True)         # 已投递到的用户 ID (按 ID 升序)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ResourceVersion(Base):
+    """
+    资源版本号 (Resource Version)
+    对应数据库表：resource_versions
+    功能：被轮询的列表接口按资源键 (如 tags、notifications:<用户 ID>) 记录版本号，
+    资源变化时在同一事务内 +1；接口据此计算 ETag，If-None-Match 命中时直接返回 304。
+    由 app.services.resource_versions 维护。
+    """
+    __tablename__ = "resource_versions"
+
+    key = Column(String, primary_key=True)               # 资源键
+    version = Column(Integer, default=1)                 # 版本号 (单调递增)
+
+
+class SchemaMigration(Base):
+    """
+    一次性数据迁移记录 (Schema Migration Marker)
+    对应数据库表：schema_migrations
+    功能：启动时执行的一次性数据修正 (存量行回填、格式规范化) 完成后写入一行，
+    之后的启动据此跳过，不再对大表做全表扫描。由 app.db.auto_migrate 维护。
+    """
+    __tablename__ = "schema_migrations"
+
+    name = Column(String, primary_key=True)              # 迁移名称
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
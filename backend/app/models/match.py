@@ -1,5 +1,5 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Float
-from sqlalchemy.sql import func
+from sqlalchemy import Boolean, Column, Date, Index, Integer, String, DateTime, Text, Float
+from sqlalchemy.sql import func, text
 from app.db.session import Base
 
 # =============================================================================
@@ -10,18 +10,33 @@ class PointTxn(Base):
     """
     积分流水模型 (Point Transaction Model)
     对应数据库表：point_transactions
-    功能：记录用户积分的所有变动历史（不可变账本），余额通过聚合计算得出。
+    功能：记录用户积分的所有变动历史（不可变账本），余额物化在 point_balances 中。
     """
     __tablename__ = "point_transactions"
+    __table_args__ = (
+        # 每位用户的流水序号唯一，快照校验按序号区间求和
+        Index("ix_point_transactions_user_seq", "user_id", "seq", unique=True),
+        # 每位用户至多一笔初始积分 (部分唯一索引，并发发放时由数据库拒绝重复)
+        Index(
+            "ux_point_transactions_signup_bonus",
+            "user_id",
+            unique=True,
+            postgresql_where=text("type = 'signup_bonus'"),
+            sqlite_where=text("type = 'signup_bonus'"),
+        ),
+    )
     
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, index=True) # 关联用户 ID
+    seq = Column(Integer, nullable=True) # 该用户的流水序号 (从 1 连续递增，由 services.points 分配)
     
     # 交易类型:
     # - reward_in: 奖励收入 (如回答被采纳)
     # - reward_out: 悬赏支出 (如发布悬赏问题)
     # - redeem: 兑换支出 (如兑换商品)
     # - admin_adjust: 管理员调整
+    # - signup_bonus: 新用户初始积分
+    # - refund: 悬赏退还
     type = Column(String, index=True) 
     
     title = Column(String)               # 交易标题 (如 "最佳答案奖励")
@@ -29,6 +44,102 @@ class PointTxn(Base):
     meta = Column(String, nullable=True) # 元数据 (JSON 格式，如关联的 question_id)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+class PointBalance(Base):
+    """
+    积分余额 (Point Balance)
+    对应数据库表：point_balances
+    功能：每位用户一行，与每笔 PointTxn 在同一事务内原子更新，余额查询按主键读取。
+    txn_count 同时是该用户最新一笔流水的序号。由 app.services.points 维护。
+    """
+    __tablename__ = "point_balances"
+
+    user_id = Column(String, primary_key=True)           # 用户 ID
+    balance = Column(Integer, default=0)                 # 当前余额
+    txn_count = Column(Integer, default=0)               # 流水笔数 (= 最新流水序号)
+    rolled_seq = Column(Integer, default=0)              # 已汇总到日汇总表的流水序号 (汇总水位)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class PointSnapshot(Base):
+    """
+    积分余额快照 (Point Snapshot)
+    对应数据库表：point_snapshots
+    功能：每累计 POINTS_SNAPSHOT_INTERVAL 笔流水记录一次检查点 (序号与当时余额)，
+    账本校验只需核对相邻检查点之间的流水，已校验的检查点不再重复计算。
+    """
+    __tablename__ = "point_snapshots"
+    __table_args__ = (
+        Index("ix_point_snapshots_user_seq", "user_id", "seq", unique=True),
+    )
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)             # 用户 ID
+    seq = Column(Integer, nullable=False)                # 截至的流水序号
+    balance = Column(Integer, nullable=False)            # 截至该序号的余额
+    verified_at = Column(DateTime(timezone=True), nullable=True)  # 通过校验的时间
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PointDailyRollup(Base):
+    """
+    积分日汇总 (Point Daily Rollup)
+    对应数据库表：point_daily_rollups
+    功能：按 (UTC 日期, 用户) 汇总积分流水的收入/支出/笔数，排行榜与统计只读汇总表，
+    不扫描 point_transactions。由 app.services.point_rollups 按流水序号水位增量写入。
+    """
+    __tablename__ = "point_daily_rollups"
+    __table_args__ = (
+        Index("ix_point_daily_rollups_school_day", "school_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)                 # 日期 (UTC)
+    user_id = Column(String, primary_key=True)           # 用户 ID
+    school_id = Column(String, nullable=True)            # 汇总时用户所属高校
+    earned = Column(Integer, default=0)                  # 收入合计 (正数流水)
+    spent = Column(Integer, default=0)                   # 支出合计 (负数流水的绝对值)
+    txn_count = Column(Integer, default=0)               # 流水笔数
+
+
+class PointSchoolDailyRollup(Base):
+    """
+    高校积分日汇总 (Point School Daily Rollup)
+    对应数据库表：point_school_daily_rollups
+    功能：按 (UTC 日期, 高校) 汇总积分流向，无所属高校的用户不计入。
+    """
+    __tablename__ = "point_school_daily_rollups"
+
+    day = Column(Date, primary_key=True)                 # 日期 (UTC)
+    school_id = Column(String, primary_key=True)         # 高校 ID
+    earned = Column(Integer, default=0)                  # 收入合计
+    spent = Column(Integer, default=0)                   # 支出合计
+    txn_count = Column(Integer, default=0)               # 流水笔数
+
+
+class PointEscrow(Base):
+    """
+    积分托管 (Point Escrow)
+    对应数据库表：point_escrows
+    功能：悬赏等场景先从付款人余额中冻结积分 (held)，之后原子地结算给收款人 (settled)
+    或退还付款人 (refunded)。key 为幂等键 (唯一)，状态迁移使用条件更新，
+    冻结/结算/退款各自只会生效一次。由 app.services.escrow 维护。
+    """
+    __tablename__ = "point_escrows"
+
+    id = Column(String, primary_key=True)
+    key = Column(String, unique=True, nullable=False)    # 幂等键，如 qa_question:<问题 ID>
+    ref_type = Column(String, nullable=True)             # 关联对象类型，如 qa_question
+    ref_id = Column(String, nullable=True, index=True)   # 关联对象 ID
+    payer_id = Column(String, nullable=False, index=True)  # 付款人
+    amount = Column(Integer, nullable=False)             # 冻结积分 (正数)
+    # 状态: held (已冻结), settled (已结算), refunded (已退还)
+    status = Column(String, default="held", index=True)
+    payee_id = Column(String, nullable=True)             # 收款人 (结算后)
+    hold_txn_id = Column(String, nullable=True)          # 冻结时的扣款流水
+    release_txn_id = Column(String, nullable=True)       # 结算/退还时的入账流水
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    released_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class MatchRequest(Base):
     """
     匹配请求模型 (Match Request Model)
@@ -50,6 +161,10 @@ class MatchRequest(Base):
     status = Column(String, default="pending", index=True) 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # 自动派单 (仅 time_mode == now，见 app.services.match_dispatch)
+    dispatch_wave = Column(Integer, default=0)                                # 已发出的派单波次
+    dispatch_next_at = Column(DateTime(timezone=True), nullable=True, index=True) # 下一次推进时间，为空表示不再派单
+
 
 class MatchOffer(Base):
     __tablename__ = "match_offers"
@@ -58,6 +173,24 @@ class MatchOffer(Base):
     request_id = Column(String, index=True)
     student_id = Column(String, index=True)
     teacher_id = Column(String, index=True)
+    # 状态: pending, accepted, declined, expired(派单波次超时)
     status = Column(String, default="pending", index=True)
+    dispatch_wave = Column(Integer, nullable=True)  # 自动派单波次，手动发起的邀约为空
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class TeacherLoad(Base):
+    """
+    讲师负载计数 (Teacher Load Counters)
+    对应数据库表：teacher_loads
+    功能：增量维护每位讲师的待回复邀约数与近期接单数，供匹配排序做负载均衡，
+    避免每次排序对 match_offers 做 COUNT 聚合。由 app.services.teacher_load 维护。
+    """
+    __tablename__ = "teacher_loads"
+
+    user_id = Column(String, primary_key=True)           # 讲师用户 ID
+    pending_offers = Column(Integer, default=0)          # 待回复邀约数
+    recent_accepts = Column(Float, default=0.0)          # 近期接单数 (按时间指数衰减)
+    accepts_updated_at = Column(DateTime(timezone=True), nullable=True) # recent_accepts 的计算时间点
+    last_offer_at = Column(DateTime(timezone=True), nullable=True)      # 最近一次收到邀约的时间 (同分轮换)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.sql import func
 
 from app.db.session import Base
@@ -6,11 +8,37 @@ from app.db.session import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # 通知列表与 SSE 断线补发按 (created_at, id) 排序
+        Index("ix_notifications_user_created_id", "user_id", "created_at", "id"),
+        # 过期清理按创建时间扫描
+        Index("ix_notifications_created_at", "created_at"),
+        # 合并通知按 (用户, 合并键) 查找窗口内的未读行
+        Index("ix_notifications_user_group_created", "user_id", "group_key", "created_at"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), index=True)
     type = Column(String, index=True)
     payload = Column(Text, nullable=True)
     read_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 由应用写入带微秒的 UTC 时间 (同 Message.created_at)，SSE 补发按 (created_at, id) 比较
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
+    # 同类型、同目标的通知在合并窗口内合并为一行 (见 services.notifications.notify)
+    group_key = Column(String, nullable=True)            # 合并键，如 post:<id>；为空表示不合并
+    event_count = Column(Integer, default=1)             # 合并的事件数
+    actors = Column(Text, nullable=True)                 # 最近的触发者 JSON 列表 [{id, name}]
+
+
+class NotificationCounter(Base):
+    """
+    通知未读计数 (Notification Unread Counter)
+    对应数据库表：notification_counters
+    功能：增量维护每位用户的未读通知数，未读数接口按主键读取一行，
+    避免对 notifications 做 COUNT。由 app.services.notifications 维护并定期校准。
+    """
+    __tablename__ = "notification_counters"
 
+    user_id = Column(String, primary_key=True)           # 用户 ID
+    unread_count = Column(Integer, default=0)            # 未读通知数
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
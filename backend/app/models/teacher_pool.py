@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Integer, String
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -15,3 +15,33 @@ class TeacherPoolEntry(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
+
+class TeacherPoolTag(Base):
+    """
+    师资池标签倒排索引 (Teacher Pool Tag Index)
+    对应数据库表：teacher_pool_tags
+    功能：标签 -> 可匹配师资条目的倒排表，仅收录在池且讲师认证有效的条目。
+    由 app.services.teacher_index 维护，候选查询只扫描与需求共享标签的行。
+    """
+    __tablename__ = "teacher_pool_tags"
+
+    tag = Column(String, primary_key=True)                  # 标签名称
+    entry_id = Column(String, primary_key=True, index=True) # 关联 teacher_pool_entries.id
+    user_id = Column(String, index=True)                    # 讲师用户 ID (冗余，便于按用户清理)
+    school_id = Column(String, index=True)                  # 所属高校 ID (冗余，便于按学校清理)
+
+
+class TeacherPoolSlot(Base):
+    """
+    师资可用时间位图 (Teacher Pool Slot Bitmap)
+    对应数据库表：teacher_pool_slots
+    功能：按星期分桶存储可匹配师资条目的可用时间，每天 48 个半小时槽位编码为一个整数。
+    由 app.services.teacher_index 维护，预约类求助单据此计算时间重合度。
+    """
+    __tablename__ = "teacher_pool_slots"
+
+    entry_id = Column(String, primary_key=True)             # 关联 teacher_pool_entries.id
+    weekday = Column(Integer, primary_key=True, index=True) # 星期: 0=周一 ... 6=周日
+    mask = Column(BigInteger)                               # 当天槽位位图
+    user_id = Column(String, index=True)                    # 讲师用户 ID (冗余，便于按用户清理)
+    school_id = Column(String, index=True)                  # 所属高校 ID (冗余，便于按学校清理)
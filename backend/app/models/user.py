@@ -44,6 +44,11 @@ class User(Base):
     
     # Extended Profile (JSON string)
     profile = Column(Text, nullable=True)
+
+    # 认证状态物化列 (与 profile.verification 同步，见 app.services.verification)
+    # 取值：none, verified, rejected
+    student_verification = Column(String, default="none", index=True)
+    teacher_verification = Column(String, default="none", index=True)
     
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now()) # 注册时间
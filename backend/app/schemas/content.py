@@ -37,6 +37,7 @@ class PostAuthor(BaseModel):
 
 class CommunityPostWithAuthor(CommunityPost):
     author: Optional[PostAuthor] = None
+    cursor: Optional[str] = None  # 键集分页游标，作为下一页的 before 参数
 
 # -----------------------------------------------------------------------------
 # Community Comment (公共社区评论)
@@ -37,3 +37,4 @@ class MessageOut(BaseModel):
     sender: MessageSender
     content: str
     created_at: datetime
+    cursor: Optional[str] = None  # 该消息的分页游标，可作为 before/after 参数
@@ -73,5 +73,6 @@ class Announcement(AnnouncementBase):
     created_by_user: Optional[dict] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    delivery: Optional[dict] = None        # 站内通知投递进度 (仅发布时返回)
     class Config:
         from_attributes = True
@@ -10,6 +10,9 @@ class NotificationOut(BaseModel):
     payload: Any = None
     read_at: Optional[datetime] = None
     created_at: datetime
+    cursor: Optional[str] = None
+    count: int = 1
+    actors: list[dict] = []
 
     class Config:
         from_attributes = True
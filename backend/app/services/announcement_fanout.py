@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.core import Announcement, AnnouncementDelivery
+from app.models.user import User
+from app.services import notifications
+from app.services.verification import verified_teacher_clause
+from app.services.workers import QueueWorker
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 公告通知批量投递 (Announcement Fan-out)
+# 功能：公告发布接口只登记投递任务 (announcement_deliveries) 并立即返回，
+# 后台线程按用户 ID 顺序分批 (ANNOUNCEMENT_FANOUT_BATCH_SIZE) 读取受众，
+# 用 notifications.notify_many 批量写入通知与未读计数，每批一个事务并记录进度，
+# 进程重启后从 last_user_id 继续；受众人数不设上限。
+# 多进程部署时通过条件更新抢占任务，长时间未更新进度的 running 任务视为中断并重新领取。
+# =============================================================================
+
+NOTIFICATION_TYPE = "announcement_published"
+STALE_AFTER = timedelta(minutes=5)
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def audience_clause(ann: Announcement):
+    """公告的站内通知受众 (不含发布人)；无需逐人通知的公告返回 None。"""
+    if ann.scope != "campus" or not ann.school_id:
+        return None
+    if ann.audience == "campus_all":
+        return and_(User.school_id == ann.school_id, User.is_active == True, User.id != ann.created_by)
+    if ann.audience == "association_teachers_only":
+        return and_(User.school_id == ann.school_id, verified_teacher_clause(), User.id != ann.created_by)
+    return None
+
+
+def schedule(db: Session, ann: Announcement) -> Optional[AnnouncementDelivery]:
+    """在发布公告的事务内登记投递任务 (commit 后再 enqueue)，无受众时返回 None。"""
+    clause = audience_clause(ann)
+    if clause is None:
+        return None
+    delivery = AnnouncementDelivery(
+        announcement_id=ann.id,
+        status="pending",
+        total=int(db.query(func.count(User.id)).filter(clause).scalar() or 0),
+        delivered=0,
+    )
+    db.add(delivery)
+    return delivery
+
+
+def delivery_out(delivery: Optional[AnnouncementDelivery]) -> Optional[dict]:
+    if delivery is None:
+        return None
+    return {
+        "status": delivery.status,
+        "total": int(delivery.total or 0),
+        "delivered": int(delivery.delivered or 0),
+        "error": delivery.error,
+        "finished_at": delivery.finished_at,
+    }
+
+
+def _claim(db: Session, announcement_id: str, now: datetime) -> bool:
+    claimed = (
+        db.query(AnnouncementDelivery)
+        .filter(AnnouncementDelivery.announcement_id == announcement_id)
+        .filter(
+            or_(
+                AnnouncementDelivery.status == "pending",
+                and_(AnnouncementDelivery.status == "running", AnnouncementDelivery.updated_at < now - STALE_AFTER),
+            )
+        )
+        .update({AnnouncementDelivery.status: "running", AnnouncementDelivery.updated_at: now}, synchronize_session=False)
+    )
+    db.commit()
+    return bool(claimed)
+
+
+def run(db: Session, announcement_id: str, batch_size: Optional[int] = None) -> int:
+    """执行 (或继续) 一个投递任务，返回本次写入的通知数；任务已被其他进程领取时返回 0。"""
+    if not _claim(db, announcement_id, _utcnow()):
+        return 0
+    batch_size = batch_size or settings.ANNOUNCEMENT_FANOUT_BATCH_SIZE
+    delivery = db.query(AnnouncementDelivery).filter(AnnouncementDelivery.announcement_id == announcement_id).first()
+    ann = db.query(Announcement).filter(Announcement.id == announcement_id).first()
+    clause = audience_clause(ann) if ann else None
+    if clause is None:
+        delivery.status = "done"
+        delivery.finished_at = _utcnow()
+        db.commit()
+        return 0
+
+    publisher = db.query(User).filter(User.id == ann.created_by).first()
+    payload = {
+        "announcement_id": ann.id,
+        "title": ann.title,
+        "scope": ann.scope,
+        "publisher_id": ann.created_by,
+        "publisher_name": (publisher.full_name or publisher.username) if publisher else None,
+    }
+    written = 0
+    last_user_id = delivery.last_user_id or ""
+    while True:
+        user_ids = [
+            r[0]
+            for r in db.query(User.id)
+            .filter(clause)
+            .filter(User.id > last_user_id)
+            .order_by(User.id)
+            .limit(batch_size)
+            .all()
+        ]
+        now = _utcnow()
+        if not user_ids:
+            delivery.status = "done"
+            delivery.finished_at = now
+            delivery.updated_at = now
+            db.commit()
+            return written
+        written += notifications.notify_many(db, user_ids, NOTIFICATION_TYPE, payload)
+        last_user_id = user_ids[-1]
+        delivery.last_user_id = last_user_id
+        delivery.delivered = int(delivery.delivered or 0) + len(user_ids)
+        delivery.updated_at = now
+        db.commit()
+
+
+def resumable_ids(db: Session, now: Optional[datetime] = None, limit: int = 100) -> list[str]:
+    """等待执行或已中断的投递任务。"""
+    now = now or _utcnow()
+    rows = (
+        db.query(AnnouncementDelivery.announcement_id)
+        .filter(
+            or_(
+                AnnouncementDelivery.status == "pending",
+                and_(AnnouncementDelivery.status == "running", AnnouncementDelivery.updated_at < now - STALE_AFTER),
+            )
+        )
+        .order_by(AnnouncementDelivery.created_at)
+        .limit(limit)
+        .all()
+    )
+    return [r[0] for r in rows]
+
+
+class FanoutWorker(QueueWorker):
+    """后台投递线程：处理队列中的公告，启动时及每隔 POLL_SECONDS 扫描待执行或中断的任务。"""
+
+    name = "announcement-fanout"
+    scan_at_start = True
+    POLL_SECONDS = 30.0
+
+    def poll_seconds(self) -> float:
+        return self.POLL_SECONDS
+
+    def scan_ids(self, db: Session) -> list[str]:
+        return resumable_ids(db)
+
+    def handle(self, db: Session, announcement_id: str) -> None:
+        run(db, announcement_id)
+
+    def on_failure(self, db: Session, announcement_id: str, exc: Exception) -> None:
+        # 记录失败本身也可能出错 (数据库被锁、连接断开)：只记日志，不能让投递线程退出
+        try:
+            db.rollback()
+            db.query(AnnouncementDelivery).filter(AnnouncementDelivery.announcement_id == announcement_id).update(
+                {AnnouncementDelivery.status: "failed", AnnouncementDelivery.error: str(exc)[:500]},
+                synchronize_session=False,
+            )
+            db.commit()
+        except Exception:
+            logger.exception("failed to record fan-out failure for %s", announcement_id)
+
+
+worker = FanoutWorker()
+
+
+def enqueue(announcement_id: str) -> None:
+    worker.enqueue(announcement_id)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services import pubsub
+
+# =============================================================================
+# 候选讲师缓存 (Candidate Cache)
+# 功能：缓存每个匹配请求的候选排序结果 [(分数, 师资条目 ID)]，
+# 重复查看同一请求时只需按 ID 加载 limit 个条目。
+# 缓存键 = 请求 ID + 请求内容指纹 (标签/时间) + 师资池版本号：
+# - 求助单标签或时间段变化后指纹不同，自然失效；
+# - 师资池索引或讲师认证状态变化的事务提交后版本号递增，旧结果全部失效；
+# - 请求被接受或不再派单 (状态离开 pending) 后由 invalidate_request 删除该请求的条目。
+# 采用 LRU + TTL 淘汰；版本号为进程内计数，提交后经消息总线 (pubsub) 通知其他进程同步失效，
+# 总线不可用时由 TTL 兜底。
+# =============================================================================
+
+_POOL_DIRTY_KEY = "candidate_pool_dirty"
+CHANNEL = "match.pool"
+# 本进程标识：本地已立即失效，忽略自己发出的广播
+_ORIGIN = f"{os.getpid()}:{id(object())}"
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, tuple[float, list[tuple[float, str]]]]" = OrderedDict()
+_pool_version = 0
+
+
+def pool_version() -> int:
+    return _pool_version
+
+
+def bump_pool_version() -> None:
+    global _pool_version
+    with _lock:
+        _pool_version += 1
+        _entries.clear()
+
+
+def _pool_changed() -> None:
+    bump_pool_version()
+    pubsub.publish(CHANNEL, {"origin": _ORIGIN})
+
+
+def _on_pool_changed(message: dict) -> None:
+    if message.get("origin") != _ORIGIN:
+        bump_pool_version()
+
+
+pubsub.subscribe(CHANNEL, _on_pool_changed)
+
+
+def mark_pool_dirty(db: Optional[Session]) -> None:
+    """标记当前事务修改了师资池，事务提交后再递增版本号，避免缓存未提交的数据。"""
+    if db is None:
+        _pool_changed()
+        return
+    db.info[_POOL_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_POOL_DIRTY_KEY, False):
+        _pool_changed()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_POOL_DIRTY_KEY, None)
+
+
+def request_key(request) -> str:
+    """缓存键：请求 ID + 影响排序的字段指纹 + 师资池版本号。"""
+    fingerprint = hashlib.sha1(
+        "\x1f".join(str(x or "") for x in (request.tags, request.time_mode, request.time_slots)).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"{request.id}:{fingerprint}:{_pool_version}"
+
+
+def get(key: str) -> Optional[list[tuple[float, str]]]:
+    with _lock:
+        item = _entries.get(key)
+        if item is None:
+            return None
+        expires_at, ranked = item
+        if expires_at < time.monotonic():
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return ranked
+
+
+def put(key: str, ranked: list[tuple[float, str]]) -> None:
+    if settings.MATCH_CANDIDATE_CACHE_SIZE <= 0:
+        return
+    with _lock:
+        # 计算期间版本号已变化时不再写入
+        if not key.endswith(f":{_pool_version}"):
+            return
+        _entries[key] = (time.monotonic() + settings.MATCH_CANDIDATE_CACHE_TTL_SECONDS, ranked)
+        _entries.move_to_end(key)
+        while len(_entries) > settings.MATCH_CANDIDATE_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def invalidate_request(request_id: str) -> None:
+    """删除某个请求的全部缓存条目 (在改变请求状态的事务提交后调用)。"""
+    prefix = f"{request_id}:"
+    with _lock:
+        for key in [k for k in _entries if k.startswith(prefix)]:
+            del _entries[key]
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
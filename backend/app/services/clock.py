@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+# =============================================================================
+# 时间换算 (Clock)
+# 功能：服务层统一用不带时区的 UTC 时间 (datetime.utcnow()) 比较与计算。
+# DateTime(timezone=True) 列在 PostgreSQL 上按会话时区返回带时区的值 (SQLite 返回不带时区的值)，
+# 直接 replace(tzinfo=None) 会在非 UTC 的会话时区下偏移一个时区差，需先换算到 UTC。
+# =============================================================================
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """把数据库读出的时间换算为不带时区的 UTC 时间；不带时区的值视为 UTC，原样返回。"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
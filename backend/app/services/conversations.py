@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import base64
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.conversation import Conversation, ConversationParticipant, Message
+from app.models.user import User
+from app.services import realtime, resource_versions
+
+# =============================================================================
+# 会话摘要 (Conversation Summary)
+# 功能：在写入消息的同一事务内维护会话的最后消息 (ID/时间/预览)
+# 以及每位参与者的未读计数、对方用户 ID 和排序用的最后消息时间 (初始为会话创建时间)，
+# 会话列表只需按 (user_id, last_message_at) 索引做一次联表查询。
+# 所有写入 Message 的路径都应调用 record_message，由调用方负责 commit。
+# 一对一会话通过 pair_key (排序后的双方用户 ID) 唯一索引查找与去重。
+# 事务提交后通过 publish_* 把新消息与已读状态实时推送给参与者 (见 realtime)。
+# =============================================================================
+
+PREVIEW_LENGTH = 100
+
+
+def _preview(content: Optional[str]) -> str:
+    text = " ".join((content or "").split())
+    return text if len(text) <= PREVIEW_LENGTH else text[: PREVIEW_LENGTH - 1] + "…"
+
+
+def pair_key(user_id: str, peer_user_id: str) -> str:
+    a, b = sorted((user_id, peer_user_id))
+    return f"{a}:{b}"
+
+
+def find_direct(db: Session, user_id: str, peer_user_id: str) -> Optional[Conversation]:
+    return db.query(Conversation).filter(Conversation.pair_key == pair_key(user_id, peer_user_id)).first()
+
+
+def get_or_create_direct(db: Session, user_id: str, peer_user_id: str) -> Conversation:
+    """
+    查找或创建两人之间的一对一会话。创建时会提交当前事务；
+    并发创建由 pair_key 唯一索引去重，冲突方回滚后读取已存在的会话。
+    """
+    existing = find_direct(db, user_id, peer_user_id)
+    if existing:
+        return existing
+    conv = create_direct(db, user_id, peer_user_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = find_direct(db, user_id, peer_user_id)
+        if existing is None:
+            raise
+        return existing
+    db.refresh(conv)
+    return conv
+
+
+def create_direct(db: Session, user_id: str, peer_user_id: str) -> Conversation:
+    """创建一对一会话及双方参与记录 (不提交)。"""
+    now = datetime.utcnow()
+    conv = Conversation(id=str(uuid.uuid4()), pair_key=pair_key(user_id, peer_user_id))
+    db.add(conv)
+    for uid, peer in ((user_id, peer_user_id), (peer_user_id, user_id)):
+        db.add(
+            ConversationParticipant(
+                id=str(uuid.uuid4()),
+                conversation_id=conv.id,
+                user_id=uid,
+                peer_user_id=peer,
+                unread_count=0,
+                last_message_at=now,
+            )
+        )
+    return conv
+
+
+def record_message(db: Session, msg: Message) -> None:
+    """写入消息后更新会话摘要：最后消息、参与者排序时间、其他参与者未读数 +1。"""
+    if msg.created_at is None:
+        msg.created_at = datetime.utcnow()
+    db.flush()
+    (
+        db.query(Conversation)
+        .filter(Conversation.id == msg.conversation_id)
+        .update(
+            {
+                Conversation.last_message_id: msg.id,
+                Conversation.last_message_at: msg.created_at,
+                Conversation.last_message_preview: _preview(msg.content),
+            },
+            synchronize_session=False,
+        )
+    )
+    participants = db.query(ConversationParticipant).filter(
+        ConversationParticipant.conversation_id == msg.conversation_id
+    )
+    participants.update({ConversationParticipant.last_message_at: msg.created_at}, synchronize_session=False)
+    participants.filter(ConversationParticipant.user_id != msg.sender_id).update(
+        {ConversationParticipant.unread_count: func.coalesce(ConversationParticipant.unread_count, 0) + 1},
+        synchronize_session=False,
+    )
+    resource_versions.touch(
+        db, *[resource_versions.conversations_key(uid) for uid in member_ids(db, msg.conversation_id)]
+    )
+
+
+def member_ids(db: Session, conversation_id: str) -> list[str]:
+    return [
+        r[0]
+        for r in db.query(ConversationParticipant.user_id)
+        .filter(ConversationParticipant.conversation_id == conversation_id)
+        .all()
+    ]
+
+
+def encode_cursor(msg: Message) -> Optional[str]:
+    """消息 (及其他按 created_at, id 排序的记录，如通知、社区帖子) 的不透明分页游标：base64(created_at|id)。"""
+    if msg.created_at is None:
+        return None
+    raw = f"{msg.created_at.isoformat()}|{msg.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """解析分页游标，格式错误时抛出 ValueError。"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        created_at, msg_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), msg_id
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def keyset_clause(created_at_col, id_col, cursor: str, newer: bool = False):
+    """
+    (created_at, id) 键集条件：排在游标所指记录之前 (newer 时为之后) 的记录。
+    消息、通知补发与社区信息流共用；游标格式错误时抛出 ValueError。
+    """
+    at, key = decode_cursor(cursor)
+    if newer:
+        return or_(created_at_col > at, and_(created_at_col == at, id_col > key))
+    return or_(created_at_col < at, and_(created_at_col == at, id_col < key))
+
+
+def message_page(
+    db: Session,
+    conversation_id: str,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> list[Message]:
+    """
+    按 (created_at, id) 键集分页读取消息，结果按时间正序返回：
+    - before：早于游标的最近 limit 条 (向上翻历史)；
+    - after：晚于游标的最早 limit 条 (补齐新消息)；
+    - 都不传时返回最新的 limit 条。
+    """
+    q = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if after:
+        q = q.filter(keyset_clause(Message.created_at, Message.id, after, newer=True))
+        return q.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit).all()
+    if before:
+        q = q.filter(keyset_clause(Message.created_at, Message.id, before))
+    rows = q.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).all()
+    return list(reversed(rows))
+
+
+def message_out(msg: Message, sender: Optional[User]) -> dict:
+    """消息的接口输出格式 (MessageOut)，实时推送的 message.created 事件复用此格式。"""
+    return {
+        "id": msg.id,
+        "conversation_id": msg.conversation_id,
+        "sender": {
+            "id": sender.id if sender else msg.sender_id,
+            "username": sender.username if sender else "",
+            "full_name": sender.full_name if sender else None,
+        },
+        "content": msg.content,
+        "created_at": msg.created_at,
+        "cursor": encode_cursor(msg),
+    }
+
+
+def publish_message(db: Session, msg: Message, sender: Optional[User]) -> None:
+    """提交后向会话参与者推送新消息。"""
+    realtime.publish(
+        member_ids(db, msg.conversation_id),
+        {"type": "message.created", "conversation_id": msg.conversation_id, "message": message_out(msg, sender)},
+    )
+
+
+def publish_read(db: Session, participant: ConversationParticipant) -> None:
+    """提交后向会话参与者推送已读状态变化。"""
+    realtime.publish(
+        member_ids(db, participant.conversation_id),
+        {
+            "type": "conversation.read",
+            "conversation_id": participant.conversation_id,
+            "user_id": participant.user_id,
+            "last_read_at": participant.last_read_at,
+        },
+    )
+
+
+def mark_read(db: Session, participant: ConversationParticipant, now: Optional[datetime] = None) -> None:
+    participant.last_read_at = now or datetime.utcnow()
+    participant.unread_count = 0
+    db.add(participant)
+
+
+def inbox(db: Session, user_id: str, limit: Optional[int] = None) -> list[dict]:
+    """当前用户的会话列表，按最后消息时间 (无消息时为会话创建时间) 倒序。"""
+    q = (
+        db.query(ConversationParticipant, Conversation, User)
+        .join(Conversation, Conversation.id == ConversationParticipant.conversation_id)
+        .outerjoin(User, User.id == ConversationParticipant.peer_user_id)
+        .filter(ConversationParticipant.user_id == user_id)
+        .order_by(ConversationParticipant.last_message_at.desc())
+    )
+    if limit:
+        q = q.limit(limit)
+    result: list[dict] = []
+    for p, conv, peer in q.all():
+        result.append(
+            {
+                "id": conv.id,
+                "peer_user": (
+                    {"id": peer.id, "username": peer.username, "full_name": peer.full_name}
+                    if peer
+                    else None
+                ),
+                "last_message": conv.last_message_preview,
+                "last_message_at": conv.last_message_at,
+                "unread_count": int(p.unread_count or 0),
+            }
+        )
+    return result
+
+
+def unread_conversations_count(db: Session, user_id: str) -> int:
+    return (
+        db.query(func.count(ConversationParticipant.id))
+        .filter(ConversationParticipant.user_id == user_id)
+        .filter(ConversationParticipant.unread_count > 0)
+        .scalar()
+        or 0
+    )
+
+
+def backfill_pair_keys(db: Session, batch_size: int = 500) -> int:
+    """
+    为升级前的两人会话回填 pair_key，返回回填数量。
+    历史上并发产生的重复会话在全表范围内按 (created_at, id) 只有最早创建的一个获得 pair_key，其余保留为普通会话。
+    """
+    members = (
+        db.query(
+            ConversationParticipant.conversation_id.label("conversation_id"),
+            func.min(ConversationParticipant.user_id).label("lo"),
+            func.max(ConversationParticipant.user_id).label("hi"),
+        )
+        .group_by(ConversationParticipant.conversation_id)
+        .having(func.count(ConversationParticipant.user_id) == 2)
+        .subquery()
+    )
+    rank = (
+        func.row_number()
+        .over(
+            partition_by=(members.c.lo, members.c.hi),
+            order_by=(Conversation.created_at.is_(None), Conversation.created_at, Conversation.id),
+        )
+        .label("rank")
+    )
+    ranked = (
+        db.query(Conversation.id.label("id"), members.c.lo, members.c.hi, rank)
+        .join(members, members.c.conversation_id == Conversation.id)
+        .filter(Conversation.pair_key.is_(None))
+        .filter(members.c.lo != members.c.hi)
+        .subquery()
+    )
+    winners = db.query(ranked.c.id, ranked.c.lo, ranked.c.hi).filter(ranked.c.rank == 1).all()
+    taken = {r[0] for r in db.query(Conversation.pair_key).filter(Conversation.pair_key.isnot(None)).all()}
+    pending = [(cid, pair_key(lo, hi)) for cid, lo, hi in winners if pair_key(lo, hi) not in taken]
+    for i in range(0, len(pending), batch_size):
+        for cid, key in pending[i : i + batch_size]:
+            db.query(Conversation).filter(Conversation.id == cid).update(
+                {Conversation.pair_key: key}, synchronize_session=False
+            )
+        db.commit()
+    return len(pending)
+
+
+def backfill_summaries(db: Session, batch_size: int = 200) -> int:
+    """为升级前的存量会话回填摘要与参与者计数，返回处理的参与记录数。"""
+    while True:
+        convs = (
+            db.query(Conversation)
+            .filter(Conversation.last_message_id.is_(None))
+            .filter(Conversation.id.in_(db.query(Message.conversation_id)))
+            .limit(batch_size)
+            .all()
+        )
+        if not convs:
+            break
+        for conv in convs:
+            last = (
+                db.query(Message)
+                .filter(Message.conversation_id == conv.id)
+                .order_by(Message.created_at.desc(), Message.id.desc())
+                .first()
+            )
+            conv.last_message_id = last.id
+            conv.last_message_at = last.created_at
+            conv.last_message_preview = _preview(last.content)
+            db.add(conv)
+        db.commit()
+
+    done = 0
+    min_dt = datetime(1970, 1, 1)
+    while True:
+        parts = (
+            db.query(ConversationParticipant)
+            .filter(ConversationParticipant.unread_count.is_(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not parts:
+            return done
+        for p in parts:
+            conv = db.query(Conversation).filter(Conversation.id == p.conversation_id).first()
+            peer = (
+                db.query(ConversationParticipant.user_id)
+                .filter(ConversationParticipant.conversation_id == p.conversation_id)
+                .filter(ConversationParticipant.user_id != p.user_id)
+                .first()
+            )
+            p.peer_user_id = peer[0] if peer else None
+            p.last_message_at = (conv.last_message_at or conv.created_at) if conv else None
+            p.unread_count = (
+                db.query(func.count(Message.id))
+                .filter(Message.conversation_id == p.conversation_id)
+                .filter(Message.sender_id != p.user_id)
+                .filter(Message.created_at > (p.last_read_at or min_dt))
+                .scalar()
+                or 0
+            )
+            db.add(p)
+        db.commit()
+        done += len(parts)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.match import PointEscrow
+from app.services import points
+
+# =============================================================================
+# 积分托管 (Point Escrow)
+# 功能：悬赏积分先冻结、后结算或退还，全部通过 points.record 写入账本 (由调用方负责 commit)：
+# - hold：带余额条件扣款 (余额不足时抛出 points.InsufficientPoints) 并登记托管记录，
+#   托管的 key 唯一，同一幂等键重复提交时由唯一索引拒绝，调用方回滚后读取已有记录；
+# - settle / refund：以 "status == held" 为条件的 UPDATE 抢占状态迁移 (乐观并发)，
+#   只有抢占成功的事务写入入账流水，重复或并发的请求直接返回当前状态。
+# 结算只锁定托管行与收款人的余额行，不再触碰付款人余额，大量悬赏同时结算时互不阻塞。
+# =============================================================================
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def escrow_key(ref_type: str, ref_id: str) -> str:
+    return f"{ref_type}:{ref_id}"
+
+
+def find(db: Session, key: str) -> Optional[PointEscrow]:
+    return db.query(PointEscrow).filter(PointEscrow.key == key).first()
+
+
+def find_by_ref(db: Session, ref_type: str, ref_id: str) -> Optional[PointEscrow]:
+    return (
+        db.query(PointEscrow)
+        .filter(PointEscrow.ref_type == ref_type, PointEscrow.ref_id == ref_id)
+        .first()
+    )
+
+
+def hold(
+    db: Session,
+    key: str,
+    payer_id: str,
+    amount: int,
+    title: str,
+    ref_type: Optional[str] = None,
+    ref_id: Optional[str] = None,
+) -> PointEscrow:
+    """冻结积分并登记托管 (不提交)。同一 key 已存在时直接返回已有记录。"""
+    existing = find(db, key)
+    if existing is not None:
+        return existing
+    txn = points.record(
+        db,
+        payer_id,
+        -int(amount),
+        "reward_out",
+        title,
+        {"escrow_key": key, "ref_type": ref_type, "ref_id": ref_id},
+        require_funds=True,
+    )
+    escrow = PointEscrow(
+        id=str(uuid.uuid4()),
+        key=key,
+        ref_type=ref_type,
+        ref_id=ref_id,
+        payer_id=payer_id,
+        amount=int(amount),
+        status="held",
+        hold_txn_id=txn.id,
+    )
+    db.add(escrow)
+    return escrow
+
+
+def _release(db: Session, escrow: PointEscrow, status: str, payee_id: str) -> bool:
+    now = _utcnow()
+    claimed = (
+        db.query(PointEscrow)
+        .filter(PointEscrow.id == escrow.id, PointEscrow.status == "held")
+        .update(
+            {PointEscrow.status: status, PointEscrow.payee_id: payee_id, PointEscrow.released_at: now},
+            synchronize_session=False,
+        )
+    )
+    if not claimed:
+        db.refresh(escrow)
+        return False
+    txn = points.record(
+        db,
+        payee_id,
+        int(escrow.amount),
+        "reward_in" if status == "settled" else "refund",
+        ("悬赏奖励" if status == "settled" else "悬赏退还") + (f"：{escrow.ref_id}" if escrow.ref_id else ""),
+        {"escrow_key": escrow.key, "ref_type": escrow.ref_type, "ref_id": escrow.ref_id},
+    )
+    escrow.status = status
+    escrow.payee_id = payee_id
+    escrow.released_at = now
+    escrow.release_txn_id = txn.id
+    db.add(escrow)
+    return True
+
+
+def settle(db: Session, escrow: PointEscrow, payee_id: str) -> bool:
+    """把托管积分结算给收款人 (不提交)，返回本次是否生效；收款人为付款人本人时视为退还。"""
+    if payee_id == escrow.payer_id:
+        return refund(db, escrow)
+    return _release(db, escrow, "settled", payee_id)
+
+
+def refund(db: Session, escrow: PointEscrow) -> bool:
+    """把托管积分退还付款人 (不提交)，返回本次是否生效。"""
+    return _release(db, escrow, "refunded", escrow.payer_id)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services import pubsub
+
+# =============================================================================
+# 内容列表响应缓存 (Feed Cache)
+# 功能：缓存公共社区帖子列表与问答列表中与用户无关的查询结果 (不含隐藏内容的列表)，
+# 落地页的突发访问直接由内存返回，不再查询数据库。
+# 缓存键 = 列表名 + 查询参数 + 该列表的版本号：
+# - 帖子/问题的发布、删除、隐藏切换以及列表中展示的计数 (评论数、回答数、解决状态) 变化时，
+#   写入方调用 mark_dirty，事务提交后版本号递增并清空该列表的缓存；
+# - 查询期间版本号已变化时不写入，避免把提交前读到的旧结果放回缓存。
+# 采用 LRU + TTL 淘汰；提交后经消息总线 (pubsub) 通知其他进程同步失效，总线不可用时由 TTL 兜底。
+# =============================================================================
+
+COMMUNITY_POSTS = "community_posts"
+QA_QUESTIONS = "qa_questions"
+
+_DIRTY_KEY = "feed_cache_dirty"
+CHANNEL = "content.feed"
+# 本进程标识：本地已立即失效，忽略自己发出的广播
+_ORIGIN = f"{os.getpid()}:{id(object())}"
+
+_lock = threading.Lock()
+_entries: "OrderedDict[tuple, tuple[float, Any]]" = OrderedDict()
+_versions: dict[str, int] = {}
+
+
+def _bump(feeds: list[str]) -> None:
+    with _lock:
+        for feed in feeds:
+            _versions[feed] = _versions.get(feed, 0) + 1
+        for key in [k for k in _entries if k[0] in feeds]:
+            del _entries[key]
+
+
+def _changed(feeds: list[str]) -> None:
+    _bump(feeds)
+    pubsub.publish(CHANNEL, {"origin": _ORIGIN, "feeds": feeds})
+
+
+def _on_changed(message: dict) -> None:
+    if message.get("origin") != _ORIGIN:
+        _bump([str(f) for f in message.get("feeds") or []])
+
+
+pubsub.subscribe(CHANNEL, _on_changed)
+
+
+def mark_dirty(db: Optional[Session], *feeds: str) -> None:
+    """标记当前事务修改了列表内容，事务提交后再使缓存失效。"""
+    if db is None:
+        _changed(sorted(set(feeds)))
+        return
+    db.info.setdefault(_DIRTY_KEY, set()).update(feeds)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    feeds = session.info.pop(_DIRTY_KEY, None)
+    if feeds:
+        _changed(sorted(feeds))
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def key(feed: str, *params: Any) -> tuple:
+    """缓存键：列表名 + 查询参数 + 当前版本号 (在查询数据库之前取得)。"""
+    with _lock:
+        return (feed, _versions.get(feed, 0)) + tuple(params)
+
+
+def get(cache_key: tuple) -> Optional[Any]:
+    with _lock:
+        item = _entries.get(cache_key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del _entries[cache_key]
+            return None
+        _entries.move_to_end(cache_key)
+        return value
+
+
+def put(cache_key: tuple, value: Any) -> None:
+    if settings.CONTENT_FEED_CACHE_SIZE <= 0:
+        return
+    with _lock:
+        # 查询期间版本号已变化时不再写入
+        if _versions.get(cache_key[0], 0) != cache_key[1]:
+            return
+        _entries[cache_key] = (time.monotonic() + settings.CONTENT_FEED_CACHE_TTL_SECONDS, value)
+        _entries.move_to_end(cache_key)
+        while len(_entries) > settings.CONTENT_FEED_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
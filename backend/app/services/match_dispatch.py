@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.match import MatchOffer, MatchRequest
+from app.services import candidate_cache, matching, notifications, resource_versions, teacher_load
+from app.services.clock import naive_utc
+from app.services.workers import QueueWorker
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 即时求助自动派单 (Match Auto-Dispatch)
+# 功能：进程内后台线程从队列中取出 time_mode == now 的匹配请求，
+# 按排序 (含负载均衡) 结果分波次向前 K 位讲师发出 MatchOffer；一波超时 (或全部被拒) 后
+# 过期该波邀约并发出下一波，超过最大波次后停止并通知学生。
+# 派单进度保存在 match_requests.dispatch_wave / dispatch_next_at 中，
+# 进程重启后由周期扫描继续推进；多进程部署时通过条件更新抢占同一波次。
+# =============================================================================
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def _is_due(db: Session, req: MatchRequest, now: datetime) -> bool:
+    """到达超时时间，或当前波次发出的邀约已全部被拒绝时推进。"""
+    wave = int(req.dispatch_wave or 0)
+    if wave == 0 or req.dispatch_next_at is None:
+        return True
+    if now >= naive_utc(req.dispatch_next_at):
+        return True
+    statuses = [
+        r[0]
+        for r in db.query(MatchOffer.status)
+        .filter(MatchOffer.request_id == req.id)
+        .filter(MatchOffer.dispatch_wave == wave)
+        .all()
+    ]
+    return bool(statuses) and "pending" not in statuses
+
+
+def advance(db: Session, request_id: str, now: Optional[datetime] = None) -> bool:
+    """
+    推进一个请求的派单进度，返回本次是否发出了新一波邀约。
+    调用方无需 commit，本函数自行提交。
+    """
+    now = now or _utcnow()
+    req = db.query(MatchRequest).filter(MatchRequest.id == request_id).first()
+    if not req or req.dispatch_next_at is None:
+        return False
+    if req.status != "pending" or req.time_mode != "now":
+        req.dispatch_next_at = None
+        db.add(req)
+        db.commit()
+        if req.status != "pending":
+            candidate_cache.invalidate_request(request_id)
+        return False
+    if not _is_due(db, req, now):
+        return False
+
+    # 条件更新抢占当前波次，避免多个工作进程重复派单
+    wave = int(req.dispatch_wave or 0)
+    next_wave = wave + 1
+    exhausted = next_wave > settings.MATCH_DISPATCH_MAX_WAVES
+    claimed = (
+        db.query(MatchRequest)
+        .filter(MatchRequest.id == req.id)
+        .filter(MatchRequest.status == "pending")
+        .filter(func.coalesce(MatchRequest.dispatch_wave, 0) == wave)
+        .filter(MatchRequest.dispatch_next_at.isnot(None))
+        .update(
+            {
+                "dispatch_wave": wave if exhausted else next_wave,
+                "dispatch_next_at": None
+                if exhausted
+                else now + timedelta(seconds=settings.MATCH_DISPATCH_WAVE_TIMEOUT_SECONDS),
+            },
+            synchronize_session=False,
+        )
+    )
+    if not claimed:
+        db.rollback()
+        return False
+
+    if wave:
+        stale = db.query(MatchOffer).filter(MatchOffer.request_id == req.id).filter(MatchOffer.dispatch_wave == wave)
+        expired_teacher_ids = teacher_load.close_pending(db, stale, "expired")
+        resource_versions.touch(db, *[resource_versions.offers_key(t) for t in expired_teacher_ids])
+
+    if exhausted:
+        notifications.notify(db, req.student_id, "match_dispatch_exhausted", {"request_id": req.id, "waves": wave})
+        db.commit()
+        return False
+
+    offered = {
+        r[0] for r in db.query(MatchOffer.teacher_id).filter(MatchOffer.request_id == req.id).all()
+    }
+    window = (settings.MATCH_DISPATCH_WAVE_SIZE + len(offered)) * max(1, settings.MATCH_LOAD_RERANK_FACTOR)
+    ranked = teacher_load.rerank(db, matching.rank_candidates(db, req, window), now)
+    sent = []
+    for _, entry, _ in ranked:
+        if entry.user_id in offered or entry.user_id == req.student_id:
+            continue
+        offered.add(entry.user_id)
+        offer = MatchOffer(
+            id=str(uuid.uuid4()),
+            request_id=req.id,
+            student_id=req.student_id,
+            teacher_id=entry.user_id,
+            status="pending",
+            dispatch_wave=next_wave,
+        )
+        db.add(offer)
+        notifications.notify(
+            db,
+            entry.user_id,
+            "match_offer_created",
+            {"request_id": req.id, "offer_id": offer.id, "student_id": req.student_id, "dispatch_wave": next_wave},
+        )
+        sent.append(entry.user_id)
+        if len(sent) >= settings.MATCH_DISPATCH_WAVE_SIZE:
+            break
+    teacher_load.offers_opened(db, sent, now)
+    db.commit()
+    return bool(sent)
+
+
+def claim_request(db: Session, request_id: str) -> bool:
+    """
+    以 status == pending 为条件把请求改为 matched 并停止派单 (不提交)，返回是否抢占成功。
+    接受邀约时先抢占请求再抢占邀约：同一请求的并发接受在请求行上串行，失败方不会再去锁其他邀约。
+    """
+    claimed = (
+        db.query(MatchRequest)
+        .filter(MatchRequest.id == request_id)
+        .filter(MatchRequest.status == "pending")
+        .update({"status": "matched", "dispatch_next_at": None}, synchronize_session=False)
+    )
+    return bool(claimed)
+
+
+def due_request_ids(db: Session, now: Optional[datetime] = None, limit: int = 100) -> list[str]:
+    now = now or _utcnow()
+    rows = (
+        db.query(MatchRequest.id)
+        .filter(MatchRequest.dispatch_next_at.isnot(None))
+        .filter(MatchRequest.dispatch_next_at <= now)
+        .order_by(MatchRequest.dispatch_next_at)
+        .limit(limit)
+        .all()
+    )
+    return [r[0] for r in rows]
+
+
+class DispatchWorker(QueueWorker):
+    """后台派单线程：处理队列中的请求，并每隔 MATCH_DISPATCH_POLL_SECONDS 扫描到期的请求。"""
+
+    name = "match-dispatch"
+
+    def poll_seconds(self) -> float:
+        return settings.MATCH_DISPATCH_POLL_SECONDS
+
+    def scan_ids(self, db: Session) -> list[str]:
+        return due_request_ids(db)
+
+    def handle(self, db: Session, request_id: str) -> None:
+        advance(db, request_id)
+
+
+worker = DispatchWorker()
+
+
+def schedule(request: MatchRequest) -> None:
+    """为新建的即时求助标记派单起点（在调用方事务内设置，commit 后再 enqueue）。"""
+    if settings.MATCH_DISPATCH_ENABLED and request.time_mode == "now":
+        request.dispatch_wave = 0
+        request.dispatch_next_at = _utcnow()
+
+
+def enqueue(request_id: str) -> None:
+    if settings.MATCH_DISPATCH_ENABLED:
+        worker.enqueue(request_id)
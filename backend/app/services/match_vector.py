@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.teacher_pool import TeacherPoolEntry, TeacherPoolSlot, TeacherPoolTag
+from app.models.user import User
+from app.services import candidate_cache, time_slots
+from app.services.verification import verified_teacher_clause
+
+try:  # numpy 为可选依赖，未安装时始终使用基于倒排索引的打分
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# =============================================================================
+# 向量化匹配引擎 (Vectorized Matching Engine)
+# 功能：把全部可匹配师资条目常驻内存：
+# - 标签编码为按行打包的位图 (条目数 x 标签数/8 字节)；
+# - 可用时间编码为 7 x 条目数 的 uint64 位图 (与 time_slots 的 48 槽位一致)。
+# 一次请求对整个师资池做向量化打分，再用 argpartition 取前 k 个。
+# 打分公式、累加顺序和 (分数降序, 条目 ID 升序) 的排序规则与 matching.score_candidates
+# 及 rank_candidates 的补齐逻辑一致，两种实现给出相同的排序。
+# 快照按师资池版本号 (candidate_cache.pool_version) 惰性重建，并以缓存 TTL 兜底多进程场景。
+# =============================================================================
+
+_lock = threading.Lock()
+_snapshot: Optional["PoolSnapshot"] = None
+_POPCOUNT8 = None
+
+
+def enabled() -> bool:
+    return bool(settings.MATCH_VECTOR_ENGINE and np is not None)
+
+
+class PoolSnapshot:
+    """某一师资池版本的内存位图快照，行按条目 ID 升序排列。"""
+
+    def __init__(self, entry_ids: list[str], tag_cols: dict[str, int], tag_bits, slot_bits, version: int) -> None:
+        self.entry_ids = entry_ids
+        self.tag_cols = tag_cols
+        self.tag_bits = tag_bits
+        self.slot_bits = slot_bits
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, db: Session) -> "PoolSnapshot":
+        version = candidate_cache.pool_version()
+        entry_ids = sorted(
+            r[0]
+            for r in db.query(TeacherPoolEntry.id)
+            .join(User, User.id == TeacherPoolEntry.user_id)
+            .filter(TeacherPoolEntry.in_pool == True)
+            .filter(verified_teacher_clause())
+            .all()
+        )
+        rows = {eid: i for i, eid in enumerate(entry_ids)}
+        n = len(entry_ids)
+
+        tag_rows = [(rows[eid], tag) for tag, eid in db.query(TeacherPoolTag.tag, TeacherPoolTag.entry_id) if eid in rows]
+        tag_cols = {tag: j for j, tag in enumerate(sorted({tag for _, tag in tag_rows}))}
+        tag_bits = np.zeros((n, max(1, (len(tag_cols) + 7) // 8)), dtype=np.uint8)
+        if tag_rows:
+            r = np.fromiter((i for i, _ in tag_rows), dtype=np.int64, count=len(tag_rows))
+            c = np.fromiter((tag_cols[t] for _, t in tag_rows), dtype=np.int64, count=len(tag_rows))
+            np.bitwise_or.at(tag_bits, (r, c >> 3), (1 << (7 - (c & 7))).astype(np.uint8))
+
+        slot_bits = np.zeros((7, n), dtype=np.uint64)
+        for eid, weekday, mask in db.query(TeacherPoolSlot.entry_id, TeacherPoolSlot.weekday, TeacherPoolSlot.mask):
+            if eid in rows and 0 <= int(weekday) < 7:
+                slot_bits[int(weekday), rows[eid]] = np.uint64(int(mask or 0))
+        return cls(entry_ids, tag_cols, tag_bits, slot_bits, version)
+
+    def fresh(self) -> bool:
+        return (
+            self.version == candidate_cache.pool_version()
+            and time.monotonic() - self.built_at < settings.MATCH_CANDIDATE_CACHE_TTL_SECONDS
+        )
+
+    def tag_column(self, tag: str):
+        col = self.tag_cols.get(tag)
+        if col is None:
+            return None
+        return (self.tag_bits[:, col >> 3] >> (7 - (col & 7))) & 1
+
+
+def snapshot(db: Session) -> PoolSnapshot:
+    global _snapshot
+    snap = _snapshot
+    if snap is not None and snap.fresh():
+        return snap
+    with _lock:
+        if _snapshot is None or not _snapshot.fresh():
+            _snapshot = PoolSnapshot.build(db)
+        return _snapshot
+
+
+def _popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    global _POPCOUNT8
+    if _POPCOUNT8 is None:
+        _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+    return _POPCOUNT8[np.ascontiguousarray(values).view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+def score_pool(snap: PoolSnapshot, tag_groups: list[tuple[float, list[str]]], req_masks: dict[int, int]):
+    """对整个师资池打分，返回 (分数数组, 命中掩码)。"""
+    n = len(snap.entry_ids)
+    scores = np.zeros(n, dtype=np.float64)
+    hits = np.zeros(n, dtype=bool)
+    for weight, group in tag_groups:
+        count = np.zeros(n, dtype=np.int64)
+        for tag in group:
+            column = snap.tag_column(tag)
+            if column is not None:
+                count += column
+        scores += weight * count
+        hits |= count > 0
+
+    wanted_minutes = time_slots.total_minutes(req_masks)
+    if wanted_minutes:
+        overlap = np.zeros(n, dtype=np.int64)
+        for day, mask in req_masks.items():
+            if mask:
+                overlap += _popcount(snap.slot_bits[day] & np.uint64(mask))
+        # 有标签时只在标签命中的条目中计算时间重合，无标签时按时间重合召回
+        timed = overlap > 0
+        if tag_groups:
+            timed &= hits
+        else:
+            hits = timed
+        ratio = (overlap * time_slots.SLOT_MINUTES) / wanted_minutes
+        scores = np.where(timed, scores + settings.MATCH_TIME_SLOT_WEIGHT * ratio, scores)
+    return scores, hits
+
+
+def select_top(scores: np.ndarray, hits: np.ndarray, limit: int) -> np.ndarray:
+    """命中条目中分数最高的 limit 个下标，按分数降序、同分按下标 (条目 ID 顺序) 升序。"""
+    idx = np.flatnonzero(hits)
+    if len(idx) > limit:
+        # argpartition 在 O(n) 内选出前 limit 个，再补上与第 limit 名同分的条目，保证按 ID 决胜
+        part = idx[np.argpartition(-scores[idx], limit - 1)[:limit]]
+        kth = scores[part].min()
+        idx = np.union1d(part[scores[part] > kth], idx[scores[idx] == kth])
+    # 只对选出的条目做稳定排序 (idx 为升序，同分保持 ID 顺序)
+    return idx[np.argsort(-scores[idx], kind="stable")][:limit]
+
+
+def top_k(
+    db: Session, tag_groups: list[tuple[float, list[str]]], req_masks: dict[int, int], limit: int
+) -> list[tuple[float, str]]:
+    """返回前 limit 个 (分数, 条目 ID)，命中不足时按条目 ID 用零分条目补齐。"""
+    snap = snapshot(db)
+    if limit <= 0 or not snap.entry_ids:
+        return []
+    scores, hits = score_pool(snap, tag_groups, req_masks)
+
+    order = select_top(scores, hits, limit)
+    result = [(float(scores[i]), snap.entry_ids[i]) for i in order]
+
+    if len(result) < limit:
+        rest = np.flatnonzero(~hits)[: limit - len(result)]
+        result.extend((0.0, snap.entry_ids[i]) for i in rest)
+    return result
+
+
+def reset() -> None:
+    global _snapshot
+    with _lock:
+        _snapshot = None
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.core import Tag
+from app.models.match import MatchRequest
+from app.models.teacher_pool import TeacherPoolEntry
+from app.models.user import User
+from app.core.config import settings
+from app.services import candidate_cache, match_vector, teacher_index, teacher_load, time_slots
+from app.services.verification import verified_teacher_clause
+
+# =============================================================================
+# 匹配排序 (Match Ranking)
+# 功能：基于师资池标签倒排索引为匹配请求计算候选讲师排序。
+# 只加载与需求共享标签的条目，开销取决于命中数量而非师资池规模。
+# 分数 = 共享标签数 (按标签分类加权) + 时间重合度 (预约类求助单，0~1，乘以 MATCH_TIME_SLOT_WEIGHT)。
+# 安装 numpy 且开启 MATCH_VECTOR_ENGINE 时改用内存向量化引擎 (见 match_vector)，排序结果相同。
+# 请求详情页的候选列表经 cached_candidates 读取缓存的排序结果。
+# =============================================================================
+
+
+def request_slot_masks(request: MatchRequest) -> dict[int, int]:
+    """预约类求助单的时间位图，即时类返回空。"""
+    if request.time_mode != "schedule":
+        return {}
+    return time_slots.slot_masks(request.time_slots)
+
+
+def tag_weight_groups(db: Session, tags: list[str]) -> list[tuple[float, list[str]]]:
+    """
+    按 Tag.category 权重 (MATCH_TAG_CATEGORY_WEIGHTS，默认 1) 对需求标签分组，
+    返回按权重升序排列的 [(权重, 标签列表)]。两种打分实现按相同顺序累加，保证分数一致。
+    """
+    wanted = sorted({str(t) for t in tags if t})
+    if not wanted:
+        return []
+    weights = dict.fromkeys(wanted, 1.0)
+    if settings.MATCH_TAG_CATEGORY_WEIGHTS:
+        rows = db.query(Tag.name, Tag.category).filter(Tag.name.in_(wanted)).all()
+        for name, category in rows:
+            weights[name] = float(settings.MATCH_TAG_CATEGORY_WEIGHTS.get(category or "", 1.0))
+    groups: dict[float, list[str]] = {}
+    for tag in wanted:
+        groups.setdefault(weights[tag], []).append(tag)
+    return sorted(groups.items())
+
+
+def score_candidates(db: Session, request: MatchRequest) -> dict[str, float]:
+    """计算所有命中条目的分数：{条目 ID: 分数}。"""
+    want_tags = teacher_index.parse_tags(request.tags)
+    scores: dict[str, float] = {}
+    for weight, group in tag_weight_groups(db, want_tags):
+        for eid, n in teacher_index.lookup(db, group).items():
+            scores[eid] = scores.get(eid, 0.0) + weight * n
+
+    req_masks = request_slot_masks(request)
+    wanted_minutes = time_slots.total_minutes(req_masks)
+    if wanted_minutes:
+        # 有标签时只在标签命中的条目中计算时间重合，无标签时按时间重合召回
+        found = teacher_index.slot_lookup(db, req_masks, tags=want_tags or None)
+        for eid, masks in found.items():
+            ratio = time_slots.overlap_minutes(req_masks, masks) / wanted_minutes
+            scores[eid] = scores.get(eid, 0.0) + settings.MATCH_TIME_SLOT_WEIGHT * ratio
+    return scores
+
+
+def rank_candidates(db: Session, request: MatchRequest, limit: int) -> list[tuple[float, TeacherPoolEntry, User]]:
+    """返回按分数降序排列的 (分数, 师资条目, 讲师) 列表，最多 limit 个。"""
+    if match_vector.enabled():
+        groups = tag_weight_groups(db, teacher_index.parse_tags(request.tags))
+        top = match_vector.top_k(db, groups, request_slot_masks(request), limit)
+        scores = {eid: score for score, eid in top}
+        return [(scores[eid], e, u) for eid, e, u in _load(db, [eid for _, eid in top])]
+
+    scores = score_candidates(db, request)
+    ranked_ids = sorted(scores, key=lambda eid: (-scores[eid], eid))
+
+    result: list[tuple[float, TeacherPoolEntry, User]] = []
+    pos = 0
+    while len(result) < limit and pos < len(ranked_ids):
+        batch = ranked_ids[pos : pos + limit]
+        pos += len(batch)
+        entry_map = {e.id: e for e in db.query(TeacherPoolEntry).filter(TeacherPoolEntry.id.in_(batch)).all()}
+        for eid, e, u in _load(db, batch, entry_map=entry_map):
+            result.append((scores[eid], e, u))
+            if len(result) >= limit:
+                break
+
+    if len(result) < limit:
+        result.extend(_fill_without_overlap(db, {e.id for _, e, _ in result}, limit - len(result)))
+    return result
+
+
+def _load(
+    db: Session, entry_ids: list[str], entry_map: Optional[dict[str, TeacherPoolEntry]] = None
+) -> list[tuple[str, TeacherPoolEntry, User]]:
+    """按给定顺序加载条目及讲师，跳过已删除、已移出师资池或讲师资格失效的条目。"""
+    if entry_map is None:
+        entry_map = {
+            e.id: e for e in db.query(TeacherPoolEntry).filter(TeacherPoolEntry.id.in_(entry_ids)).all()
+        } if entry_ids else {}
+    user_ids = list({e.user_id for e in entry_map.values()})
+    users = (
+        db.query(User).filter(User.id.in_(user_ids)).filter(verified_teacher_clause()).all() if user_ids else []
+    )
+    user_map = {u.id: u for u in users}
+    rows = []
+    for eid in entry_ids:
+        e = entry_map.get(eid)
+        u = user_map.get(e.user_id) if e else None
+        if e and u and e.in_pool:
+            rows.append((eid, e, u))
+    return rows
+
+
+def cached_candidates(db: Session, request: MatchRequest, limit: int) -> list[tuple[float, TeacherPoolEntry, User]]:
+    """
+    带缓存的 rank_candidates：命中时只按 ID 加载前 limit * MATCH_LOAD_RERANK_FACTOR 个条目，
+    再按讲师当前负载重排 (负载变化频繁，不进入缓存)。
+    """
+    window = limit * max(1, settings.MATCH_LOAD_RERANK_FACTOR)
+    depth = max(window, settings.MATCH_CANDIDATE_CACHE_DEPTH)
+    key = candidate_cache.request_key(request)
+    ranked = candidate_cache.get(key)
+    if ranked is None or settings.MATCH_CANDIDATE_CACHE_DEPTH <= len(ranked) < window:
+        full = rank_candidates(db, request, depth)
+        candidate_cache.put(key, [(score, e.id) for score, e, _ in full])
+        return teacher_load.rerank(db, full[:window])[:limit]
+    head = ranked[:window]
+    scores = {eid: score for score, eid in head}
+    loaded = [(scores[eid], e, u) for eid, e, u in _load(db, [eid for _, eid in head])]
+    return teacher_load.rerank(db, loaded)[:limit]
+
+
+def _fill_without_overlap(db: Session, taken: set[str], count: int) -> list[tuple[float, TeacherPoolEntry, User]]:
+    """命中不足时用其余可匹配讲师补齐（分数为 0），仅扫描少量行。"""
+    q = (
+        db.query(TeacherPoolEntry, User)
+        .join(User, User.id == TeacherPoolEntry.user_id)
+        .filter(TeacherPoolEntry.in_pool == True)
+        .filter(verified_teacher_clause())
+    )
+    if taken:
+        q = q.filter(~TeacherPoolEntry.id.in_(list(taken)))
+    rows = q.order_by(TeacherPoolEntry.id).limit(count).all()
+    return [(0.0, e, u) for e, u in rows]
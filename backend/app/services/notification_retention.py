@@ -0,0 +1,283 @@
+"""
+通知保留期与分区维护 (Notification Retention)
+
+用法 (在 backend 目录下)：
+    python -m app.services.notification_retention --purge       # 立即清理一次过期通知
+    python -m app.services.notification_retention --partition   # PostgreSQL：把 notifications 转换为按月分区表
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import Base, SessionLocal, engine
+from app.models.notification import Notification
+from app.services import notifications, resource_versions
+from app.services.clock import naive_utc
+from app.services.workers import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 通知保留期 (Notification Retention)
+# 功能：按创建时间清理过期通知，保持 notifications 只包含近期的工作集：
+# - 已读/未读通知分别设置保留天数，可按通知类型覆盖 (NOTIFICATION_RETENTION_*)；
+# - 每批按 created_at 索引取出 NOTIFICATION_RETENTION_BATCH_SIZE 行删除并提交，
+#   不会长时间持有锁；删除未读通知时同步扣减未读计数；
+# - PostgreSQL 可把 notifications 转换为按 created_at 月分区的表 (--partition)，
+#   之后后台任务预建未来月份的分区，整月超过最长保留期的分区直接 DROP，无需逐行删除。
+# 列表查询附带保留期下界 (horizon)，分区表上只扫描保留期内的分区。
+# =============================================================================
+
+TABLE = "notifications"
+_PARTITION_RE = re.compile(r"^notifications_p(\d{4})(\d{2})$")
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def _rules() -> list[tuple[Optional[str], bool, int]]:
+    """保留规则 [(类型，None 表示其余类型), 是否已读, 保留天数]。"""
+    rules: list[tuple[Optional[str], bool, int]] = []
+    for type_, days in sorted(settings.NOTIFICATION_RETENTION_TYPE_DAYS.items()):
+        rules.append((type_, True, int(days.get("read", settings.NOTIFICATION_RETENTION_READ_DAYS))))
+        rules.append((type_, False, int(days.get("unread", settings.NOTIFICATION_RETENTION_UNREAD_DAYS))))
+    rules.append((None, True, settings.NOTIFICATION_RETENTION_READ_DAYS))
+    rules.append((None, False, settings.NOTIFICATION_RETENTION_UNREAD_DAYS))
+    return rules
+
+
+def horizon(now: Optional[datetime] = None) -> Optional[datetime]:
+    """早于该时间的通知在任何规则下都已过期；存在永久保留的规则时返回 None。"""
+    days = [d for _, _, d in _rules()]
+    if not days or min(days) <= 0:
+        return None
+    return (now or _utcnow()) - timedelta(days=max(days))
+
+
+def purge(
+    db: Session,
+    now: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+) -> int:
+    """分批删除过期通知，返回删除的行数。"""
+    now = now or _utcnow()
+    batch_size = batch_size or settings.NOTIFICATION_RETENTION_BATCH_SIZE
+    overridden = list(settings.NOTIFICATION_RETENTION_TYPE_DAYS)
+    deleted = 0
+    batches = 0
+    for type_, read, days in _rules():
+        if days <= 0:
+            continue
+        state = Notification.read_at.isnot(None) if read else Notification.read_at.is_(None)
+        q = db.query(Notification.id, Notification.user_id).filter(
+            Notification.created_at < now - timedelta(days=days), state
+        )
+        if type_ is not None:
+            q = q.filter(Notification.type == type_)
+        elif overridden:
+            q = q.filter(or_(Notification.type.is_(None), Notification.type.notin_(overridden)))
+        while True:
+            rows = q.order_by(Notification.created_at).limit(batch_size).all()
+            if not rows:
+                break
+            (
+                db.query(Notification)
+                .filter(Notification.id.in_([r[0] for r in rows]), state)
+                .delete(synchronize_session=False)
+            )
+            if not read:
+                # 与标记已读并发时可能多扣一次 (不低于 0)，由计数校准修正
+                notifications.add_unread(db, {uid: -n for uid, n in Counter(r[1] for r in rows).items()})
+            resource_versions.touch(db, *[resource_versions.notifications_key(r[1]) for r in rows])
+            db.commit()
+            deleted += len(rows)
+            batches += 1
+            if max_batches and batches >= max_batches:
+                return deleted
+            if len(rows) < batch_size:
+                break
+    if deleted:
+        logger.info("purged %d expired notifications", deleted)
+    return deleted
+
+
+# -----------------------------------------------------------------------------
+# PostgreSQL 按月分区
+# -----------------------------------------------------------------------------
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    row = conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ),
+        {"name": TABLE},
+    ).first()
+    return row is not None
+
+
+def _create_partition(conn: Connection, parent: str, month: datetime) -> None:
+    conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF {parent} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{_add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+        )
+    )
+
+
+def convert_to_partitioned(target: Engine = engine, now: Optional[datetime] = None) -> bool:
+    """
+    把 notifications 转换为按 created_at 月分区的表 (单个事务内复制数据后替换原表)。
+    分区表的主键为 (id, created_at)。非 PostgreSQL 或已分区时返回 False。
+    """
+    if target.dialect.name != "postgresql":
+        return False
+    now = now or _utcnow()
+    with target.begin() as conn:
+        if is_partitioned(conn):
+            return False
+        conn.execute(text(f"UPDATE {TABLE} SET created_at = now() WHERE created_at IS NULL"))
+        oldest = conn.execute(text(f"SELECT min(created_at) FROM {TABLE}")).scalar()
+        parent = f"{TABLE}_partitioned"
+        conn.execute(
+            text(f"CREATE TABLE {parent} (LIKE {TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+        )
+        month = _month_start(naive_utc(oldest) if oldest else now)
+        last = _add_months(_month_start(now), settings.NOTIFICATION_PARTITION_MONTHS_AHEAD)
+        while month <= last:
+            _create_partition(conn, parent, month)
+            month = _add_months(month, 1)
+        conn.execute(text(f"CREATE TABLE {TABLE}_pdefault PARTITION OF {parent} DEFAULT"))
+        conn.execute(text(f"INSERT INTO {parent} SELECT * FROM {TABLE}"))
+        conn.execute(text(f"DROP TABLE {TABLE}"))
+        conn.execute(text(f"ALTER TABLE {parent} RENAME TO {TABLE}"))
+        conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)"))
+        conn.execute(
+            text(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)")
+        )
+        for index in Base.metadata.tables[TABLE].indexes:
+            index.create(conn, checkfirst=True)
+    logger.info("notifications converted to a monthly partitioned table")
+    return True
+
+
+def ensure_partitions(target: Engine = engine, now: Optional[datetime] = None) -> int:
+    """预建当前月及未来 NOTIFICATION_PARTITION_MONTHS_AHEAD 个月的分区，返回检查的分区数。"""
+    if target.dialect.name != "postgresql":
+        return 0
+    now = now or _utcnow()
+    done = 0
+    with target.begin() as conn:
+        if not is_partitioned(conn):
+            return 0
+        for i in range(settings.NOTIFICATION_PARTITION_MONTHS_AHEAD + 1):
+            month = _add_months(_month_start(now), i)
+            try:
+                with conn.begin_nested():
+                    _create_partition(conn, TABLE, month)
+                done += 1
+            except Exception:
+                # 默认分区中已有该月数据时无法创建，留在默认分区中
+                logger.exception("failed to create partition %s", _partition_name(month))
+    return done
+
+
+def drop_expired_partitions(db: Session, now: Optional[datetime] = None) -> list[str]:
+    """DROP 整月都早于保留期下界的分区 (同时扣减其中未读通知的计数)，返回删除的分区名。"""
+    limit = horizon(now)
+    if limit is None or not is_partitioned(db.connection()):
+        return []
+    names = [
+        r[0]
+        for r in db.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name"
+            ),
+            {"name": TABLE},
+        ).all()
+    ]
+    dropped = []
+    for name in sorted(names):
+        m = _PARTITION_RE.match(name)
+        if not m or _add_months(datetime(int(m.group(1)), int(m.group(2)), 1), 1) > limit:
+            continue
+        unread = db.execute(
+            text(f"SELECT user_id, count(*) FROM {name} WHERE read_at IS NULL GROUP BY user_id")
+        ).all()
+        notifications.add_unread(db, {uid: -int(n) for uid, n in unread})
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        dropped.append(name)
+    if dropped:
+        logger.info("dropped expired notification partitions: %s", ", ".join(dropped))
+    return dropped
+
+
+def maintain(db: Session, now: Optional[datetime] = None) -> int:
+    """一次完整维护：预建分区、删除过期分区、分批清理过期行。返回删除的行数。"""
+    ensure_partitions(now=now)
+    drop_expired_partitions(db, now)
+    return purge(db, now)
+
+
+class RetentionWorker(PeriodicWorker):
+    """后台线程：启动时及每隔 NOTIFICATION_RETENTION_INTERVAL_SECONDS 执行一次维护。"""
+
+    name = "notification-retention"
+
+    def interval(self) -> float:
+        return settings.NOTIFICATION_RETENTION_INTERVAL_SECONDS
+
+    def tick(self, db: Session) -> None:
+        maintain(db)
+
+
+worker = RetentionWorker()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--purge", action="store_true", help="立即执行一次维护 (含过期分区与过期行清理)")
+    parser.add_argument("--partition", action="store_true", help="把 notifications 转换为按月分区表 (仅 PostgreSQL)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.partition:
+        print("converted" if convert_to_partitioned() else "skipped (not PostgreSQL or already partitioned)")
+    if args.purge:
+        db = SessionLocal()
+        try:
+            print(f"deleted {maintain(db)} rows")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Mapping, Optional
+
+from sqlalchemy import case, event, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.notification import Notification, NotificationCounter
+from app.services import pubsub, realtime, resource_versions
+from app.services.conversations import encode_cursor, keyset_clause
+from app.services.workers import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 站内通知 (Notifications)
+# 功能：所有 Notification 的统一写入入口 notify (由调用方负责 commit)。
+# 每位用户的未读数保存在 notification_counters 中，写入/标记已读时在同一事务内增减，
+# 未读数查询只读一行；reconcile_counters 定期按实际数据校准计数漂移。
+# 事务提交后经消息总线 (pubsub) 广播新通知，各进程把通知与最新未读数推送给
+# 本进程上的 SSE 连接 (/notifications/stream)，未读数只为在线用户查询；回滚时丢弃待推送事件。
+# 事件 ID 为通知的 (created_at, id) 游标，客户端重连时携带 Last-Event-ID，由 replay 补发断线期间的通知。
+# 高频事件 (评论、回答) 传入合并键 group_key：窗口内已有同键的未读通知时更新该行
+# (计数 +1、记录最新触发者、created_at 顺延为最新事件时间)，不新增行也不增加未读数，
+# 推送的事件沿用原通知 ID，客户端按 ID 替换。
+# =============================================================================
+
+REPLAY_LIMIT = 100
+COUNTER_BATCH_SIZE = 500
+CHANNEL = "notifications"
+
+_PENDING_KEY = "notifications_pending"
+
+# SSE 连接注册表，与会话 WebSocket 的注册表分开，避免互相收到对方的事件
+stream_registry = realtime.ConnectionRegistry()
+
+
+class StreamSubscriber(realtime.Subscriber):
+    """SSE 连接：事件编码为 text/event-stream 帧。"""
+
+    def encode(self, event: dict[str, Any]) -> str:
+        lines = []
+        if event.get("id"):
+            lines.append(f"id: {event['id']}")
+        lines.append(f"event: {event['event']}")
+        lines.append("data: " + json.dumps(event["data"], ensure_ascii=False, default=realtime._json_default))
+        return "\n".join(lines) + "\n\n"
+
+
+def _load_payload(text: Optional[str]) -> Any:
+    try:
+        return json.loads(text) if text else None
+    except Exception:
+        return None
+
+
+def notification_out(n: Notification) -> dict:
+    """通知的接口输出格式 (NotificationOut)，推送的 notification 事件复用此格式。"""
+    return {
+        "id": n.id,
+        "type": n.type,
+        "payload": _load_payload(n.payload),
+        "read_at": n.read_at,
+        "created_at": n.created_at,
+        "cursor": encode_cursor(n),
+        "count": int(n.event_count or 1),
+        "actors": _load_payload(n.actors) or [],
+    }
+
+
+def _merge_actors(actors: list[dict], actor: Optional[dict]) -> list[dict]:
+    """最新触发者排在最前，同一人只保留一次，最多 NOTIFICATION_COALESCE_MAX_ACTORS 位。"""
+    if not actor:
+        return actors
+    rest = [a for a in actors if a.get("id") != actor.get("id")]
+    return ([actor] + rest)[: max(1, settings.NOTIFICATION_COALESCE_MAX_ACTORS)]
+
+
+def _coalesce_target(db: Session, user_id: str, type: str, group_key: str, now: datetime) -> Optional[Notification]:
+    if settings.NOTIFICATION_COALESCE_WINDOW_SECONDS <= 0:
+        return None
+    return (
+        db.query(Notification)
+        .filter(Notification.user_id == user_id)
+        .filter(Notification.group_key == group_key)
+        .filter(Notification.type == type)
+        .filter(Notification.read_at.is_(None))
+        .filter(Notification.created_at >= now - timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW_SECONDS))
+        .order_by(Notification.created_at.desc())
+        .with_for_update()
+        .first()
+    )
+
+
+def notify(
+    db: Session,
+    user_id: str,
+    type: str,
+    payload: Any,
+    group_key: Optional[str] = None,
+    actor: Optional[dict] = None,
+) -> Notification:
+    """
+    写入一条通知 (不提交)，提交后推送给该用户的在线连接。
+    传入 group_key 时与窗口内同键的未读通知合并；actor 为触发者 {id, name}。
+    """
+    now = datetime.utcnow()
+    text = json.dumps(payload, ensure_ascii=False) if payload is not None else None
+    n = _coalesce_target(db, user_id, type, group_key, now) if group_key else None
+    if n is not None:
+        n.payload = text
+        n.event_count = int(n.event_count or 1) + 1
+        n.actors = json.dumps(_merge_actors(_load_payload(n.actors) or [], actor), ensure_ascii=False)
+        n.created_at = now
+        db.add(n)
+    else:
+        n = Notification(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            type=type,
+            payload=text,
+            created_at=now,
+            group_key=group_key,
+            event_count=1,
+            actors=json.dumps([actor], ensure_ascii=False) if actor else None,
+        )
+        db.add(n)
+        add_unread(db, {user_id: 1})
+    # 提交后对象已过期，在此处生成事件内容，after_commit 中无需再读库
+    db.info.setdefault(_PENDING_KEY, []).append((user_id, notification_out(n)))
+    return n
+
+
+def notify_many(db: Session, user_ids: list[str], type: str, payload: Any) -> int:
+    """
+    批量写入同一内容的通知 (不提交)：一次 executemany INSERT，未读计数合并为按块 UPDATE，
+    用于公告等大范围投递。返回写入数量。
+    """
+    user_ids = [u for u in user_ids if u]
+    if not user_ids:
+        return 0
+    now = datetime.utcnow()
+    text = json.dumps(payload, ensure_ascii=False) if payload is not None else None
+    rows = [
+        {"id": str(uuid.uuid4()), "user_id": uid, "type": type, "payload": text, "created_at": now}
+        for uid in user_ids
+    ]
+    db.bulk_insert_mappings(Notification, rows)
+    add_unread(db, {uid: 1 for uid in user_ids})
+    resource_versions.touch(db, *[resource_versions.notifications_key(uid) for uid in user_ids])
+    pending = db.info.setdefault(_PENDING_KEY, [])
+    for row in rows:
+        item = {
+            "id": row["id"],
+            "type": type,
+            "payload": payload,
+            "read_at": None,
+            "created_at": now,
+            "count": 1,
+            "actors": [],
+        }
+        item["cursor"] = encode_cursor(Notification(id=row["id"], created_at=now))
+        pending.append((row["user_id"], item))
+    return len(rows)
+
+
+def _chunks(items: list, size: int = COUNTER_BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _ensure_counters(db: Session, user_ids: Iterable[str]) -> None:
+    # 并发事务可能同时为同一用户创建计数行：用 ON CONFLICT DO NOTHING 插入，已存在的行保持不变
+    ids = sorted({u for u in user_ids if u})
+    if not ids:
+        return
+    table = NotificationCounter.__table__
+    conn = db.connection()
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    for chunk in _chunks(ids):
+        stmt = insert(table).values([{"user_id": u, "unread_count": 0} for u in chunk])
+        conn.execute(stmt.on_conflict_do_nothing(index_elements=[table.c.user_id]))
+
+
+def add_unread(db: Session, deltas: Mapping[str, int]) -> None:
+    """按用户增减未读数 (结果不低于 0)，与通知的写入/修改在同一事务内执行。"""
+    deltas = {u: n for u, n in deltas.items() if u and n}
+    if not deltas:
+        return
+    _ensure_counters(db, deltas)
+    # 增量相同的用户合并为一条 UPDATE (批量发送通知时全部为 +1)
+    by_delta: dict[int, list[str]] = defaultdict(list)
+    for user_id, n in deltas.items():
+        by_delta[n].append(user_id)
+    current = func.coalesce(NotificationCounter.unread_count, 0)
+    for n, user_ids in by_delta.items():
+        value = current + n if n > 0 else case((current + n > 0, current + n), else_=0)
+        for chunk in _chunks(sorted(user_ids)):
+            db.query(NotificationCounter).filter(NotificationCounter.user_id.in_(chunk)).update(
+                {NotificationCounter.unread_count: value}, synchronize_session=False
+            )
+
+
+def mark_read(db: Session, n: Notification, now: Optional[datetime] = None) -> bool:
+    """标记已读 (不提交)，返回是否发生变化。"""
+    if n.read_at is not None:
+        return False
+    n.read_at = now or datetime.utcnow()
+    db.add(n)
+    add_unread(db, {n.user_id: -1})
+    return True
+
+
+def unread_count(db: Session, user_id: str) -> int:
+    """未读通知数：按主键读取计数行。"""
+    value = (
+        db.query(NotificationCounter.unread_count).filter(NotificationCounter.user_id == user_id).scalar()
+    )
+    return int(value or 0)
+
+
+def reconcile_counters(db: Session) -> int:
+    """
+    按 notifications 的实际未读数校准计数 (缺失的计数行一并创建)，返回修正的用户数。
+    使用条件更新：校准期间计数被并发修改的用户本轮跳过，留待下次校准。
+    """
+    actual = dict(
+        db.query(Notification.user_id, func.count(Notification.id))
+        .filter(Notification.read_at.is_(None))
+        .filter(Notification.user_id.isnot(None))
+        .group_by(Notification.user_id)
+        .all()
+    )
+    stored = {
+        uid: int(n or 0)
+        for uid, n in db.query(NotificationCounter.user_id, NotificationCounter.unread_count)
+        .filter(or_(NotificationCounter.unread_count != 0, NotificationCounter.unread_count.is_(None)))
+        .all()
+    }
+    drifted = sorted(uid for uid in set(actual) | set(stored) if int(actual.get(uid, 0)) != stored.get(uid, 0))
+    if not drifted:
+        return 0
+    _ensure_counters(db, drifted)
+    repaired = 0
+    for uid in drifted:
+        repaired += (
+            db.query(NotificationCounter)
+            .filter(NotificationCounter.user_id == uid)
+            .filter(func.coalesce(NotificationCounter.unread_count, 0) == stored.get(uid, 0))
+            .update({NotificationCounter.unread_count: int(actual.get(uid, 0))}, synchronize_session=False)
+        )
+    db.commit()
+    if repaired:
+        logger.info("notification counters reconciled for %d users", repaired)
+    return repaired
+
+
+class CounterReconciler(PeriodicWorker):
+    """后台线程：每隔 NOTIFICATION_COUNTER_RECONCILE_SECONDS 校准一次未读计数。"""
+
+    name = "notification-counters"
+    run_at_start = False
+
+    def interval(self) -> float:
+        return settings.NOTIFICATION_COUNTER_RECONCILE_SECONDS
+
+    def tick(self, db: Session) -> None:
+        reconcile_counters(db)
+
+
+reconciler = CounterReconciler()
+
+
+def _event(name: str, data: Any, event_id: Optional[str] = None) -> dict:
+    return {"event": name, "data": data, "id": event_id}
+
+
+def unread_event(count: int) -> dict:
+    return _event("unread_count", {"unread_count": count})
+
+
+def notification_event(item: dict) -> dict:
+    return _event("notification", item, item.get("cursor"))
+
+
+def publish_unread(user_id: str) -> None:
+    """提交后推送该用户最新的未读数 (由持有其连接的进程查询)。"""
+    pubsub.publish(CHANNEL, {"unread": [user_id]})
+
+
+def replay(db: Session, user_id: str, last_event_id: Optional[str]) -> list[dict]:
+    """返回游标之后的通知事件 (最多 REPLAY_LIMIT 条，时间正序)；游标无效时不补发。"""
+    if not last_event_id:
+        return []
+    try:
+        after = keyset_clause(Notification.created_at, Notification.id, last_event_id, newer=True)
+    except ValueError:
+        return []
+    rows = (
+        db.query(Notification)
+        .filter(Notification.user_id == user_id)
+        .filter(after)
+        .order_by(Notification.created_at.asc(), Notification.id.asc())
+        .limit(REPLAY_LIMIT)
+        .all()
+    )
+    return [notification_event(notification_out(n)) for n in rows]
+
+
+def _deliver(message: dict) -> None:
+    items = message.get("items") or []
+    users = {uid for uid, _ in items} | set(message.get("unread") or [])
+    online = {c.user_id for c in stream_registry.connections(users)}
+    if not online:
+        return
+    for uid, item in items:
+        if uid in online:
+            stream_registry.publish([uid], notification_event(item))
+    # 订阅回调可能在 after_commit 中同步执行 (进程内后端)，此时不能在原会话上执行 SQL，
+    # 未读数统一用独立会话查询
+    db = SessionLocal()
+    try:
+        for uid in online:
+            stream_registry.publish([uid], unread_event(unread_count(db, uid)))
+    finally:
+        db.close()
+
+
+pubsub.subscribe(CHANNEL, _deliver)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        pubsub.publish(CHANNEL, {"items": pending})
+    except Exception:
+        logger.exception("failed to publish notifications")
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
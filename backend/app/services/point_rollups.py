@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.match import PointBalance, PointDailyRollup, PointSchoolDailyRollup, PointTxn
+from app.models.user import User
+from app.services import resource_versions
+from app.services.workers import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 积分日汇总与排行榜 (Point Rollups / Leaderboards)
+# 功能：把 PointTxn 按 (UTC 日期, 用户) 与 (UTC 日期, 高校) 增量汇总到日汇总表：
+# - 水位为每位用户已汇总的流水序号 point_balances.rolled_seq。序号在余额行锁下连续分配，
+#   已提交的流水总是序号的前缀，按序号续跑不会漏记，也不受提交顺序影响；
+# - 每批先以条件更新推进水位 (多进程同时运行时只有一方生效)，再在同一事务内累加汇总行，
+#   每笔流水恰好汇总一次；
+# - 每批提交后递增资源版本号 point_rollups。
+# 排行榜按 (类型, 周期, 高校) 在进程内缓存前 POINTS_LEADERBOARD_SIZE 名的有序列表，
+# 汇总版本号或日期变化时从汇总表重建一次，请求只读取版本号并截取前 k 名。
+# 高校参数来自请求，缓存按 LRU 限制为 POINTS_LEADERBOARD_CACHE_SIZE 个条目。
+# =============================================================================
+
+PERIODS = {"day": 1, "week": 7, "month": 30}
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def _insert(db: Session):
+    if db.connection().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _add_rows(db: Session, model, keys: list[str], rows: dict[tuple, list[int]], extra: Optional[dict] = None) -> None:
+    if not rows:
+        return
+    insert = _insert(db)
+    table = model.__table__
+    values = []
+    for key, (earned, spent, count) in sorted(rows.items()):
+        value = dict(zip(keys, key))
+        value.update({"earned": earned, "spent": spent, "txn_count": count})
+        if extra:
+            value.update(extra.get(key, {}))
+        values.append(value)
+    stmt = insert(table).values(values)
+    updates = {
+        "earned": func.coalesce(table.c.earned, 0) + stmt.excluded.earned,
+        "spent": func.coalesce(table.c.spent, 0) + stmt.excluded.spent,
+        "txn_count": func.coalesce(table.c.txn_count, 0) + stmt.excluded.txn_count,
+    }
+    if extra:
+        updates["school_id"] = stmt.excluded.school_id
+    db.execute(stmt.on_conflict_do_update(index_elements=[table.c[k] for k in keys], set_=updates))
+
+
+def _rollup_batch(db: Session, marks: dict[str, int]) -> int:
+    txns = (
+        db.query(PointTxn.user_id, PointTxn.seq, PointTxn.points, PointTxn.created_at)
+        .filter(PointTxn.user_id.in_(list(marks)))
+        .filter(PointTxn.seq > min(marks.values()))
+        .all()
+    )
+    txns = [t for t in txns if t.seq > marks[t.user_id]]
+    if not txns:
+        return 0
+    schools = dict(db.query(User.id, User.school_id).filter(User.id.in_(list({t.user_id for t in txns}))).all())
+
+    new_marks: dict[str, int] = {}
+    by_user: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0])
+    by_school: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0])
+    for t in txns:
+        new_marks[t.user_id] = max(new_marks.get(t.user_id, 0), int(t.seq))
+        day = (t.created_at or _utcnow()).date()
+        points = int(t.points or 0)
+        buckets = [by_user[(day, t.user_id)]]
+        if schools.get(t.user_id):
+            buckets.append(by_school[(day, schools[t.user_id])])
+        for bucket in buckets:
+            if points >= 0:
+                bucket[0] += points
+            else:
+                bucket[1] -= points
+            bucket[2] += 1
+
+    # 先推进水位：任一用户的水位已被其他进程推进时放弃本批
+    for user_id, seq in sorted(new_marks.items()):
+        claimed = (
+            db.query(PointBalance)
+            .filter(PointBalance.user_id == user_id)
+            .filter(func.coalesce(PointBalance.rolled_seq, 0) == marks[user_id])
+            .update({PointBalance.rolled_seq: seq}, synchronize_session=False)
+        )
+        if not claimed:
+            db.rollback()
+            return 0
+    _add_rows(
+        db,
+        PointDailyRollup,
+        ["day", "user_id"],
+        by_user,
+        {key: {"school_id": schools.get(key[1])} for key in by_user},
+    )
+    _add_rows(db, PointSchoolDailyRollup, ["day", "school_id"], by_school)
+    resource_versions.touch(db, resource_versions.POINT_ROLLUPS)
+    db.commit()
+    return len(txns)
+
+
+def run(db: Session, batch_size: Optional[int] = None) -> int:
+    """汇总所有水位之后的流水，返回本次汇总的流水笔数。"""
+    batch_size = batch_size or settings.POINTS_ROLLUP_BATCH_SIZE
+    total = 0
+    last_user_id = ""
+    while True:
+        rows = (
+            db.query(PointBalance.user_id, PointBalance.rolled_seq)
+            .filter(PointBalance.user_id > last_user_id)
+            .filter(func.coalesce(PointBalance.txn_count, 0) > func.coalesce(PointBalance.rolled_seq, 0))
+            .order_by(PointBalance.user_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_user_id = rows[-1][0]
+        total += _rollup_batch(db, {uid: int(seq or 0) for uid, seq in rows})
+    if total:
+        logger.info("rolled up %d point transactions", total)
+    return total
+
+
+# -----------------------------------------------------------------------------
+# 排行榜
+# -----------------------------------------------------------------------------
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[tuple, tuple[int, date, list]]" = OrderedDict()
+
+
+def _since(period: str, today: date) -> date:
+    return today - timedelta(days=PERIODS[period] - 1)
+
+
+def _ranked(db: Session, kind: str, period: str, school_id: Optional[str]) -> list:
+    version = resource_versions.current(db, resource_versions.POINT_ROLLUPS)
+    today = _utcnow().date()
+    key = (kind, period, school_id or "")
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+    if entry is not None and entry[0] == version and entry[1] == today:
+        return entry[2]
+
+    since = _since(period, today)
+    size = settings.POINTS_LEADERBOARD_SIZE
+    if kind == "users":
+        earned = func.sum(PointDailyRollup.earned)
+        q = (
+            db.query(PointDailyRollup.user_id, earned)
+            .filter(PointDailyRollup.day >= since)
+            .group_by(PointDailyRollup.user_id)
+            .having(earned > 0)
+            .order_by(earned.desc(), PointDailyRollup.user_id)
+        )
+        if school_id:
+            q = q.filter(PointDailyRollup.school_id == school_id)
+        rows = [(uid, int(n or 0)) for uid, n in q.limit(size).all()]
+    else:
+        earned = func.sum(PointSchoolDailyRollup.earned)
+        spent = func.sum(PointSchoolDailyRollup.spent)
+        count = func.sum(PointSchoolDailyRollup.txn_count)
+        rows = [
+            (sid, int(e or 0), int(s or 0), int(c or 0))
+            for sid, e, s, c in db.query(PointSchoolDailyRollup.school_id, earned, spent, count)
+            .filter(PointSchoolDailyRollup.day >= since)
+            .group_by(PointSchoolDailyRollup.school_id)
+            .order_by(earned.desc(), PointSchoolDailyRollup.school_id)
+            .limit(size)
+            .all()
+        ]
+    with _cache_lock:
+        _cache[key] = (version, today, rows)
+        _cache.move_to_end(key)
+        while len(_cache) > settings.POINTS_LEADERBOARD_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rows
+
+
+def top_earners(db: Session, period: str = "week", school_id: Optional[str] = None, limit: int = 10) -> list[dict]:
+    """周期内积分收入前 limit 名的用户。"""
+    rows = _ranked(db, "users", period, school_id)[:limit]
+    users = {u.id: u for u in db.query(User).filter(User.id.in_([r[0] for r in rows])).all()} if rows else {}
+    result = []
+    for rank, (user_id, earned) in enumerate(rows, start=1):
+        u = users.get(user_id)
+        result.append(
+            {
+                "rank": rank,
+                "user_id": user_id,
+                "username": u.username if u else None,
+                "full_name": u.full_name if u else None,
+                "school_id": u.school_id if u else None,
+                "earned": earned,
+            }
+        )
+    return result
+
+
+def school_flow(db: Session, period: str = "week", limit: int = 20) -> list[dict]:
+    """周期内各高校的积分流向，按收入降序。"""
+    return [
+        {"rank": rank, "school_id": sid, "earned": e, "spent": s, "net": e - s, "txn_count": c}
+        for rank, (sid, e, s, c) in enumerate(_ranked(db, "schools", period, None)[:limit], start=1)
+    ]
+
+
+class RollupWorker(PeriodicWorker):
+    """后台线程：启动时及每隔 POINTS_ROLLUP_INTERVAL_SECONDS 汇总一次新流水。"""
+
+    name = "point-rollups"
+
+    def interval(self) -> float:
+        return settings.POINTS_ROLLUP_INTERVAL_SECONDS
+
+    def tick(self, db: Session) -> None:
+        run(db)
+
+
+worker = RollupWorker()
@@ -0,0 +1,351 @@
+"""
+积分账本 (Points Ledger)
+
+用法 (在 backend 目录下)：
+    python -m app.services.points --verify            # 增量校验全部用户的账本
+    python -m app.services.points --verify <用户 ID>  # 校验单个用户
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.auto_migrate import is_applied, mark_applied
+from app.db.session import SessionLocal
+from app.models.match import PointBalance, PointDailyRollup, PointSnapshot, PointTxn
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 积分账本 (Points Ledger)
+# 功能：所有 PointTxn 的统一写入入口 record (由调用方负责 commit)：
+# - 同一事务内对 point_balances 执行一条 upsert (余额 += 金额，笔数 += 1)，
+#   行锁使同一用户的写入串行，更新后的笔数即为新流水的序号 seq (从 1 连续递增)；
+#   需要余额充足的支出 (require_funds) 改为带 balance >= 金额 条件的 UPDATE，不足时不写入；
+# - 序号为 POINTS_SNAPSHOT_INTERVAL 的倍数时写入余额快照 (检查点)；
+# - 余额查询 balance 只读 point_balances 一行。
+# verify 从最后一个已校验的检查点开始，逐段核对 "上一检查点余额 + 区间流水 = 本检查点余额"，
+# 最后核对检查点之后的流水与当前余额，已校验的区间不再重复求和。
+# 新用户初始积分 (POINTS_SIGNUP_BONUS，默认 0 即不发放) 启用时作为一笔 signup_bonus 流水入账，
+# 每位用户至多一笔 (部分唯一索引)；已有用户在启用后的首次启动时由 backfill_signup_bonus 补发一次。
+# =============================================================================
+
+VERIFY_BATCH_SIZE = 500
+SIGNUP_BONUS_TYPE = "signup_bonus"
+SIGNUP_BONUS_BACKFILL = "points.signup_bonus_backfill"
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+class InsufficientPoints(Exception):
+    pass
+
+
+def _debit_balance(db: Session, user_id: str, amount: int) -> bool:
+    """余额充足时扣减 (条件更新，不足时不做任何修改)，返回是否成功。"""
+    updated = (
+        db.query(PointBalance)
+        .filter(PointBalance.user_id == user_id)
+        .filter(func.coalesce(PointBalance.balance, 0) >= amount)
+        .update(
+            {
+                PointBalance.balance: func.coalesce(PointBalance.balance, 0) - amount,
+                PointBalance.txn_count: func.coalesce(PointBalance.txn_count, 0) + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    return bool(updated)
+
+
+def _upsert_balance(db: Session, user_id: str, points: int) -> None:
+    table = PointBalance.__table__
+    conn = db.connection()
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values(user_id=user_id, balance=points, txn_count=1, updated_at=func.now())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={
+            "balance": func.coalesce(table.c.balance, 0) + points,
+            "txn_count": func.coalesce(table.c.txn_count, 0) + 1,
+            "updated_at": func.now(),
+        },
+    )
+    conn.execute(stmt)
+
+
+def record(
+    db: Session,
+    user_id: str,
+    points: int,
+    type: str,
+    title: str,
+    meta: Any = None,
+    require_funds: bool = False,
+) -> PointTxn:
+    """
+    写入一笔积分流水并更新余额 (不提交)，返回流水。
+    require_funds 时支出需余额充足，不足抛出 InsufficientPoints 且不修改任何数据。
+    """
+    points = int(points)
+    if require_funds and points < 0:
+        if not _debit_balance(db, user_id, -points):
+            raise InsufficientPoints(user_id)
+    else:
+        _upsert_balance(db, user_id, points)
+    seq, balance_after = (
+        db.query(PointBalance.txn_count, PointBalance.balance).filter(PointBalance.user_id == user_id).one()
+    )
+    txn = PointTxn(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        seq=int(seq),
+        type=type,
+        title=title,
+        points=points,
+        meta=meta if meta is None or isinstance(meta, str) else json.dumps(meta, ensure_ascii=False),
+        created_at=_utcnow(),
+    )
+    db.add(txn)
+    interval = settings.POINTS_SNAPSHOT_INTERVAL
+    if interval > 0 and int(seq) % interval == 0:
+        db.add(PointSnapshot(id=str(uuid.uuid4()), user_id=user_id, seq=int(seq), balance=int(balance_after)))
+    return txn
+
+
+def balance(db: Session, user_id: str) -> int:
+    """积分余额：按主键读取余额行。"""
+    value = db.query(PointBalance.balance).filter(PointBalance.user_id == user_id).scalar()
+    return int(value or 0)
+
+
+def _range_sum(db: Session, user_id: str, after_seq: int, upto_seq: Optional[int]) -> tuple[int, int]:
+    q = db.query(func.coalesce(func.sum(PointTxn.points), 0), func.count(PointTxn.id)).filter(
+        PointTxn.user_id == user_id, PointTxn.seq > after_seq
+    )
+    if upto_seq is not None:
+        q = q.filter(PointTxn.seq <= upto_seq)
+    total, count = q.one()
+    return int(total or 0), int(count or 0)
+
+
+def verify(db: Session, user_id: str, now: Optional[datetime] = None) -> dict:
+    """增量校验一位用户的账本并提交检查点的校验结果。"""
+    now = now or _utcnow()
+    base = (
+        db.query(PointSnapshot)
+        .filter(PointSnapshot.user_id == user_id, PointSnapshot.verified_at.isnot(None))
+        .order_by(PointSnapshot.seq.desc())
+        .first()
+    )
+    base_seq, base_balance = (base.seq, base.balance) if base else (0, 0)
+    pending = (
+        db.query(PointSnapshot)
+        .filter(PointSnapshot.user_id == user_id, PointSnapshot.seq > base_seq)
+        .order_by(PointSnapshot.seq.asc())
+        .all()
+    )
+    checked = 0
+    for snap in pending:
+        total, count = _range_sum(db, user_id, base_seq, snap.seq)
+        checked += count
+        if count != snap.seq - base_seq or base_balance + total != snap.balance:
+            db.commit()
+            return {
+                "user_id": user_id,
+                "ok": False,
+                "seq": snap.seq,
+                "expected": base_balance + total,
+                "balance": snap.balance,
+                "checked": checked,
+            }
+        snap.verified_at = now
+        db.add(snap)
+        base_seq, base_balance = snap.seq, snap.balance
+
+    row = db.query(PointBalance).filter(PointBalance.user_id == user_id).first()
+    current, txn_count = (int(row.balance or 0), int(row.txn_count or 0)) if row else (0, 0)
+    total, count = _range_sum(db, user_id, base_seq, None)
+    checked += count
+    db.commit()
+    return {
+        "user_id": user_id,
+        "ok": base_seq + count == txn_count and base_balance + total == current,
+        "seq": txn_count,
+        "expected": base_balance + total,
+        "balance": current,
+        "checked": checked,
+    }
+
+
+def verify_all(db: Session, batch_size: int = VERIFY_BATCH_SIZE) -> list[dict]:
+    """按用户 ID 分批校验全部余额行，返回不一致的结果。"""
+    failed: list[dict] = []
+    last_user_id = ""
+    while True:
+        user_ids = [
+            r[0]
+            for r in db.query(PointBalance.user_id)
+            .filter(PointBalance.user_id > last_user_id)
+            .order_by(PointBalance.user_id)
+            .limit(batch_size)
+            .all()
+        ]
+        if not user_ids:
+            return failed
+        for user_id in user_ids:
+            result = verify(db, user_id)
+            if not result["ok"]:
+                logger.warning("points ledger mismatch: %s", result)
+                failed.append(result)
+        last_user_id = user_ids[-1]
+
+
+def delete_user(db: Session, user_id: str) -> None:
+    """删除用户的全部积分数据 (不提交)。高校日汇总保留。"""
+    db.query(PointTxn).filter(PointTxn.user_id == user_id).delete(synchronize_session=False)
+    db.query(PointSnapshot).filter(PointSnapshot.user_id == user_id).delete(synchronize_session=False)
+    db.query(PointBalance).filter(PointBalance.user_id == user_id).delete(synchronize_session=False)
+    db.query(PointDailyRollup).filter(PointDailyRollup.user_id == user_id).delete(synchronize_session=False)
+
+
+def backfill(db: Session) -> int:
+    """
+    为升级前的流水按 (created_at, id) 分配序号，重算余额行并写入一个检查点。
+    返回处理的用户数。
+    """
+    user_ids = [
+        r[0]
+        for r in db.query(PointTxn.user_id).filter(PointTxn.seq.is_(None)).filter(PointTxn.user_id.isnot(None)).distinct().all()
+    ]
+    for user_id in user_ids:
+        seq = int(db.query(func.max(PointTxn.seq)).filter(PointTxn.user_id == user_id).scalar() or 0)
+        txns = (
+            db.query(PointTxn)
+            .filter(PointTxn.user_id == user_id, PointTxn.seq.is_(None))
+            .order_by(PointTxn.created_at.asc(), PointTxn.id.asc())
+            .all()
+        )
+        for txn in txns:
+            seq += 1
+            txn.seq = seq
+            db.add(txn)
+        db.flush()
+        total = int(
+            db.query(func.coalesce(func.sum(PointTxn.points), 0)).filter(PointTxn.user_id == user_id).scalar() or 0
+        )
+        row = db.query(PointBalance).filter(PointBalance.user_id == user_id).first()
+        if row is None:
+            row = PointBalance(user_id=user_id)
+        row.balance = total
+        row.txn_count = seq
+        db.add(row)
+        exists = db.query(PointSnapshot.id).filter(PointSnapshot.user_id == user_id, PointSnapshot.seq == seq).first()
+        if not exists:
+            db.add(PointSnapshot(id=str(uuid.uuid4()), user_id=user_id, seq=seq, balance=total, verified_at=_utcnow()))
+        db.commit()
+    if user_ids:
+        logger.info("points ledger backfilled for %d users", len(user_ids))
+    return len(user_ids)
+
+
+def grant_signup_bonus(db: Session, user_id: str) -> Optional[PointTxn]:
+    """
+    发放新用户初始积分 (不提交)，已发放过或未启用 (配置为 0) 时返回 None。
+    每位用户至多一笔 signup_bonus 由部分唯一索引保证：并发发放时冲突的一方在保存点内回滚。
+    """
+    amount = int(settings.POINTS_SIGNUP_BONUS)
+    if amount <= 0:
+        return None
+    exists = (
+        db.query(PointTxn.id)
+        .filter(PointTxn.user_id == user_id, PointTxn.type == SIGNUP_BONUS_TYPE)
+        .first()
+    )
+    if exists:
+        return None
+    try:
+        with db.begin_nested():
+            txn = record(db, user_id, amount, SIGNUP_BONUS_TYPE, "新用户初始积分")
+            db.flush()
+    except IntegrityError:
+        return None
+    return txn
+
+
+def backfill_signup_bonus(db: Session, batch_size: int = VERIFY_BATCH_SIZE) -> int:
+    """
+    启用初始积分后为已有用户补发 (按用户 ID 分批提交)，返回补发的用户数。
+    完成后记录到 schema_migrations，之后的启动直接跳过。
+    """
+    if int(settings.POINTS_SIGNUP_BONUS) <= 0 or is_applied(db.connection(), SIGNUP_BONUS_BACKFILL):
+        return 0
+    granted = (
+        db.query(PointTxn.id)
+        .filter(PointTxn.user_id == User.id, PointTxn.type == SIGNUP_BONUS_TYPE)
+        .exists()
+    )
+    total = 0
+    last_user_id = ""
+    while True:
+        user_ids = [
+            r[0]
+            for r in db.query(User.id)
+            .filter(User.id > last_user_id)
+            .filter(~granted)
+            .order_by(User.id)
+            .limit(batch_size)
+            .all()
+        ]
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            if grant_signup_bonus(db, user_id) is not None:
+                total += 1
+        db.commit()
+        last_user_id = user_ids[-1]
+    mark_applied(db.connection(), SIGNUP_BONUS_BACKFILL)
+    db.commit()
+    if total:
+        logger.info("signup bonus granted to %d users", total)
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", nargs="?", const="", metavar="USER_ID", help="增量校验账本 (可指定用户)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.verify is None:
+        parser.print_help()
+        return
+    db = SessionLocal()
+    try:
+        if args.verify:
+            print(verify(db, args.verify))
+        else:
+            failed = verify_all(db)
+            print(f"{len(failed)} mismatched users")
+            for result in failed:
+                print(result)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import threading
+from typing import Any, BinaryIO, Callable, Optional
+from urllib.parse import unquote, urlparse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 消息总线 (Pub/Sub Broker)
+# 功能：实时推送 (会话/通知) 与缓存失效事件的跨进程广播。
+# 发布方只调用 publish(频道, 消息)，由各进程的订阅回调投递到本进程持有的连接；
+# 发布进程自己也通过订阅收到消息，因此本地连接与其他 worker 上的连接走同一条路径。
+# 两种后端，由 PUBSUB_URL 选择：
+# - 留空：进程内后端，publish 直接在当前线程调用订阅回调，适用于单 worker 部署；
+# - redis://[:密码@]主机[:端口]：Redis 协议 (RESP) 后端，可对接 Redis 或兼容服务，
+#   本地开发可用 pubsub_server 提供的替身服务。订阅连接由后台线程读取，断线后自动重连。
+# 消息为 JSON 对象；推送是尽力而为的，丢失的事件由客户端重连后补拉。
+# =============================================================================
+
+Handler = Callable[[dict], None]
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+# -----------------------------------------------------------------------------
+# RESP 编解码 (与 pubsub_server 共用)
+# -----------------------------------------------------------------------------
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class RespError(Exception):
+    pass
+
+
+def read_reply(stream: BinaryIO) -> Any:
+    """读取一个 RESP 回复；连接关闭时抛出 ConnectionError。"""
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        return RespError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        size = int(body)
+        if size < 0:
+            return None
+        data = stream.read(size + 2)
+        if len(data) != size + 2:
+            raise ConnectionError("connection closed")
+        return data[:-2]
+    if kind == b"*":
+        size = int(body)
+        return None if size < 0 else [read_reply(stream) for _ in range(size)]
+    raise ConnectionError(f"unexpected reply {line[:20]!r}")
+
+
+# -----------------------------------------------------------------------------
+# 后端
+# -----------------------------------------------------------------------------
+class InProcessBroker:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handlers: dict[str, list[Handler]] = {}
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def handlers(self, channel: str) -> list[Handler]:
+        with self._lock:
+            return list(self._handlers.get(channel, ()))
+
+    def dispatch(self, channel: str, message: dict) -> None:
+        for handler in self.handlers(channel):
+            try:
+                handler(message)
+            except Exception:
+                logger.exception("pubsub handler failed on channel %s", channel)
+
+    def publish(self, channel: str, message: dict) -> None:
+        self.dispatch(channel, message)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class RedisBroker(InProcessBroker):
+    RECONNECT_MAX_SECONDS = 10.0
+
+    def __init__(self, url: str, prefix: str = "") -> None:
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.prefix = prefix
+        self._pub_lock = threading.Lock()
+        self._pub: Optional[tuple[socket.socket, BinaryIO]] = None
+        self._sub: Optional[tuple[socket.socket, BinaryIO]] = None
+        self._sub_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _connect(self) -> tuple[socket.socket, BinaryIO]:
+        sock = socket.create_connection((self.host, self.port), timeout=5)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rb")
+        if self.password:
+            sock.sendall(encode_command("AUTH", self.password))
+            reply = read_reply(stream)
+            if isinstance(reply, RespError):
+                sock.close()
+                raise reply
+        return sock, stream
+
+    def _channel(self, channel: str) -> str:
+        return self.prefix + channel
+
+    # -- 发布：单连接串行发送，出错时重连一次 ---------------------------------
+    def publish(self, channel: str, message: dict) -> None:
+        payload = json.dumps(message, ensure_ascii=False, default=_json_default)
+        command = encode_command("PUBLISH", self._channel(channel), payload)
+        with self._pub_lock:
+            for attempt in (1, 2):
+                try:
+                    if self._pub is None:
+                        self._pub = self._connect()
+                    sock, stream = self._pub
+                    sock.sendall(command)
+                    reply = read_reply(stream)
+                    if isinstance(reply, RespError):
+                        raise reply
+                    return
+                except (OSError, ConnectionError, RespError):
+                    self._close_pub()
+                    if attempt == 2:
+                        logger.exception("pubsub publish to %s failed", channel)
+
+    def _close_pub(self) -> None:
+        if self._pub is not None:
+            try:
+                self._pub[0].close()
+            except OSError:
+                pass
+            self._pub = None
+
+    # -- 订阅：后台线程持有订阅连接并分发消息 ----------------------------------
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        super().subscribe(channel, handler)
+        with self._sub_lock:
+            if self._sub is not None:
+                try:
+                    self._sub[0].sendall(encode_command("SUBSCRIBE", self._channel(channel)))
+                except OSError:
+                    pass  # 读取线程会重连并重新订阅全部频道
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pubsub-subscriber", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._sub_lock:
+            if self._sub is not None:
+                try:
+                    self._sub[0].shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._pub_lock:
+            self._close_pub()
+
+    def _run(self) -> None:
+        delay = 0.5
+        while not self._stop.is_set():
+            try:
+                sock, stream = self._connect()
+                sock.settimeout(None)
+                with self._sub_lock:
+                    with self._lock:
+                        channels = list(self._handlers)
+                    if channels:
+                        sock.sendall(encode_command("SUBSCRIBE", *[self._channel(c) for c in channels]))
+                    self._sub = (sock, stream)
+                delay = 0.5
+                self._read_loop(stream)
+            except (OSError, ConnectionError, RespError) as exc:
+                if not self._stop.is_set():
+                    logger.warning("pubsub subscriber disconnected: %s", exc)
+            finally:
+                with self._sub_lock:
+                    if self._sub is not None:
+                        try:
+                            self._sub[0].close()
+                        except OSError:
+                            pass
+                        self._sub = None
+            if self._stop.wait(delay):
+                return
+            delay = min(self.RECONNECT_MAX_SECONDS, delay * 2)
+
+    def _read_loop(self, stream: BinaryIO) -> None:
+        while not self._stop.is_set():
+            reply = read_reply(stream)
+            if not isinstance(reply, list) or len(reply) != 3 or reply[0] != b"message":
+                continue
+            channel = reply[1].decode("utf-8")
+            if not channel.startswith(self.prefix):
+                continue
+            try:
+                message = json.loads(reply[2])
+            except ValueError:
+                continue
+            self.dispatch(channel[len(self.prefix):], message)
+
+
+def _create_broker() -> InProcessBroker:
+    url = settings.PUBSUB_URL.strip()
+    if not url:
+        return InProcessBroker()
+    if urlparse(url).scheme not in ("redis", "resp"):
+        raise ValueError(f"unsupported PUBSUB_URL scheme: {url}")
+    return RedisBroker(url, settings.PUBSUB_CHANNEL_PREFIX)
+
+
+broker = _create_broker()
+
+
+def publish(channel: str, message: dict) -> None:
+    broker.publish(channel, message)
+
+
+def subscribe(channel: str, handler: Handler) -> None:
+    broker.subscribe(channel, handler)
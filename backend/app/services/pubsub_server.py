@@ -0,0 +1,149 @@
+"""
+Redis 协议消息总线替身服务 (Pub/Sub Stand-in Server)
+
+仅实现 RedisBroker 用到的命令：PING / AUTH / SELECT / PUBLISH / SUBSCRIBE / UNSUBSCRIBE / QUIT，
+供本地开发或多 worker 联调时代替 Redis，不做持久化，不适合生产环境。
+用法 (在 backend 目录下)：
+    python -m app.services.pubsub_server --port 6380
+    PUBSUB_URL=redis://127.0.0.1:6380 uvicorn app.main:app --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import socket
+import socketserver
+import threading
+from typing import Optional
+
+from app.services.pubsub import RespError, encode_command, read_reply
+
+logger = logging.getLogger(__name__)
+
+
+def _simple(text: str) -> bytes:
+    return f"+{text}\r\n".encode("utf-8")
+
+
+def _error(text: str) -> bytes:
+    return f"-ERR {text}\r\n".encode("utf-8")
+
+
+class _Client:
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.channels: set[bytes] = set()
+
+    def send(self, data: bytes) -> bool:
+        with self.lock:
+            try:
+                self.sock.sendall(data)
+                return True
+            except OSError:
+                return False
+
+
+class PubSubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int], password: Optional[str] = None) -> None:
+        super().__init__(address, _Handler)
+        self.password = password
+        self.lock = threading.Lock()
+        self.subscribers: dict[bytes, set[_Client]] = {}
+
+    def subscribe(self, client: _Client, channel: bytes) -> None:
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(client)
+        client.channels.add(channel)
+
+    def unsubscribe(self, client: _Client, channel: bytes) -> None:
+        with self.lock:
+            clients = self.subscribers.get(channel)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self.subscribers[channel]
+        client.channels.discard(channel)
+
+    def publish(self, channel: bytes, data: bytes) -> int:
+        with self.lock:
+            clients = list(self.subscribers.get(channel, ()))
+        message = encode_command("message", channel, data)
+        return sum(1 for c in clients if c.send(message))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: PubSubServer
+
+    def handle(self) -> None:
+        client = _Client(self.request)
+        authed = not self.server.password
+        try:
+            while True:
+                try:
+                    command = read_reply(self.rfile)
+                except ConnectionError:
+                    return
+                if not isinstance(command, list) or not command or isinstance(command, RespError):
+                    client.send(_error("protocol error"))
+                    return
+                name = command[0].decode("utf-8", "replace").upper()
+                args = command[1:]
+                if name == "AUTH":
+                    authed = bool(args) and args[-1].decode("utf-8") == self.server.password
+                    client.send(_simple("OK") if authed else _error("invalid password"))
+                elif name == "QUIT":
+                    client.send(_simple("OK"))
+                    return
+                elif not authed:
+                    client.send(b"-NOAUTH Authentication required.\r\n")
+                elif name == "PING":
+                    client.send(_simple("PONG"))
+                elif name == "SELECT":
+                    client.send(_simple("OK"))
+                elif name == "PUBLISH" and len(args) == 2:
+                    client.send(b":%d\r\n" % self.server.publish(args[0], args[1]))
+                elif name == "SUBSCRIBE" and args:
+                    for channel in args:
+                        self.server.subscribe(client, channel)
+                        client.send(encode_command("subscribe", channel, len(client.channels)))
+                elif name == "UNSUBSCRIBE":
+                    for channel in args or list(client.channels):
+                        self.server.unsubscribe(client, channel)
+                        client.send(encode_command("unsubscribe", channel, len(client.channels)))
+                else:
+                    client.send(_error(f"unsupported command '{name.lower()}'"))
+        finally:
+            for channel in list(client.channels):
+                self.server.unsubscribe(client, channel)
+
+
+def serve(host: str = "127.0.0.1", port: int = 6380, password: Optional[str] = None) -> PubSubServer:
+    """在后台线程启动替身服务并返回服务对象 (port=0 时由系统分配端口)。"""
+    server = PubSubServer((host, port), password)
+    threading.Thread(target=server.serve_forever, name="pubsub-server", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--password")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = PubSubServer((args.host, args.port), args.password)
+    logger.info("pubsub stand-in listening on %s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from datetime import date, datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import WebSocket
+
+from app.services import pubsub
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 实时推送连接注册表 (Realtime Connection Registry)
+# 功能：登记本进程内每个用户的长连接 (WebSocket / SSE)，把事件推送给指定用户。
+# - 每个连接只占用一个有界队列和一个发送协程，空闲连接不持有数据库会话；
+# - publish 可在同步接口 (线程池) 中调用，通过 call_soon_threadsafe 投递到事件循环；
+# - 队列写满说明客户端消费过慢，直接断开该连接，由客户端重连后重新拉取。
+# 注册表仅覆盖当前进程；publish 经消息总线 (pubsub) 广播，由每个进程投递给本地连接，
+# 多 worker 部署时连接在哪个进程上都能收到事件。
+# =============================================================================
+
+QUEUE_SIZE = 256
+CHANNEL = "realtime"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscriber:
+    """一个在线连接：事件先编码为文本，再进入有界队列，由连接自己的协程发送。"""
+
+    def __init__(self, user_id: str) -> None:
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def encode(self, event: dict[str, Any]) -> str:
+        return json.dumps(event, ensure_ascii=False, default=_json_default)
+
+    def offer(self, message: Optional[str]) -> None:
+        """在事件循环线程内入队；队列已满时关闭连接。"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("realtime queue full, dropping connection of user %s", self.user_id)
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Connection(Subscriber):
+    def __init__(self, websocket: WebSocket, user_id: str) -> None:
+        super().__init__(user_id)
+        self.websocket = websocket
+        # 已校验过的会话 -> 参与者 ID，避免每次输入状态事件都查库
+        self.conversation_members: dict[str, list[str]] = {}
+
+    async def sender(self) -> None:
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                await self.websocket.close(code=1013)
+                return
+            await self.websocket.send_text(message)
+
+
+class ConnectionRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_user: dict[str, set[Subscriber]] = {}
+
+    def add(self, conn: Subscriber) -> None:
+        with self._lock:
+            self._by_user.setdefault(conn.user_id, set()).add(conn)
+
+    def remove(self, conn: Subscriber) -> None:
+        with self._lock:
+            conns = self._by_user.get(conn.user_id)
+            if conns is None:
+                return
+            conns.discard(conn)
+            if not conns:
+                del self._by_user[conn.user_id]
+
+    def connections(self, user_ids: Iterable[str]) -> list[Subscriber]:
+        with self._lock:
+            return [c for uid in set(user_ids) for c in self._by_user.get(uid, ())]
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(len(c) for c in self._by_user.values())
+
+    def publish(self, user_ids: Iterable[str], event: dict[str, Any], exclude: Optional[Subscriber] = None) -> int:
+        """向给定用户的所有连接推送事件，可在任意线程调用，返回投递的连接数。"""
+        conns = [c for c in self.connections(user_ids) if c is not exclude]
+        if not conns:
+            return 0
+        encoded: dict[type, str] = {}
+        for conn in conns:
+            kind = type(conn)
+            if kind not in encoded:
+                encoded[kind] = conn.encode(event)
+            message = encoded[kind]
+            try:
+                conn.loop.call_soon_threadsafe(conn.offer, message)
+            except RuntimeError:
+                # 事件循环已关闭 (进程退出中)
+                self.remove(conn)
+        return len(conns)
+
+
+registry = ConnectionRegistry()
+
+
+def publish(user_ids: Iterable[str], event: dict[str, Any]) -> None:
+    """经消息总线向给定用户推送事件 (所有进程上的连接)。"""
+    pubsub.publish(CHANNEL, {"user_ids": sorted(set(user_ids)), "event": event})
+
+
+def _deliver(message: dict) -> None:
+    registry.publish(message.get("user_ids") or [], message.get("event") or {})
+
+
+pubsub.subscribe(CHANNEL, _deliver)
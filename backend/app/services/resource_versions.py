@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.conversation import ConversationParticipant
+from app.models.core import Announcement, ResourceVersion, Tag
+from app.models.match import MatchOffer
+from app.models.notification import Notification
+
+# =============================================================================
+# 资源版本号与条件请求 (Resource Versions / ETag)
+# 功能：为被轮询的列表接口提供廉价的 ETag：
+# - 每个资源键在 resource_versions 中有一个版本号，资源变化时在同一事务内 +1；
+# - ORM 写入 (add/修改/delete) 在 flush 后按对象类型自动推导资源键并递增；
+#   批量 UPDATE/DELETE/INSERT 不经过 flush，需由调用方用 touch 显式递增；
+# - 接口先按主键读取版本号计算 ETag，与 If-None-Match 相同时直接返回 304，
+#   不执行列表查询与序列化 (见 deps.not_modified)。
+# 版本号只用于比较是否相等，ETag 还包含用户 ID 与查询参数。
+# =============================================================================
+
+TAGS = "tags"
+ANNOUNCEMENTS = "announcements"
+POINT_ROLLUPS = "point_rollups"
+
+
+def notifications_key(user_id: str) -> str:
+    return f"notifications:{user_id}"
+
+
+def conversations_key(user_id: str) -> str:
+    return f"conversations:{user_id}"
+
+
+def offers_key(teacher_id: str) -> str:
+    return f"offers:{teacher_id}"
+
+
+def _keys_for(obj: Any) -> list[str]:
+    if isinstance(obj, Tag):
+        return [TAGS]
+    if isinstance(obj, Announcement):
+        return [ANNOUNCEMENTS]
+    if isinstance(obj, Notification) and obj.user_id:
+        return [notifications_key(obj.user_id)]
+    if isinstance(obj, ConversationParticipant) and obj.user_id:
+        return [conversations_key(obj.user_id)]
+    if isinstance(obj, MatchOffer) and obj.teacher_id:
+        return [offers_key(obj.teacher_id)]
+    return []
+
+
+def _bump(conn: Connection, keys: Iterable[str]) -> None:
+    # 排序后按固定顺序加锁，避免并发事务互相等待
+    keys = sorted({k for k in keys if k})
+    if not keys:
+        return
+    table = ResourceVersion.__table__
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values([{"key": k, "version": 1} for k in keys])
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.key], set_={"version": table.c.version + 1})
+    conn.execute(stmt)
+
+
+def touch(db: Session, *keys: str) -> None:
+    """递增资源版本号 (不提交)，用于不经过 ORM flush 的批量写入。"""
+    _bump(db.connection(), keys)
+
+
+def current(db: Session, key: str) -> int:
+    """读取单个资源键的版本号 (不存在时为 0)。"""
+    value = db.query(ResourceVersion.version).filter(ResourceVersion.key == key).scalar()
+    return int(value or 0)
+
+
+def etag(db: Session, keys: list[str], *params: Any) -> str:
+    """按资源版本号与查询参数计算弱 ETag。"""
+    rows = dict(
+        db.query(ResourceVersion.key, ResourceVersion.version).filter(ResourceVersion.key.in_(keys)).all()
+    )
+    raw = "|".join(f"{k}={rows.get(k, 0)}" for k in keys) + "|" + "|".join(str(p) for p in params)
+    return 'W/"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def matches(if_none_match: Optional[str], value: str) -> bool:
+    """If-None-Match 是否命中 (弱比较，支持逗号分隔的多个值与 *)。"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = value[2:] if value.startswith("W/") else value
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == target:
+            return True
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context: Any) -> None:
+    # after_flush 中 new/dirty/deleted 仍是本次 flush 前的状态
+    keys: set[str] = set()
+    for obj in session.new:
+        keys.update(_keys_for(obj))
+    for obj in session.deleted:
+        keys.update(_keys_for(obj))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            keys.update(_keys_for(obj))
+    if keys:
+        _bump(session.connection(), keys)
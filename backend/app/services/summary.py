@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models.conversation import ConversationParticipant
+from app.models.match import MatchOffer
+from app.models.notification import Notification, NotificationCounter
+from app.models.user import User
+from app.services.verification import is_verified_teacher
+
+# =============================================================================
+# 角标汇总 (Badge Summary)
+# 功能：/me/summary 一次返回导航栏与首页角标所需的全部计数，代替分别轮询
+# 通知未读数、会话未读数、会话列表与邀约收件箱：
+# - 通知未读数读取 notification_counters 一行，另取该用户最新通知时间
+#   ((user_id, created_at, id) 索引)：合并通知不改变未读数，但会把 created_at 顺延；
+# - 会话未读数与最后消息时间由 conversation_participants 的一次聚合得到 (user_id 索引)；
+# - 待处理邀约数只对已认证老师查询 (teacher_id 索引)。
+# version 由上述计数与时间戳计算，任一角标或会话列表变化时随之改变，
+# 客户端可据此判断是否需要重新拉取列表。
+# =============================================================================
+
+
+def _version(parts: list[Any]) -> str:
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def badge_summary(db: Session, user: User) -> dict:
+    counter = (
+        db.query(NotificationCounter.unread_count, NotificationCounter.updated_at)
+        .filter(NotificationCounter.user_id == user.id)
+        .first()
+    )
+    unread_notifications = int(counter[0] or 0) if counter else 0
+    latest_notification_at = (
+        db.query(func.max(Notification.created_at)).filter(Notification.user_id == user.id).scalar()
+    )
+
+    unread_conversations, unread_messages, last_message_at = (
+        db.query(
+            func.count(case((ConversationParticipant.unread_count > 0, 1))),
+            func.coalesce(func.sum(ConversationParticipant.unread_count), 0),
+            func.max(ConversationParticipant.last_message_at),
+        )
+        .filter(ConversationParticipant.user_id == user.id)
+        .one()
+    )
+
+    pending_offers, offers_changed_at = 0, None
+    if is_verified_teacher(user):
+        pending_offers, offers_changed_at = (
+            db.query(
+                func.count(MatchOffer.id),
+                func.max(func.coalesce(MatchOffer.updated_at, MatchOffer.created_at)),
+            )
+            .filter(MatchOffer.teacher_id == user.id)
+            .filter(MatchOffer.status == "pending")
+            .one()
+        )
+
+    version = _version(
+        [
+            unread_notifications,
+            counter[1] if counter else None,
+            latest_notification_at,
+            unread_conversations,
+            unread_messages,
+            last_message_at,
+            pending_offers,
+            offers_changed_at,
+        ]
+    )
+    return {
+        "unread_notifications": unread_notifications,
+        "unread_conversations": int(unread_conversations or 0),
+        "unread_messages": int(unread_messages or 0),
+        "pending_offers": int(pending_offers or 0),
+        "version": version,
+    }
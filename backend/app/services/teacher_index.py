@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.teacher_pool import TeacherPoolEntry, TeacherPoolSlot, TeacherPoolTag
+from app.models.user import User
+from app.services import candidate_cache, time_slots
+from app.services.verification import is_verified_teacher, verified_teacher_clause
+
+# =============================================================================
+# 师资池标签倒排索引 (Teacher Pool Tag Index)
+# 功能：维护 标签 -> 可匹配师资条目 的倒排表 teacher_pool_tags，
+# 以及按星期分桶的可用时间位图 teacher_pool_slots。
+# 仅收录 in_pool 且讲师认证有效的条目；师资条目、标签或认证状态变化的路径
+# 需在同一事务内调用本模块同步索引，由调用方负责 commit。
+# 索引变化会在事务提交后使候选讲师缓存失效 (见 candidate_cache)。
+# =============================================================================
+
+
+def parse_tags(raw: Optional[str]) -> list[str]:
+    try:
+        value = json.loads(raw or "[]")
+    except Exception:
+        return []
+    return [str(x) for x in value] if isinstance(value, list) else []
+
+
+def reindex_entry(db: Session, entry: TeacherPoolEntry, user: Optional[User] = None) -> None:
+    """重建单个师资条目的索引行。不满足匹配条件的条目会被移出索引。"""
+    # 先落库本事务内待写入的索引行，避免重复索引同一条目时主键冲突
+    db.flush()
+    candidate_cache.mark_pool_dirty(db)
+    for model in (TeacherPoolTag, TeacherPoolSlot):
+        db.query(model).filter(model.entry_id == entry.id).delete(synchronize_session=False)
+    if not entry.in_pool:
+        return
+    if user is None:
+        user = db.query(User).filter(User.id == entry.user_id).first()
+    if not is_verified_teacher(user):
+        return
+    _add_rows(db, entry)
+
+
+def _add_rows(db: Session, entry: TeacherPoolEntry) -> bool:
+    tags = sorted(set(parse_tags(entry.tags)))
+    for tag in tags:
+        db.add(TeacherPoolTag(tag=tag, entry_id=entry.id, user_id=entry.user_id, school_id=entry.school_id))
+    for weekday, mask in time_slots.slot_masks(entry.time_slots).items():
+        db.add(
+            TeacherPoolSlot(
+                entry_id=entry.id,
+                weekday=weekday,
+                mask=mask,
+                user_id=entry.user_id,
+                school_id=entry.school_id,
+            )
+        )
+    return bool(tags)
+
+
+def reindex_user(db: Session, user: User) -> None:
+    """用户角色、认证或激活状态变化后，重建其名下所有师资条目的索引。"""
+    # 会话未开启 autoflush：先落库本事务内新增的师资条目 (如审核通过时创建的条目)，否则查询不到
+    db.flush()
+    entries = db.query(TeacherPoolEntry).filter(TeacherPoolEntry.user_id == user.id).all()
+    for entry in entries:
+        reindex_entry(db, entry, user)
+
+
+def drop_entries(
+    db: Session,
+    entry_ids: Optional[Iterable[str]] = None,
+    user_id: Optional[str] = None,
+    school_id: Optional[str] = None,
+) -> None:
+    """师资条目被删除时同步移除索引行（按条目、用户或学校）。"""
+    ids = list(entry_ids) if entry_ids is not None else None
+    if ids is not None and not ids:
+        return
+    for model in (TeacherPoolTag, TeacherPoolSlot):
+        q = db.query(model)
+        if ids is not None:
+            q = q.filter(model.entry_id.in_(ids))
+        elif user_id is not None:
+            q = q.filter(model.user_id == user_id)
+        elif school_id is not None:
+            q = q.filter(model.school_id == school_id)
+        else:
+            return
+        q.delete(synchronize_session=False)
+    candidate_cache.mark_pool_dirty(db)
+
+
+def rebuild_index(db: Session) -> int:
+    """全量重建索引，返回收录的条目数。"""
+    db.query(TeacherPoolTag).delete(synchronize_session=False)
+    db.query(TeacherPoolSlot).delete(synchronize_session=False)
+    entries = (
+        db.query(TeacherPoolEntry)
+        .join(User, User.id == TeacherPoolEntry.user_id)
+        .filter(TeacherPoolEntry.in_pool == True)
+        .filter(verified_teacher_clause())
+        .all()
+    )
+    indexed = 0
+    for e in entries:
+        indexed += 1 if _add_rows(db, e) else 0
+    candidate_cache.mark_pool_dirty(db)
+    db.commit()
+    return indexed
+
+
+def ensure_index(db: Session) -> None:
+    """索引表为空但师资池非空时（首次升级）回填索引。"""
+    pool = db.query(TeacherPoolEntry.id).filter(TeacherPoolEntry.in_pool == True)
+    if db.query(TeacherPoolTag.entry_id).first() is None:
+        if pool.first() is not None:
+            rebuild_index(db)
+        return
+    if db.query(TeacherPoolSlot.entry_id).first() is None:
+        with_slots = pool.filter(TeacherPoolEntry.time_slots.isnot(None)).filter(
+            TeacherPoolEntry.time_slots.notin_(["", "[]"])
+        )
+        if with_slots.first() is not None:
+            rebuild_index(db)
+
+
+def lookup(db: Session, tags: Iterable[str]) -> dict[str, int]:
+    """返回与给定标签共享至少一个标签的条目及其共享标签数。"""
+    wanted = sorted({str(t) for t in tags if t})
+    if not wanted:
+        return {}
+    rows = (
+        db.query(TeacherPoolTag.entry_id, func.count(TeacherPoolTag.tag))
+        .filter(TeacherPoolTag.tag.in_(wanted))
+        .group_by(TeacherPoolTag.entry_id)
+        .all()
+    )
+    return {entry_id: int(cnt or 0) for entry_id, cnt in rows}
+
+
+def slot_lookup(
+    db: Session,
+    masks: dict[int, int],
+    tags: Optional[Iterable[str]] = None,
+) -> dict[str, dict[int, int]]:
+    """
+    返回与给定时间位图有重合的条目及其按星期的位图。
+    传入 tags 时只在共享标签的条目中查找，否则在全部可匹配条目中查找。
+    """
+    conds = [
+        and_(TeacherPoolSlot.weekday == day, TeacherPoolSlot.mask.op("&")(mask) != 0)
+        for day, mask in masks.items()
+        if mask
+    ]
+    if not conds:
+        return {}
+    q = db.query(TeacherPoolSlot.entry_id, TeacherPoolSlot.weekday, TeacherPoolSlot.mask).filter(or_(*conds))
+    if tags is not None:
+        wanted = sorted({str(t) for t in tags if t})
+        if not wanted:
+            return {}
+        tagged = db.query(TeacherPoolTag.entry_id).filter(TeacherPoolTag.tag.in_(wanted))
+        q = q.filter(TeacherPoolSlot.entry_id.in_(tagged))
+    found: dict[str, dict[int, int]] = {}
+    for entry_id, weekday, mask in q.all():
+        found.setdefault(entry_id, {})[int(weekday)] = int(mask or 0)
+    return found
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.match import MatchOffer, TeacherLoad
+from app.services.clock import naive_utc
+
+# =============================================================================
+# 讲师负载 (Teacher Load)
+# 功能：在邀约发出/接受/拒绝/过期时增量维护 teacher_loads 计数，
+# 匹配排序据此对候选讲师做负载均衡：
+# - 待回复邀约数达到 MATCH_TEACHER_CAPACITY 的讲师排在其余讲师之后；
+# - 分数扣除 MATCH_LOAD_WEIGHT * (待回复邀约 + 近期接单) / 容量；
+# - 调整后分数相同的讲师按最近收到邀约的时间轮换 (久未收到邀约者优先)。
+# 近期接单数以 MATCH_LOAD_WINDOW_HOURS 为时间常数指数衰减，无需按时间窗口 COUNT。
+# 计数与邀约状态在同一事务内修改，由调用方负责 commit。
+# 邀约状态一律以 "status == pending" 为条件的 UPDATE 迁移 (claim_offer / close_pending)，
+# 接受、拒绝与派单过期并发时只有迁移成功的一方扣减计数。
+# =============================================================================
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+def _decayed(value: float, since: Optional[datetime], now: datetime) -> float:
+    if not value or since is None:
+        return float(value or 0.0)
+    hours = max(0.0, (now - naive_utc(since)).total_seconds() / 3600)
+    return float(value) * math.exp(-hours / max(settings.MATCH_LOAD_WINDOW_HOURS, 1e-6))
+
+
+def _ensure_rows(db: Session, user_ids: Iterable[str]) -> None:
+    # 同一位新讲师的首批邀约可能并发发出：用 ON CONFLICT DO NOTHING 插入，已存在的行保持不变
+    ids = sorted({u for u in user_ids if u})
+    if not ids:
+        return
+    table = TeacherLoad.__table__
+    conn = db.connection()
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values([{"user_id": u, "pending_offers": 0, "recent_accepts": 0.0} for u in ids])
+    conn.execute(stmt.on_conflict_do_nothing(index_elements=[table.c.user_id]))
+
+
+def offers_opened(db: Session, teacher_ids: Iterable[str], now: Optional[datetime] = None) -> None:
+    """新发出邀约：待回复数 +1，记录最近邀约时间。"""
+    counts = Counter(teacher_ids)
+    if not counts:
+        return
+    now = now or _utcnow()
+    _ensure_rows(db, counts)
+    for user_id, n in counts.items():
+        db.query(TeacherLoad).filter(TeacherLoad.user_id == user_id).update(
+            {TeacherLoad.pending_offers: func.coalesce(TeacherLoad.pending_offers, 0) + n, TeacherLoad.last_offer_at: now},
+            synchronize_session=False,
+        )
+
+
+def offers_closed(db: Session, teacher_ids: Iterable[str]) -> None:
+    """待回复邀约被接受/拒绝/过期：待回复数 -1 (不低于 0)。"""
+    counts = Counter(teacher_ids)
+    if not counts:
+        return
+    _ensure_rows(db, counts)
+    for user_id, n in counts.items():
+        pending = func.coalesce(TeacherLoad.pending_offers, 0)
+        db.query(TeacherLoad).filter(TeacherLoad.user_id == user_id).update(
+            {TeacherLoad.pending_offers: case((pending > n, pending - n), else_=0)},
+            synchronize_session=False,
+        )
+
+
+def offer_accepted(db: Session, teacher_id: str, now: Optional[datetime] = None) -> None:
+    """讲师接受邀约：关闭该邀约并累加近期接单数。"""
+    now = now or _utcnow()
+    offers_closed(db, [teacher_id])
+    row = db.query(TeacherLoad).filter(TeacherLoad.user_id == teacher_id).first()
+    row.recent_accepts = _decayed(row.recent_accepts, row.accepts_updated_at, now) + 1.0
+    row.accepts_updated_at = now
+    db.add(row)
+
+
+def claim_offer(db: Session, offer_id: str, status: str) -> bool:
+    """把仍待回复的邀约改为 status (条件更新)，返回是否成功；不修改计数。"""
+    updated = (
+        db.query(MatchOffer)
+        .filter(MatchOffer.id == offer_id)
+        .filter(MatchOffer.status == "pending")
+        .update({MatchOffer.status: status}, synchronize_session=False)
+    )
+    return bool(updated)
+
+
+def close_pending(db: Session, query, status: str) -> list[str]:
+    """
+    把查询 (MatchOffer 查询) 中待回复的邀约逐条改为 status 并扣减待回复数，
+    返回实际关闭的邀约所属讲师 ID。
+    """
+    closed = [
+        teacher_id
+        for offer_id, teacher_id in query.filter(MatchOffer.status == "pending")
+        .with_entities(MatchOffer.id, MatchOffer.teacher_id)
+        .all()
+        if claim_offer(db, offer_id, status)
+    ]
+    offers_closed(db, closed)
+    return closed
+
+
+def rerank(db: Session, ranked: list, now: Optional[datetime] = None) -> list:
+    """按负载调整 [(分数, 师资条目, 讲师)] 的顺序，分数本身不变。"""
+    if len(ranked) < 2:
+        return list(ranked)
+    now = now or _utcnow()
+    user_ids = list({u.id for _, _, u in ranked})
+    rows = {r.user_id: r for r in db.query(TeacherLoad).filter(TeacherLoad.user_id.in_(user_ids)).all()}
+    capacity = max(1, settings.MATCH_TEACHER_CAPACITY)
+
+    def key(item):
+        pos, (score, _, u) = item
+        row = rows.get(u.id)
+        pending = int(row.pending_offers or 0) if row else 0
+        recent = _decayed(row.recent_accepts, row.accepts_updated_at, now) if row else 0.0
+        adjusted = score - settings.MATCH_LOAD_WEIGHT * (pending + recent) / capacity
+        last = naive_utc(row.last_offer_at) if row and row.last_offer_at else datetime.min
+        return (pending >= capacity, -round(adjusted, 9), last, pos)
+
+    return [item for _, item in sorted(enumerate(ranked), key=key)]
+
+
+def backfill(db: Session) -> None:
+    """首次升级时根据现有待回复邀约初始化计数。"""
+    if db.query(TeacherLoad.user_id).first() is not None:
+        return
+    rows = (
+        db.query(MatchOffer.teacher_id, func.count(MatchOffer.id))
+        .filter(MatchOffer.status == "pending")
+        .group_by(MatchOffer.teacher_id)
+        .all()
+    )
+    for teacher_id, n in rows:
+        if teacher_id:
+            db.add(TeacherLoad(user_id=teacher_id, pending_offers=int(n or 0), recent_accepts=0.0))
+    db.commit()
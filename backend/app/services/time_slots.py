@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterable, Optional
+
+# =============================================================================
+# 时间段解析与重合计算 (Time Slot Engine)
+# 功能：把师资/求助单中的时间段 (JSON 字符串列表) 解析为规范化区间，
+# 并编码为按星期分桶的位图：每天 48 个半小时槽位，一位表示一个槽位。
+# 位图与运算 + popcount 即可得到两组时间段的重合时长。
+#
+# 支持的写法示例：
+# - "周一晚"、"周末下午"、"工作日 19:00-21:00"、"周一至周五 8点-10点"
+# - {"weekday": 1, "start": "19:00", "end": "21:00"}  (weekday: 1=周一 ... 7=周日)
+# =============================================================================
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+# 未指明具体时间时使用的时段 (开始分钟, 结束分钟)
+DAY_PARTS: list[tuple[tuple[str, ...], tuple[int, int]]] = [
+    (("全天", "整天"), (8 * 60, 22 * 60)),
+    (("早上", "早晨", "清晨"), (7 * 60, 9 * 60)),
+    (("上午",), (8 * 60, 12 * 60)),
+    (("中午", "午间"), (12 * 60, 14 * 60)),
+    (("下午",), (14 * 60, 18 * 60)),
+    (("傍晚",), (17 * 60, 19 * 60)),
+    (("晚上", "晚间", "夜间", "晚"), (19 * 60, 22 * 60)),
+]
+DEFAULT_DAY_RANGE = (8 * 60, 22 * 60)
+
+_DAY_CHARS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+_DAY_CHARS.update({str(i + 1): i for i in range(7)})
+_EN_DAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+_DAY_TOKEN = r"(?:周|星期|礼拜)([一二三四五六日天1-7])"
+_DAY_RANGE_RE = re.compile(_DAY_TOKEN + r"\s*(?:至|到|~|～|-|—)\s*" + _DAY_TOKEN)
+_DAY_RE = re.compile(_DAY_TOKEN)
+_EN_DAY_RE = re.compile(r"\b(mon|tue|wed|thu|fri|sat|sun)[a-z]*\b", re.IGNORECASE)
+_TIME_RANGE_RE = re.compile(
+    r"(\d{1,2})(?:[:：](\d{2}))?\s*(?:点|时)?\s*(?:-|~|～|—|至|到)\s*(\d{1,2})(?:[:：](\d{2}))?\s*(?:点|时)?"
+)
+
+
+def _parse_hhmm(value: Any) -> Optional[int]:
+    m = re.match(r"^\s*(\d{1,2})(?:[:：](\d{2}))?\s*$", str(value or ""))
+    if not m:
+        return None
+    minutes = int(m.group(1)) * 60 + int(m.group(2) or 0)
+    return minutes if 0 <= minutes <= 24 * 60 else None
+
+
+def _parse_days(text: str) -> list[int]:
+    days: set[int] = set()
+    for m in _DAY_RANGE_RE.finditer(text):
+        a, b = _DAY_CHARS[m.group(1)], _DAY_CHARS[m.group(2)]
+        days.update(range(a, b + 1) if a <= b else list(range(a, 7)) + list(range(0, b + 1)))
+    text = _DAY_RANGE_RE.sub(" ", text)
+    days.update(_DAY_CHARS[m.group(1)] for m in _DAY_RE.finditer(text))
+    days.update(_EN_DAYS[m.group(1).lower()[:3]] for m in _EN_DAY_RE.finditer(text))
+    if "周末" in text or "双休" in text or "weekend" in text.lower():
+        days.update((5, 6))
+    if "工作日" in text or "weekday" in text.lower():
+        days.update(range(5))
+    if not days or any(k in text for k in ("每天", "每日", "天天")):
+        days.update(range(7))
+    return sorted(days)
+
+
+def _parse_ranges(text: str) -> list[tuple[int, int]]:
+    ranges: list[tuple[int, int]] = []
+    afternoon = any(k in text for k in ("下午", "傍晚", "晚"))
+    for m in _TIME_RANGE_RE.finditer(text):
+        start = int(m.group(1)) * 60 + int(m.group(2) or 0)
+        end = int(m.group(3)) * 60 + int(m.group(4) or 0)
+        if afternoon and start < 12 * 60 and end <= 12 * 60:
+            start, end = start + 12 * 60, end + 12 * 60
+        if 0 <= start < end <= 24 * 60:
+            ranges.append((start, end))
+    if ranges:
+        return ranges
+    for words, day_range in DAY_PARTS:
+        if any(w in text for w in words):
+            ranges.append(day_range)
+            # "晚" 是 "晚上" 的前缀，命中更具体的时段后不再重复计入
+            text = re.sub("|".join(words), " ", text)
+    return ranges or [DEFAULT_DAY_RANGE]
+
+
+def parse_slot(slot: Any) -> list[tuple[int, int, int]]:
+    """解析单个时间段，返回 (星期 0-6, 开始分钟, 结束分钟) 区间列表。"""
+    if isinstance(slot, dict):
+        weekday = slot.get("weekday", slot.get("day"))
+        start = _parse_hhmm(slot.get("start"))
+        end = _parse_hhmm(slot.get("end"))
+        try:
+            day = int(weekday) - 1
+        except (TypeError, ValueError):
+            return []
+        if not (0 <= day < 7) or start is None or end is None or start >= end:
+            return []
+        return [(day, start, end)]
+    text = str(slot or "").strip()
+    if not text:
+        return []
+    return [(day, start, end) for day in _parse_days(text) for start, end in _parse_ranges(text)]
+
+
+def parse_slots(raw: Any) -> list[tuple[int, int, int]]:
+    """解析时间段列表 (JSON 字符串或列表)。"""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw or "[]")
+        except Exception:
+            raw = [x for x in re.split(r"[,，、;；]", raw) if x.strip()]
+    if not isinstance(raw, list):
+        return []
+    intervals: list[tuple[int, int, int]] = []
+    for slot in raw:
+        intervals.extend(parse_slot(slot))
+    return intervals
+
+
+def day_masks(intervals: Iterable[tuple[int, int, int]]) -> dict[int, int]:
+    """把区间编码为 {星期: 当天 48 位槽位位图}，不足半小时的部分向外取整。"""
+    masks: dict[int, int] = {}
+    for day, start, end in intervals:
+        first = start // SLOT_MINUTES
+        last = min(SLOTS_PER_DAY, -(-end // SLOT_MINUTES))
+        if first >= last:
+            continue
+        bits = ((1 << (last - first)) - 1) << first
+        masks[day] = (masks.get(day, 0) | bits) & DAY_MASK
+    return masks
+
+
+def slot_masks(raw: Any) -> dict[int, int]:
+    return day_masks(parse_slots(raw))
+
+
+def total_minutes(masks: dict[int, int]) -> int:
+    return sum(m.bit_count() for m in masks.values()) * SLOT_MINUTES
+
+
+def overlap_minutes(a: dict[int, int], b: dict[int, int]) -> int:
+    return sum((mask & b.get(day, 0)).bit_count() for day, mask in a.items()) * SLOT_MINUTES
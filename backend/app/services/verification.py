@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, object_session
+
+from app.models.user import User
+from app.services import candidate_cache
+
+# =============================================================================
+# 认证状态物化 (Verification Columns)
+# 功能：profile.verification 中的学生/讲师认证状态同步到 users 表的索引列，
+# 讲师资格等判断直接在 SQL 中完成，无需逐个解析 profile JSON。
+# 所有写 profile 的路径都应通过 sync_columns 保持两者一致。
+# =============================================================================
+
+
+def _status(verification: dict, key: str) -> str:
+    value = verification.get(key) if isinstance(verification, dict) else None
+    return str(value) if value else "none"
+
+
+def sync_columns(user: User, profile: Optional[dict]) -> None:
+    """根据 profile.verification 更新 users 表中的认证状态列。"""
+    verification = profile.get("verification") if isinstance(profile, dict) else None
+    verification = verification if isinstance(verification, dict) else {}
+    user.student_verification = _status(verification, "student")
+    teacher_status = _status(verification, "teacher")
+    if user.teacher_verification is not None and user.teacher_verification != teacher_status:
+        # 讲师认证变化影响候选排序，提交后使候选缓存失效
+        candidate_cache.mark_pool_dirty(object_session(user))
+    user.teacher_verification = teacher_status
+
+
+def is_verified_teacher(user: Optional[User]) -> bool:
+    return bool(
+        user
+        and user.is_active
+        and user.role == "volunteer_teacher"
+        and user.teacher_verification == "verified"
+    )
+
+
+def verified_teacher_clause():
+    """讲师资格的 SQL 条件，与 is_verified_teacher 等价。"""
+    return and_(
+        User.is_active == True,
+        User.role == "volunteer_teacher",
+        User.teacher_verification == "verified",
+    )
+
+
+def backfill_columns(db: Session, batch_size: int = 500) -> int:
+    """为升级前的存量用户回填认证状态列，返回处理的用户数。"""
+    done = 0
+    while True:
+        users = (
+            db.query(User)
+            .filter(or_(User.student_verification.is_(None), User.teacher_verification.is_(None)))
+            .limit(batch_size)
+            .all()
+        )
+        if not users:
+            return done
+        for u in users:
+            try:
+                profile = json.loads(u.profile or "{}")
+            except Exception:
+                profile = {}
+            sync_columns(u, profile if isinstance(profile, dict) else {})
+            db.add(u)
+        db.commit()
+        done += len(users)
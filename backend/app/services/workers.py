@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# 后台线程 (Background Workers)
+# 功能：进程内后台线程的公共基类，统一守护线程的启停、会话创建与异常处理，
+# 任务出错时回滚并记录日志，线程不退出：
+# - PeriodicWorker：每隔 interval() 秒在新会话中执行一次 tick (可选启动时先执行一次)；
+# - QueueWorker：处理 enqueue 投入的任务 ID，并每隔 poll_seconds() 扫描一次 scan_ids 返回的任务。
+#   扫描按时间间隔执行、不依赖队列空闲，持续有新任务入队时也会按时扫描。
+# 各模块创建单例 worker，由 main.py 在应用启动/关闭时统一启停。
+# =============================================================================
+
+
+class BackgroundWorker:
+    """守护线程的启停，子类实现 _run (循环检查 self._stop)。"""
+
+    name = "worker"
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        raise NotImplementedError
+
+
+class PeriodicWorker(BackgroundWorker):
+    """定时任务：每隔 interval() 秒执行一次 tick；run_at_start 为 False 时先等待一个间隔。"""
+
+    run_at_start = True
+
+    def interval(self) -> float:
+        raise NotImplementedError
+
+    def tick(self, db: Session) -> None:
+        raise NotImplementedError
+
+    def _run(self) -> None:
+        if not self.run_at_start and self._stop.wait(self.interval()):
+            return
+        while not self._stop.is_set():
+            db = self._session_factory()
+            try:
+                self.tick(db)
+            except Exception:
+                db.rollback()
+                logger.exception("%s failed", self.name)
+            finally:
+                db.close()
+            self._stop.wait(self.interval())
+
+
+class QueueWorker(BackgroundWorker):
+    """队列任务 + 定时扫描；scan_at_start 为 True 时启动后立即扫描一次。"""
+
+    scan_at_start = False
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        super().__init__(session_factory)
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def poll_seconds(self) -> float:
+        raise NotImplementedError
+
+    def scan_ids(self, db: Session) -> list[str]:
+        raise NotImplementedError
+
+    def handle(self, db: Session, item_id: str) -> None:
+        raise NotImplementedError
+
+    def on_failure(self, db: Session, item_id: str, exc: Exception) -> None:
+        db.rollback()
+
+    def enqueue(self, item_id: str) -> None:
+        self._queue.put(item_id)
+
+    def stop(self) -> None:
+        # 放入 None 唤醒阻塞在队列上的线程，不必等到下一次扫描
+        self._stop.set()
+        self._queue.put(None)
+        super().stop()
+
+    def _run(self) -> None:
+        next_scan = time.monotonic() + (0.0 if self.scan_at_start else self.poll_seconds())
+        while not self._stop.is_set():
+            try:
+                item_id = self._queue.get(timeout=max(0.0, next_scan - time.monotonic()))
+            except queue.Empty:
+                item_id = None
+            if self._stop.is_set():
+                return
+            if item_id is not None:
+                self._process(item_id)
+            if time.monotonic() >= next_scan:
+                self._scan()
+                next_scan = time.monotonic() + self.poll_seconds()
+
+    def _scan(self) -> None:
+        db = self._session_factory()
+        try:
+            ids = self.scan_ids(db)
+        except Exception:
+            logger.exception("%s scan failed", self.name)
+            ids = []
+        finally:
+            db.close()
+        for item_id in ids:
+            if self._stop.is_set():
+                return
+            self._process(item_id)
+
+    def _process(self, item_id: str) -> None:
+        db = self._session_factory()
+        try:
+            self.handle(db, item_id)
+        except Exception as exc:
+            logger.exception("%s failed for %s", self.name, item_id)
+            self.on_failure(db, item_id, exc)
+        finally:
+            db.close()
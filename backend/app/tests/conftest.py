@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import uuid
+
+# 测试使用独立的临时 SQLite 库，必须在导入 app 之前设置
+_DB_DIR = tempfile.mkdtemp(prefix="cloudedu-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.security import get_password_hash
+from app.db.session import SessionLocal
+from app.initial_data import init_db
+from app.main import app
+from app.models.user import User
+from app.services.verification import sync_columns
+
+# =============================================================================
+# 测试夹具 (Test Fixtures)
+# 功能：整个测试会话共用一个写入了种子数据 (initial_data) 的临时库；
+# TestClient 不以上下文方式使用，不会启动后台线程 (派单、汇总等)，由测试显式调用服务函数。
+# 用例自行创建所需的数据 (随机 ID)，不依赖其他用例的执行顺序。
+# =============================================================================
+
+init_db()
+_client = TestClient(app)
+_tokens: dict[str, str] = {}
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return _client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def login():
+    """按用户名登录 (种子用户密码均为 123456)，返回请求头。"""
+
+    def _login(username: str) -> dict[str, str]:
+        if username not in _tokens:
+            r = _client.post("/api/v1/auth/login/access-token", data={"username": username, "password": "123456"})
+            assert r.status_code == 200, r.text
+            _tokens[username] = r.json()["access_token"]
+        return {"Authorization": f"Bearer {_tokens[username]}"}
+
+    return _login
+
+
+@pytest.fixture
+def make_user():
+    """创建一个新用户 (密码 123456)，返回用户名。profile 中的认证状态同步到物化列。"""
+
+    def _make_user(role: str = "general_student", school_id=None, verification=None) -> str:
+        username = f"u_{uuid.uuid4().hex[:10]}"
+        profile = {"verification": verification or {"student": "none", "teacher": "none"}}
+        session = SessionLocal()
+        try:
+            user = User(
+                id=username,
+                username=username,
+                email=f"{username}@example.com",
+                full_name=username,
+                hashed_password=get_password_hash("123456"),
+                role=role,
+                school_id=school_id,
+                is_active=True,
+                onboarding_status="approved",
+                profile=json.dumps(profile, ensure_ascii=False),
+            )
+            sync_columns(user, profile)
+            session.add(user)
+            session.commit()
+        finally:
+            session.close()
+        return username
+
+    return _make_user
@@ -0,0 +1,85 @@
+import threading
+import time
+import uuid
+
+from app.db.session import SessionLocal
+from app.models.core import AnnouncementDelivery
+from app.services import announcement_fanout
+
+
+def _boom(db, announcement_id, batch_size=None):
+    raise RuntimeError("boom")
+
+
+def test_failed_delivery_is_recorded(db, monkeypatch):
+    announcement_id = str(uuid.uuid4())
+    db.add(AnnouncementDelivery(announcement_id=announcement_id, status="pending", total=1, delivered=0))
+    db.commit()
+    monkeypatch.setattr(announcement_fanout, "run", _boom)
+
+    announcement_fanout.FanoutWorker()._process(announcement_id)
+
+    db.expire_all()
+    delivery = db.query(AnnouncementDelivery).filter(AnnouncementDelivery.announcement_id == announcement_id).one()
+    assert (delivery.status, delivery.error) == ("failed", "boom")
+
+
+def test_worker_survives_when_failure_cannot_be_recorded(monkeypatch):
+    attempts = []
+    done = threading.Event()
+
+    def failing_run(db, announcement_id, batch_size=None):
+        attempts.append(announcement_id)
+        if len(attempts) == 2:
+            done.set()
+        raise RuntimeError("boom")
+
+    def broken_session():
+        # 模拟数据库不可用：记录失败状态时查询也会出错
+        session = SessionLocal()
+
+        def query(*args, **kwargs):
+            raise RuntimeError("database is locked")
+
+        session.query = query
+        return session
+
+    monkeypatch.setattr(announcement_fanout, "run", failing_run)
+    worker = announcement_fanout.FanoutWorker(session_factory=broken_session)
+    worker.start()
+    try:
+        worker.enqueue("a1")
+        worker.enqueue("a2")
+        assert done.wait(5)
+        assert worker._thread.is_alive()
+        assert attempts == ["a1", "a2"]
+    finally:
+        worker.stop()
+
+
+def test_worker_scans_under_steady_queue_traffic(monkeypatch):
+    worker = announcement_fanout.FanoutWorker()
+    monkeypatch.setattr(worker, "POLL_SECONDS", 0.2)
+    processed, scans = [], []
+    rescanned = threading.Event()
+
+    def process(announcement_id):
+        processed.append(announcement_id)
+        # 处理耗时小于扫描间隔，队列始终不空
+        time.sleep(0.02)
+        worker.enqueue(announcement_id)
+
+    def scan():
+        scans.append(time.monotonic())
+        if len(scans) == 2:
+            rescanned.set()
+
+    monkeypatch.setattr(worker, "_process", process)
+    monkeypatch.setattr(worker, "_scan", scan)
+    worker.enqueue("a1")
+    worker.start()
+    try:
+        assert rescanned.wait(3)
+        assert len(processed) > 1
+    finally:
+        worker.stop()
@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime
+
+from app.models.conversation import Conversation, ConversationParticipant
+from app.services import conversations
+
+
+def _legacy_direct(db, user_id: str, peer_user_id: str, conv_id: str, created_at: datetime) -> str:
+    db.add(Conversation(id=conv_id, created_at=created_at))
+    for uid in (user_id, peer_user_id):
+        db.add(ConversationParticipant(id=str(uuid.uuid4()), conversation_id=conv_id, user_id=uid))
+    db.commit()
+    return conv_id
+
+
+def test_backfill_pair_keys_picks_the_oldest_across_batches(db, make_user):
+    a, b, c = make_user(), make_user(), make_user()
+    prefix = uuid.uuid4().hex[:8]
+    # ID 顺序与创建时间相反：最早创建的会话落在最后一批
+    newest = _legacy_direct(db, a, b, f"{prefix}-0", datetime(2024, 3, 1))
+    middle = _legacy_direct(db, b, a, f"{prefix}-1", datetime(2024, 2, 1))
+    oldest = _legacy_direct(db, a, b, f"{prefix}-2", datetime(2024, 1, 1))
+    other = _legacy_direct(db, a, c, f"{prefix}-3", datetime(2024, 4, 1))
+
+    assert conversations.backfill_pair_keys(db, batch_size=1) >= 2
+    db.expire_all()
+    keys = {cid: db.get(Conversation, cid).pair_key for cid in (newest, middle, oldest, other)}
+    assert keys == {newest: None, middle: None, oldest: conversations.pair_key(a, b), other: conversations.pair_key(a, c)}
+    assert conversations.find_direct(db, b, a).id == oldest
+
+    # 再次回填不会改动已有 pair_key 的会话
+    assert conversations.backfill_pair_keys(db) == 0
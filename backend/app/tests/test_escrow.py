@@ -0,0 +1,154 @@
+import uuid
+
+from app.core.config import settings
+from app.models.content import QaQuestion
+from app.models.core import SchemaMigration
+from app.models.match import PointEscrow, PointTxn
+from app.services import points as points_service
+
+BONUS = 100
+
+
+def _balance(client, headers) -> int:
+    r = client.get("/api/v1/match/points/balance", headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _ask(client, headers, reward, idempotency_key=None):
+    if idempotency_key:
+        headers = {**headers, "Idempotency-Key": idempotency_key}
+    return client.post(
+        "/api/v1/content/qa/questions",
+        headers=headers,
+        json={"subject": "数学", "title": f"悬赏_{uuid.uuid4().hex[:6]}", "content": "托管测试", "reward_points": reward},
+    )
+
+
+def _funded_user(db, make_user) -> str:
+    username = make_user()
+    points_service.record(db, username, BONUS, "admin_adjust", "测试充值")
+    db.commit()
+    return username
+
+
+def _signup(client) -> str:
+    name = f"u_{uuid.uuid4().hex[:10]}"
+    r = client.post(
+        "/api/v1/auth/signup",
+        json={"username": name, "email": f"{name}@example.com", "password": "123456", "full_name": name},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def _bonus_count(db, user_id: str) -> int:
+    return db.query(PointTxn.id).filter(PointTxn.user_id == user_id, PointTxn.type == "signup_bonus").count()
+
+
+def test_signup_bonus_is_off_by_default(client, db):
+    assert settings.POINTS_SIGNUP_BONUS == 0
+    user_id = _signup(client)
+    assert points_service.balance(db, user_id) == 0
+    assert _bonus_count(db, user_id) == 0
+
+
+def test_signup_bonus_is_granted_once(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "POINTS_SIGNUP_BONUS", BONUS)
+    user_id = _signup(client)
+    assert points_service.balance(db, user_id) == BONUS
+    assert points_service.grant_signup_bonus(db, user_id) is None
+
+    # 并发发放 (双方都通过了存在性检查) 时由部分唯一索引拒绝，保存点回滚后余额不变
+    query = db.query
+
+    def no_existing_bonus(*entities):
+        q = query(*entities)
+        return q.filter(False) if entities == (PointTxn.id,) else q
+
+    monkeypatch.setattr(db, "query", no_existing_bonus)
+    assert points_service.grant_signup_bonus(db, user_id) is None
+    db.commit()
+    monkeypatch.setattr(db, "query", query)
+    assert _bonus_count(db, user_id) == 1
+    assert points_service.balance(db, user_id) == BONUS
+    assert points_service.verify(db, user_id)["ok"]
+
+
+def test_signup_bonus_backfill_runs_once(db, make_user, monkeypatch):
+    existing = make_user()
+    db.query(SchemaMigration).filter(SchemaMigration.name == points_service.SIGNUP_BONUS_BACKFILL).delete()
+    db.commit()
+
+    # 未启用时不补发，也不记录迁移：启用后的首次启动仍会补发
+    assert points_service.backfill_signup_bonus(db) == 0
+    monkeypatch.setattr(settings, "POINTS_SIGNUP_BONUS", BONUS)
+    assert points_service.backfill_signup_bonus(db) >= 1
+    assert points_service.balance(db, existing) == BONUS
+
+    later = make_user()
+    assert points_service.backfill_signup_bonus(db) == 0
+    assert _bonus_count(db, later) == 0
+
+
+def test_hold_then_settle_to_answerer(client, db, login, make_user):
+    asker, answerer = _funded_user(db, make_user), make_user()
+    asker_h, answerer_h = login(asker), login(answerer)
+
+    r = _ask(client, asker_h, 30, idempotency_key="k1")
+    assert r.status_code == 200, r.text
+    question_id = r.json()["id"]
+    assert _balance(client, asker_h) == BONUS - 30
+
+    # 同一幂等键重复提交返回首次创建的问题，不重复冻结
+    again = _ask(client, asker_h, 30, idempotency_key="k1")
+    assert again.json()["id"] == question_id
+    assert _balance(client, asker_h) == BONUS - 30
+
+    answer = client.post(
+        f"/api/v1/content/qa/questions/{question_id}/answers", headers=answerer_h, json={"content": "答案"}
+    )
+    assert answer.status_code == 200, answer.text
+    answer_id = answer.json()["id"]
+
+    for _ in range(2):
+        r = client.post(f"/api/v1/content/qa/questions/{question_id}/accept?answer_id={answer_id}", headers=asker_h)
+        assert r.status_code == 200, r.text
+    assert _balance(client, answerer_h) == 30
+    assert _balance(client, asker_h) == BONUS - 30
+
+    escrow = db.query(PointEscrow).filter(PointEscrow.ref_id == question_id).one()
+    assert (escrow.status, escrow.payee_id) == ("settled", answerer)
+    assert [t.type for t in db.query(PointTxn).filter(PointTxn.user_id == answerer)] == ["reward_in"]
+    assert points_service.verify(db, asker)["ok"] and points_service.verify(db, answerer)["ok"]
+
+    # 已结算的托管删除问题时不再退还
+    assert client.delete(f"/api/v1/content/qa/questions/{question_id}", headers=asker_h).status_code == 200
+    assert _balance(client, asker_h) == BONUS - 30
+
+
+def test_delete_refunds_held_escrow(client, db, login, make_user):
+    asker = _funded_user(db, make_user)
+    headers = login(asker)
+    question_id = _ask(client, headers, 40).json()["id"]
+    assert _balance(client, headers) == BONUS - 40
+
+    r = client.delete(f"/api/v1/content/qa/questions/{question_id}", headers=headers)
+    assert r.status_code == 200, r.text
+    assert _balance(client, headers) == BONUS
+
+    escrow = db.query(PointEscrow).filter(PointEscrow.ref_id == question_id).one()
+    assert escrow.status == "refunded"
+    types = [t.type for t in db.query(PointTxn).filter(PointTxn.user_id == asker).order_by(PointTxn.seq)]
+    assert types == ["admin_adjust", "reward_out", "refund"]
+
+
+def test_insufficient_points_rejected_without_side_effects(client, db, login, make_user):
+    asker = _funded_user(db, make_user)
+    headers = login(asker)
+    r = _ask(client, headers, BONUS + 1)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Insufficient points"
+    assert _balance(client, headers) == BONUS
+    assert db.query(PointEscrow).filter(PointEscrow.payer_id == asker).count() == 0
+    assert db.query(QaQuestion).filter(QaQuestion.author_id == asker).count() == 0
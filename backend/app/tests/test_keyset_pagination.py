@@ -0,0 +1,152 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.db.auto_migrate import ensure_schema
+from app.db.session import engine
+from app.models.content import CommunityPost
+from app.models.core import SchemaMigration
+from app.models.conversation import Message
+from app.models.notification import Notification
+from app.services import conversations, feed_cache, notifications
+
+SECOND = datetime(2026, 1, 1, 8, 0, 5)
+
+
+def _insert_legacy(db, table: str, rows: list[dict]) -> None:
+    """模拟升级前由 server_default 写入的秒级时间 "YYYY-MM-DD HH:MM:SS"。"""
+    cols = ", ".join(rows[0])
+    params = ", ".join(f":{c}" for c in rows[0])
+    for row in rows:
+        db.execute(text(f"INSERT INTO {table} ({cols}, created_at) VALUES ({params}, :at)"), {**row, "at": str(SECOND)})
+    db.commit()
+
+
+def _upgrade(db) -> None:
+    """模拟升级后的首次启动：清除一次性迁移记录后执行 ensure_schema。"""
+    db.query(SchemaMigration).filter(SchemaMigration.name.like("keyset_timestamp:%")).delete(synchronize_session=False)
+    db.commit()
+    ensure_schema(engine)
+
+
+def _walk(fetch) -> list[str]:
+    """沿 cursor 逐页读取直到末尾，返回依次读到的 ID。"""
+    seen, cursor = [], None
+    for _ in range(20):
+        page = fetch(cursor)
+        if not page:
+            return seen
+        seen += [item["id"] for item in page]
+        cursor = page[-1]["cursor"]
+    raise AssertionError(f"pagination did not terminate: {seen}")
+
+
+def test_message_history_pages_through_rows_from_the_same_second(client, db, login, make_user):
+    student = make_user()
+    conv = conversations.get_or_create_direct(db, student, "teacher_pku")
+    legacy = [f"legacy{i}-{uuid.uuid4().hex[:6]}" for i in range(3)]
+    _insert_legacy(db, "messages", [{"id": m, "conversation_id": conv.id, "sender_id": student, "content": m} for m in legacy])
+    _upgrade(db)
+    # 升级后由应用写入、时间恰好落在同一秒整点的消息
+    fresh = [f"fresh{i}-{uuid.uuid4().hex[:6]}" for i in range(3)]
+    for m in fresh:
+        db.add(Message(id=m, conversation_id=conv.id, sender_id=student, content=m, created_at=SECOND))
+    db.commit()
+    expected = sorted(legacy + fresh, reverse=True)
+
+    headers = login(student)
+
+    def older(cursor):
+        url = f"/api/v1/conversations/{conv.id}/messages?page_size=2" + (f"&before={cursor}" if cursor else "")
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200, r.text
+        return list(reversed(r.json()))
+
+    assert _walk(older) == expected
+
+    first = client.get(f"/api/v1/conversations/{conv.id}/messages?page_size=100", headers=headers).json()
+    after = client.get(
+        f"/api/v1/conversations/{conv.id}/messages?page_size=100&after={first[0]['cursor']}", headers=headers
+    ).json()
+    assert [m["id"] for m in after] == [m["id"] for m in first[1:]]
+
+
+def test_notification_replay_skips_the_cursor_row(db, make_user):
+    user = make_user()
+    ids = sorted(f"n{i}-{uuid.uuid4().hex[:6]}" for i in range(4))
+    _insert_legacy(db, "notifications", [{"id": n, "user_id": user, "type": "test", "payload": "{}"} for n in ids])
+    _upgrade(db)
+
+    cursor = conversations.encode_cursor(Notification(id=ids[0], created_at=SECOND))
+    assert [e["data"]["id"] for e in notifications.replay(db, user, cursor)] == ids[1:]
+
+
+def test_community_feed_pages_through_posts_from_the_same_second(client, db, make_user):
+    author = make_user()
+    legacy = [f"legacy{i}-{uuid.uuid4().hex[:6]}" for i in range(3)]
+    _insert_legacy(
+        db,
+        "community_posts",
+        [
+            {"id": p, "author_id": author, "content": p, "hidden": False, "likes_count": 0, "comments_count": 0, "shares_count": 0}
+            for p in legacy
+        ],
+    )
+    _upgrade(db)
+    fresh = [f"fresh{i}-{uuid.uuid4().hex[:6]}" for i in range(3)]
+    for p in fresh:
+        db.add(CommunityPost(id=p, author_id=author, content=p, created_at=SECOND))
+    hidden = f"hidden-{uuid.uuid4().hex[:6]}"
+    db.add(CommunityPost(id=hidden, author_id=author, content=hidden, created_at=SECOND, hidden=True))
+    feed_cache.mark_dirty(db, feed_cache.COMMUNITY_POSTS)
+    db.commit()
+    expected = [
+        r[0]
+        for r in db.query(CommunityPost.id)
+        .filter(CommunityPost.hidden == False)
+        .order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+    ]
+    assert expected[-6:] == sorted(legacy + fresh, reverse=True)
+
+    def older(cursor):
+        r = client.get("/api/v1/content/community/posts?limit=2" + (f"&before={cursor}" if cursor else ""))
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    assert _walk(older) == expected
+    assert client.get("/api/v1/content/community/posts?before=bogus").status_code == 400
+
+
+def test_timestamp_normalization_runs_once(db, make_user):
+    user = make_user()
+    _upgrade(db)
+    ids = [f"n-{uuid.uuid4().hex[:6]}"]
+    _insert_legacy(db, "notifications", [{"id": n, "user_id": user, "type": "test", "payload": "{}"} for n in ids])
+
+    # 已执行过的迁移在之后的启动中跳过，不再扫描全表
+    ensure_schema(engine)
+    stored = db.execute(text("SELECT created_at FROM notifications WHERE id = :id"), {"id": ids[0]}).scalar()
+    assert stored == str(SECOND)
+
+
+def test_hidden_backfill_runs_once(db, make_user):
+    author = make_user()
+    post_id = f"p-{uuid.uuid4().hex[:6]}"
+    db.query(SchemaMigration).filter(SchemaMigration.name == "community_posts.hidden_not_null").delete()
+    db.execute(
+        text("INSERT INTO community_posts (id, author_id, content, hidden) VALUES (:id, :a, 'x', NULL)"),
+        {"id": post_id, "a": author},
+    )
+    db.commit()
+
+    ensure_schema(engine)
+    assert db.execute(text("SELECT hidden FROM community_posts WHERE id = :id"), {"id": post_id}).scalar() == 0
+
+    # 已执行过的回填在之后的启动中跳过
+    db.execute(text("UPDATE community_posts SET hidden = NULL WHERE id = :id"), {"id": post_id})
+    db.commit()
+    ensure_schema(engine)
+    assert db.execute(text("SELECT hidden FROM community_posts WHERE id = :id"), {"id": post_id}).scalar() is None
+    db.execute(text("DELETE FROM community_posts WHERE id = :id"), {"id": post_id})
+    db.commit()
@@ -0,0 +1,204 @@
+import json
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.db.session import SessionLocal
+from app.models.match import MatchOffer, MatchRequest, TeacherLoad
+from app.services import candidate_cache, conversations, match_dispatch, teacher_load
+
+
+def _dispatched_offer(db, teacher_id: str) -> MatchOffer:
+    """第 1 波自动派单发出的一条待回复邀约，超时时间已到。"""
+    req = MatchRequest(
+        id=str(uuid.uuid4()),
+        student_id="student1",
+        tags=json.dumps([f"tag-{uuid.uuid4().hex[:8]}"]),
+        channel="text",
+        time_mode="now",
+        status="pending",
+        dispatch_wave=1,
+        dispatch_next_at=datetime.utcnow() - timedelta(seconds=1),
+    )
+    offer = MatchOffer(
+        id=str(uuid.uuid4()),
+        request_id=req.id,
+        student_id=req.student_id,
+        teacher_id=teacher_id,
+        status="pending",
+        dispatch_wave=1,
+    )
+    db.add_all([req, offer])
+    teacher_load.offers_opened(db, [teacher_id])
+    db.commit()
+    return offer
+
+
+def _pending(db, teacher_id: str) -> int:
+    db.expire_all()
+    return db.query(TeacherLoad.pending_offers).filter(TeacherLoad.user_id == teacher_id).scalar()
+
+
+def _direct_exists(db, a: str, b: str) -> bool:
+    return conversations.find_direct(db, a, b) is not None
+
+
+def test_accept_racing_dispatch_expiry_conflicts(client, db, login, make_user, monkeypatch):
+    teacher = make_user("volunteer_teacher", "PKU", {"student": "verified", "teacher": "verified"})
+    offer = _dispatched_offer(db, teacher)
+    assert _pending(db, teacher) == 1
+
+    # 接受请求读到 pending 之后、抢占之前，派单线程过期了这一波
+    original = match_dispatch.claim_request
+
+    def expire_then_claim(session, request_id):
+        other = SessionLocal()
+        try:
+            match_dispatch.advance(other, request_id)
+        finally:
+            other.close()
+        return original(session, request_id)
+
+    monkeypatch.setattr(match_dispatch, "claim_request", expire_then_claim)
+    r = client.post(f"/api/v1/match/offers/{offer.id}/accept", headers=login(teacher))
+    assert r.status_code == 409, r.text
+
+    db.expire_all()
+    assert db.query(MatchOffer.status).filter(MatchOffer.id == offer.id).scalar() == "expired"
+    assert db.query(MatchRequest.status).filter(MatchRequest.id == offer.request_id).scalar() == "pending"
+    assert _pending(db, teacher) == 0
+    assert not _direct_exists(db, "student1", teacher)
+
+
+def test_sibling_offer_accepted_concurrently_conflicts(client, db, login, make_user, monkeypatch):
+    winner = make_user("volunteer_teacher", "PKU", {"student": "verified", "teacher": "verified"})
+    loser = make_user("volunteer_teacher", "PKU", {"student": "verified", "teacher": "verified"})
+    offer = _dispatched_offer(db, winner)
+    sibling = MatchOffer(
+        id=str(uuid.uuid4()),
+        request_id=offer.request_id,
+        student_id=offer.student_id,
+        teacher_id=loser,
+        status="pending",
+        dispatch_wave=1,
+    )
+    db.add(sibling)
+    teacher_load.offers_opened(db, [loser])
+    db.commit()
+
+    # 两位讲师同时接受同一请求的不同邀约：另一方先抢占请求并提交
+    original = match_dispatch.claim_request
+
+    def other_wins_then_claim(session, request_id):
+        other = SessionLocal()
+        try:
+            assert original(other, request_id)
+            assert teacher_load.claim_offer(other, offer.id, "accepted")
+            others = other.query(MatchOffer).filter(MatchOffer.request_id == request_id, MatchOffer.id != offer.id)
+            teacher_load.close_pending(other, others, "declined")
+            other.commit()
+        finally:
+            other.close()
+        return original(session, request_id)
+
+    monkeypatch.setattr(match_dispatch, "claim_request", other_wins_then_claim)
+    r = client.post(f"/api/v1/match/offers/{sibling.id}/accept", headers=login(loser))
+    assert r.status_code == 409, r.text
+
+    db.expire_all()
+    assert db.query(MatchOffer.status).filter(MatchOffer.id == sibling.id).scalar() == "declined"
+    assert db.query(MatchRequest.status).filter(MatchRequest.id == offer.request_id).scalar() == "matched"
+    assert _pending(db, loser) == 0
+    assert not _direct_exists(db, "student1", loser)
+
+
+def test_expiry_after_accept_keeps_offer_and_counter(client, db, login, make_user):
+    teacher = make_user("volunteer_teacher", "PKU", {"student": "verified", "teacher": "verified"})
+    offer = _dispatched_offer(db, teacher)
+    r = client.post(f"/api/v1/match/offers/{offer.id}/accept", headers=login(teacher))
+    assert r.status_code == 200, r.text
+    assert _pending(db, teacher) == 0
+
+    # 派单线程按接受前读到的波次关闭邀约：已接受的邀约不受影响，计数不重复扣减
+    teacher_load.offers_opened(db, [teacher])
+    stale = db.query(MatchOffer).filter(MatchOffer.request_id == offer.request_id).filter(MatchOffer.dispatch_wave == 1)
+    assert teacher_load.close_pending(db, stale, "expired") == []
+    db.commit()
+    db.expire_all()
+    assert db.query(MatchOffer.status).filter(MatchOffer.id == offer.id).scalar() == "accepted"
+    assert _pending(db, teacher) == 1
+    assert client.post(f"/api/v1/match/offers/{offer.id}/accept", headers=login(teacher)).status_code == 400
+
+
+def test_accept_drops_cached_candidates_of_the_request(client, db, login, make_user):
+    teacher = make_user("volunteer_teacher", "PKU", {"student": "verified", "teacher": "verified"})
+    offer = _dispatched_offer(db, teacher)
+    kept = str(uuid.uuid4())
+    candidate_cache.put(f"{offer.request_id}:f:{candidate_cache.pool_version()}", [(1.0, "e1")])
+    candidate_cache.put(f"{kept}:f:{candidate_cache.pool_version()}", [(1.0, "e1")])
+
+    r = client.post(f"/api/v1/match/offers/{offer.id}/accept", headers=login(teacher))
+    assert r.status_code == 200, r.text
+    assert candidate_cache.get(f"{offer.request_id}:f:{candidate_cache.pool_version()}") is None
+    assert candidate_cache.get(f"{kept}:f:{candidate_cache.pool_version()}") == [(1.0, "e1")]
+
+
+def test_dispatch_worker_scans_under_steady_queue_traffic(monkeypatch):
+    monkeypatch.setattr(match_dispatch.settings, "MATCH_DISPATCH_POLL_SECONDS", 0.2)
+    worker = match_dispatch.DispatchWorker()
+    processed, scans = [], threading.Event()
+
+    def process(request_id):
+        processed.append(request_id)
+        # 处理耗时小于扫描间隔，队列始终不空
+        time.sleep(0.02)
+        worker.enqueue(request_id)
+
+    monkeypatch.setattr(worker, "_process", process)
+    monkeypatch.setattr(worker, "_scan", scans.set)
+    worker.enqueue("r1")
+    worker.start()
+    try:
+        assert scans.wait(3)
+        assert len(processed) > 1
+    finally:
+        worker.stop()
+
+
+def test_load_rows_created_by_another_transaction_are_kept(db, make_user):
+    teacher, fresh = make_user("volunteer_teacher"), make_user("volunteer_teacher")
+    other = SessionLocal()
+    try:
+        teacher_load.offers_opened(other, [teacher])
+        other.commit()
+    finally:
+        other.close()
+
+    # 另一事务已创建负载行：插入冲突时保持原行，不抛出 IntegrityError
+    teacher_load.offers_opened(db, [teacher, fresh, fresh])
+    db.commit()
+    assert _pending(db, teacher) == 2
+    assert _pending(db, fresh) == 2
+
+
+def test_wave_timeout_compares_in_utc(db):
+    # PostgreSQL 按会话时区 (此处 +08:00) 返回带时区的时间：一小时前超时的波次应当到期
+    now = datetime.utcnow()
+    local = timezone(timedelta(hours=8))
+    req = MatchRequest(
+        id=str(uuid.uuid4()),
+        dispatch_wave=1,
+        dispatch_next_at=(now - timedelta(hours=1)).replace(tzinfo=timezone.utc).astimezone(local),
+    )
+    assert match_dispatch._is_due(db, req, now)
+
+
+def test_accept_decay_uses_utc_elapsed_time(monkeypatch):
+    monkeypatch.setattr(teacher_load.settings, "MATCH_LOAD_WINDOW_HOURS", 8)
+    now = datetime.utcnow()
+    local = timezone(timedelta(hours=8))
+    # 8 小时前 (UTC) 的计算时间点以 +08:00 返回：应衰减一个时间常数，而不是按 0 小时计算
+    since = (now - timedelta(hours=8)).replace(tzinfo=timezone.utc).astimezone(local)
+    assert abs(teacher_load._decayed(1.0, since, now) - math.exp(-1)) < 1e-6
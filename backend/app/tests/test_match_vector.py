@@ -0,0 +1,18 @@
+import pytest
+
+# numpy 为可选依赖 (requirements.txt 中默认注释)，未安装时跳过本文件
+np = pytest.importorskip("numpy")
+
+from app.services.match_vector import select_top  # noqa: E402
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_select_top_matches_full_sort(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 400))
+    # 分数取少量离散值，制造大量同分
+    scores = rng.integers(0, 6, size=n).astype(np.float64) / 2
+    hits = rng.random(n) < 0.7
+    for limit in (1, 5, 50, n + 3):
+        expected = sorted(np.flatnonzero(hits), key=lambda i: (-scores[i], i))[:limit]
+        assert select_top(scores, hits, limit).tolist() == expected
@@ -0,0 +1,102 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.notification import Notification, NotificationCounter
+from app.services import notifications
+
+
+def _unread(db, user_id: str) -> int:
+    db.expire_all()
+    return db.query(NotificationCounter.unread_count).filter(NotificationCounter.user_id == user_id).scalar()
+
+
+def test_counter_rows_created_by_another_transaction_are_kept(db):
+    existing, fresh = f"u_{uuid.uuid4().hex[:10]}", f"u_{uuid.uuid4().hex[:10]}"
+    other = SessionLocal()
+    try:
+        notifications.add_unread(other, {existing: 2})
+        other.commit()
+    finally:
+        other.close()
+
+    # 另一事务已创建计数行：插入冲突时保持原行，不抛出 IntegrityError
+    notifications.add_unread(db, {existing: 1, fresh: 1})
+    notifications.add_unread(db, {fresh: -5})
+    db.commit()
+    assert _unread(db, existing) == 3
+    assert _unread(db, fresh) == 0
+
+
+def test_summary_version_changes_when_a_notification_is_coalesced(client, db, login, make_user):
+    username = make_user()
+    headers = login(username)
+    notifications.notify(db, username, "post_liked", {"post_id": "p1"}, group_key="p1", actor={"id": "a", "name": "A"})
+    db.commit()
+    first = client.get("/api/v1/me/summary", headers=headers).json()
+
+    # 合并进未读通知：未读数不变，version 仍需变化以提示客户端刷新列表
+    notifications.notify(db, username, "post_liked", {"post_id": "p1"}, group_key="p1", actor={"id": "b", "name": "B"})
+    db.commit()
+    second = client.get("/api/v1/me/summary", headers=headers).json()
+    assert second["unread_notifications"] == first["unread_notifications"] == 1
+    assert second["version"] != first["version"]
+
+
+def _actor(name: str) -> dict:
+    return {"id": name, "name": name.upper()}
+
+
+def _rows(db, user_id: str) -> list[Notification]:
+    db.expire_all()
+    return db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at).all()
+
+
+def test_notifications_with_the_same_group_key_are_coalesced(client, db, login, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_COALESCE_MAX_ACTORS", 2)
+    username = make_user()
+    first = notifications.notify(db, username, "post_commented", {"n": 1}, group_key="post:1", actor=_actor("a"))
+    db.commit()
+    for n, name in enumerate(["b", "a", "c"], start=2):
+        merged = notifications.notify(db, username, "post_commented", {"n": n}, group_key="post:1", actor=_actor(name))
+        assert merged.id == first.id
+        db.commit()
+    # 类型或合并键不同的通知不合并
+    notifications.notify(db, username, "post_commented", {"n": 5}, group_key="post:2", actor=_actor("a"))
+    notifications.notify(db, username, "post_liked", {"n": 6}, group_key="post:1", actor=_actor("a"))
+    db.commit()
+
+    assert _unread(db, username) == 3
+    items = {n["id"]: n for n in client.get("/api/v1/notifications", headers=login(username)).json()}
+    assert len(items) == 3
+    merged = items[first.id]
+    assert (merged["count"], merged["payload"]) == (4, {"n": 4})
+    assert [a["id"] for a in merged["actors"]] == ["c", "a"]
+
+
+def test_read_or_expired_notifications_are_not_coalesced(db, make_user, monkeypatch):
+    username = make_user()
+    n = notifications.notify(db, username, "question_answered", {}, group_key="question:1", actor=_actor("a"))
+    db.commit()
+    notifications.mark_read(db, n)
+    db.commit()
+    second = notifications.notify(db, username, "question_answered", {}, group_key="question:1", actor=_actor("b"))
+    db.commit()
+    assert second.id != n.id
+
+    # 超出合并窗口的未读通知也不再合并
+    expired = datetime.utcnow() - timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW_SECONDS + 1)
+    db.query(Notification).filter(Notification.id == second.id).update({Notification.created_at: expired})
+    db.commit()
+    third = notifications.notify(db, username, "question_answered", {}, group_key="question:1", actor=_actor("c"))
+    db.commit()
+    assert third.id != second.id
+
+    # 窗口配置为 0 时关闭合并
+    monkeypatch.setattr(settings, "NOTIFICATION_COALESCE_WINDOW_SECONDS", 0)
+    fourth = notifications.notify(db, username, "question_answered", {}, group_key="question:1", actor=_actor("d"))
+    db.commit()
+    assert fourth.id != third.id
+    assert [r.event_count for r in _rows(db, username)] == [1, 1, 1, 1]
+    assert _unread(db, username) == 3
@@ -0,0 +1,73 @@
+import uuid
+
+from app.core.config import settings
+from app.models.match import PointBalance, PointDailyRollup, PointSchoolDailyRollup
+from app.services import point_rollups, points
+
+
+def _record_all(db, user_id: str, amounts: list[int]) -> None:
+    for amount in amounts:
+        points.record(db, user_id, amount, "admin_adjust", "测试")
+    db.commit()
+
+
+def _user_totals(db, user_id: str) -> tuple[int, int, int]:
+    db.expire_all()
+    row = db.query(PointDailyRollup).filter(PointDailyRollup.user_id == user_id).one()
+    return row.earned, row.spent, row.txn_count
+
+
+def _school_totals(db, school_id: str) -> tuple[int, int, int]:
+    row = db.query(PointSchoolDailyRollup).filter(PointSchoolDailyRollup.school_id == school_id).one()
+    return row.earned, row.spent, row.txn_count
+
+
+def _rolled_seq(db, user_id: str) -> int:
+    return db.query(PointBalance.rolled_seq).filter(PointBalance.user_id == user_id).scalar()
+
+
+def test_run_resumes_from_the_watermark(db, make_user):
+    school_id = f"school_{uuid.uuid4().hex[:6]}"
+    a, b = make_user(school_id=school_id), make_user(school_id=school_id)
+    _record_all(db, a, [10, -3])
+    _record_all(db, b, [5])
+
+    assert point_rollups.run(db, batch_size=1) >= 3
+    assert _user_totals(db, a) == (10, 3, 2)
+    assert _school_totals(db, school_id) == (15, 3, 3)
+    assert (_rolled_seq(db, a), _rolled_seq(db, b)) == (2, 1)
+
+    # 再次运行没有新流水；新增流水只汇总水位之后的部分
+    assert point_rollups.run(db) == 0
+    _record_all(db, a, [7])
+    assert point_rollups.run(db) == 1
+    assert _user_totals(db, a) == (17, 3, 3)
+    assert _school_totals(db, school_id) == (22, 3, 4)
+    assert _rolled_seq(db, a) == 3
+
+
+def test_batch_with_a_stale_watermark_is_discarded(db, make_user):
+    school_id = f"school_{uuid.uuid4().hex[:6]}"
+    user_id = make_user(school_id=school_id)
+    _record_all(db, user_id, [4, 6])
+
+    # 两个进程读到相同的水位：先提交的一方推进水位，另一方的条件更新落空并放弃整批
+    assert point_rollups._rollup_batch(db, {user_id: 0}) == 2
+    assert point_rollups._rollup_batch(db, {user_id: 0}) == 0
+    assert _user_totals(db, user_id) == (10, 0, 2)
+    assert _school_totals(db, school_id) == (10, 0, 2)
+    assert _rolled_seq(db, user_id) == 2
+
+
+def test_leaderboard_cache_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(settings, "POINTS_LEADERBOARD_CACHE_SIZE", 2)
+    monkeypatch.setattr(point_rollups, "_cache", point_rollups.OrderedDict())
+    schools = [f"school_{uuid.uuid4().hex[:6]}" for _ in range(5)]
+    for school_id in schools:
+        assert point_rollups.top_earners(db, "week", school_id) == []
+    assert list(point_rollups._cache) == [("users", "week", s) for s in schools[-2:]]
+
+    # 命中的条目移到队尾，淘汰最久未使用的
+    point_rollups.top_earners(db, "week", schools[-2])
+    point_rollups.top_earners(db, "week", schools[0])
+    assert list(point_rollups._cache) == [("users", "week", s) for s in (schools[-2], schools[0])]
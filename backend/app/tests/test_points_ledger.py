@@ -0,0 +1,104 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.models.match import PointBalance, PointSnapshot, PointTxn
+from app.services import points
+
+
+def _user() -> str:
+    return f"u_{uuid.uuid4().hex[:10]}"
+
+
+def _record_all(db, user_id: str, amounts: list[int]) -> None:
+    for amount in amounts:
+        points.record(db, user_id, amount, "admin_adjust", "测试")
+    db.commit()
+
+
+def _snapshots(db, user_id: str) -> list[tuple[int, int, bool]]:
+    db.expire_all()
+    return [
+        (s.seq, s.balance, s.verified_at is not None)
+        for s in db.query(PointSnapshot).filter(PointSnapshot.user_id == user_id).order_by(PointSnapshot.seq)
+    ]
+
+
+def test_record_allocates_seq_and_writes_checkpoints(db, monkeypatch):
+    monkeypatch.setattr(settings, "POINTS_SNAPSHOT_INTERVAL", 3)
+    user_id = _user()
+    _record_all(db, user_id, [10, 5, -3, 7, -4, 1, 2])
+
+    txns = db.query(PointTxn.seq, PointTxn.points).filter(PointTxn.user_id == user_id).order_by(PointTxn.seq).all()
+    assert [t.seq for t in txns] == [1, 2, 3, 4, 5, 6, 7]
+    assert points.balance(db, user_id) == 18
+    assert _snapshots(db, user_id) == [(3, 12, False), (6, 16, False)]
+
+    with pytest.raises(points.InsufficientPoints):
+        points.record(db, user_id, -19, "reward_out", "超额支出", require_funds=True)
+    db.rollback()
+    assert points.balance(db, user_id) == 18
+
+    result = points.verify(db, user_id)
+    assert (result["ok"], result["seq"], result["checked"]) == (True, 7, 7)
+    assert _snapshots(db, user_id) == [(3, 12, True), (6, 16, True)]
+
+    # 已校验的检查点之前的流水不再重复求和
+    _record_all(db, user_id, [1])
+    result = points.verify(db, user_id)
+    assert (result["ok"], result["checked"]) == (True, 2)
+
+
+def test_verify_detects_a_tampered_range(db, monkeypatch):
+    monkeypatch.setattr(settings, "POINTS_SNAPSHOT_INTERVAL", 3)
+    user_id = _user()
+    _record_all(db, user_id, [1, 2, 3, 4, 5, 6, 7])
+    assert points.verify(db, user_id)["ok"]
+
+    # 检查点之后的流水被篡改：与当前余额不一致
+    db.query(PointTxn).filter(PointTxn.user_id == user_id, PointTxn.seq == 7).update({PointTxn.points: 70})
+    db.commit()
+    assert points.verify(db, user_id)["ok"] is False
+
+    # 尚未校验的检查点区间内缺失一笔流水：在该检查点处报告
+    other = _user()
+    _record_all(db, other, [1, 2, 3, 4, 5, 6])
+    db.query(PointTxn).filter(PointTxn.user_id == other, PointTxn.seq == 5).delete()
+    db.commit()
+    result = points.verify(db, other)
+    assert (result["ok"], result["seq"], result["expected"], result["balance"]) == (False, 6, 16, 21)
+    assert _snapshots(db, other) == [(3, 6, True), (6, 21, False)]
+
+
+def test_backfill_assigns_seq_by_created_at_and_checkpoints(db):
+    user_id = _user()
+    legacy = [("c", datetime(2024, 1, 1), 10), ("a", datetime(2024, 1, 3), -4), ("b", datetime(2024, 1, 2), 6)]
+    for suffix, created_at, amount in legacy:
+        db.add(
+            PointTxn(
+                id=f"{user_id}-{suffix}",
+                user_id=user_id,
+                type="admin_adjust",
+                title="旧流水",
+                points=amount,
+                created_at=created_at,
+            )
+        )
+    db.commit()
+
+    assert points.backfill(db) >= 1
+    db.expire_all()
+    seqs = dict(db.query(PointTxn.id, PointTxn.seq).filter(PointTxn.user_id == user_id).all())
+    assert seqs == {f"{user_id}-c": 1, f"{user_id}-b": 2, f"{user_id}-a": 3}
+    row = db.get(PointBalance, user_id)
+    assert (row.balance, row.txn_count) == (12, 3)
+    assert _snapshots(db, user_id) == [(3, 12, True)]
+
+    # 回填后的新流水接在原序号之后，校验从检查点开始
+    _record_all(db, user_id, [1])
+    assert db.query(PointTxn.seq).filter(PointTxn.user_id == user_id, PointTxn.seq == 4).scalar() == 4
+    result = points.verify(db, user_id)
+    assert (result["ok"], result["checked"]) == (True, 1)
+    assert points.backfill(db) == 0
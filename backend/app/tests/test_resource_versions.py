@@ -0,0 +1,83 @@
+import uuid
+
+from app.models.core import Tag
+from app.services import notifications as notifications_service
+from app.services import resource_versions
+
+
+def _get(client, url, headers=None, etag=None):
+    headers = dict(headers or {})
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(url, headers=headers)
+
+
+def test_notifications_etag_304_until_new_notification(client, db, login, make_user):
+    username = make_user()
+    headers = login(username)
+
+    first = _get(client, "/api/v1/notifications", headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = _get(client, "/api/v1/notifications", headers, etag)
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    # 查询参数不同 → ETag 不同
+    other = _get(client, "/api/v1/notifications?unread_only=true", headers, etag)
+    assert other.status_code == 200
+
+    notifications_service.notify(db, username, "test", {"n": 1})
+    db.commit()
+
+    fresh = _get(client, "/api/v1/notifications", headers, etag)
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert [n["type"] for n in fresh.json()] == ["test"]
+
+
+def test_notifications_etag_is_per_user(client, db, login, make_user):
+    a, b = make_user(), make_user()
+    etag = _get(client, "/api/v1/notifications", login(a)).headers["ETag"]
+    assert _get(client, "/api/v1/notifications", login(b), etag).status_code == 200
+
+
+def test_tags_etag_changes_on_orm_write(client, db):
+    first = _get(client, "/api/v1/core/tags")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert _get(client, "/api/v1/core/tags", etag=etag).status_code == 304
+
+    tag = Tag(id=str(uuid.uuid4()), name=f"t_{uuid.uuid4().hex[:6]}", category="skill", enabled=True)
+    db.add(tag)
+    db.commit()
+
+    fresh = _get(client, "/api/v1/core/tags", etag=etag)
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert tag.name in [t["name"] for t in fresh.json()]
+    etag = fresh.headers["ETag"]
+
+    # 回滚的写入不递增版本号
+    db.add(Tag(id=str(uuid.uuid4()), name="rolled_back", category="skill", enabled=True))
+    db.flush()
+    db.rollback()
+    assert _get(client, "/api/v1/core/tags", etag=etag).status_code == 304
+
+    db.delete(db.get(Tag, tag.id))
+    db.commit()
+    assert _get(client, "/api/v1/core/tags", etag=etag).status_code == 200
+
+
+def test_matches_weak_list_and_wildcard():
+    value = 'W/"abc"'
+    assert resource_versions.matches('W/"abc"', value)
+    assert resource_versions.matches('"abc"', value)
+    assert resource_versions.matches('"x", W/"abc"', value)
+    assert resource_versions.matches("*", value)
+    assert not resource_versions.matches('"abcd"', value)
+    assert not resource_versions.matches(None, value)
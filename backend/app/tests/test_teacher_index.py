@@ -0,0 +1,44 @@
+import json
+import uuid
+
+from app.models.teacher_pool import TeacherPoolEntry, TeacherPoolTag
+from app.services import teacher_index
+
+
+def test_approved_teacher_is_indexed_and_matched(client, db, login, make_user):
+    tag = f"tag-{uuid.uuid4().hex[:8]}"
+    applicant = make_user("university_student", "PKU", {"student": "verified", "teacher": "none"})
+    evidence = json.dumps([{"tags": [tag], "timeSlots": ["周一晚"]}], ensure_ascii=False)
+    r = client.post(
+        "/api/v1/association/verifications/requests",
+        json={
+            "type": "volunteer_teacher",
+            "target_school_id": "PKU",
+            "organization_id": "org_assoc_pku",
+            "evidence_refs": evidence,
+        },
+        headers=login(applicant),
+    )
+    assert r.status_code == 200, r.text
+
+    r = client.post(
+        f"/api/v1/association/verifications/requests/{r.json()['id']}/review",
+        json={"status": "approved"},
+        headers=login("pku_assoc_admin"),
+    )
+    assert r.status_code == 200, r.text
+
+    entry = db.query(TeacherPoolEntry).filter(TeacherPoolEntry.user_id == applicant).one()
+    assert db.query(TeacherPoolTag).filter(TeacherPoolTag.entry_id == entry.id).count() == 1
+    assert teacher_index.lookup(db, [tag]) == {entry.id: 1}
+
+    r = client.post(
+        "/api/v1/match/requests",
+        json={"tags": json.dumps([tag]), "channel": "text", "time_mode": "schedule",
+              "time_slots": json.dumps(["周一 19:00-21:00"])},
+        headers=login("student1"),
+    )
+    assert r.status_code == 200, r.text
+    r = client.get(f"/api/v1/match/requests/{r.json()['id']}/candidates", headers=login("student1"))
+    assert r.status_code == 200, r.text
+    assert [c["user_id"] for c in r.json()] == [applicant]
@@ -0,0 +1,52 @@
+import pytest
+
+from app.services import time_slots
+
+EVENING = (19 * 60, 22 * 60)
+
+
+@pytest.mark.parametrize(
+    "slot, expected",
+    [
+        ("周一晚", [(0, *EVENING)]),
+        ("周一晚上", [(0, *EVENING)]),
+        ("周末下午", [(5, 14 * 60, 18 * 60), (6, 14 * 60, 18 * 60)]),
+        ("工作日 19:00-21:00", [(d, 19 * 60, 21 * 60) for d in range(5)]),
+        ("周一至周五 8点-10点", [(d, 8 * 60, 10 * 60) for d in range(5)]),
+        ("周六至周一 上午", [(d, 8 * 60, 12 * 60) for d in (0, 5, 6)]),
+        ("星期三 晚上7点-9点", [(2, 19 * 60, 21 * 60)]),
+        ("Sat 10:00-11:30", [(5, 10 * 60, 11 * 60 + 30)]),
+        ("每天", [(d, 8 * 60, 22 * 60) for d in range(7)]),
+        ({"weekday": 1, "start": "19:00", "end": "21:00"}, [(0, 19 * 60, 21 * 60)]),
+        ({"day": 7, "start": "9", "end": "10：30"}, [(6, 9 * 60, 10 * 60 + 30)]),
+        ({"weekday": 8, "start": "19:00", "end": "21:00"}, []),
+        ({"weekday": 1, "start": "21:00", "end": "19:00"}, []),
+        ({"weekday": "x", "start": "19:00", "end": "21:00"}, []),
+        ("", []),
+    ],
+)
+def test_parse_slot(slot, expected):
+    assert sorted(time_slots.parse_slot(slot)) == expected
+
+
+def test_parse_slots_accepts_json_and_plain_text():
+    assert time_slots.parse_slots('["周一晚", {"weekday": 7, "start": "9", "end": "10:30"}]') == [
+        (0, *EVENING),
+        (6, 9 * 60, 10 * 60 + 30),
+    ]
+    assert time_slots.parse_slots("周一晚，周二晚") == [(0, *EVENING), (1, *EVENING)]
+    assert time_slots.parse_slots(["周一晚"]) == [(0, *EVENING)]
+    assert time_slots.parse_slots("") == []
+    assert time_slots.parse_slots("{}") == []
+    assert time_slots.parse_slots(None) == []
+
+
+def test_masks_round_outwards_and_overlap():
+    assert time_slots.day_masks([(0, 10, 40)]) == {0: 0b11}
+    assert time_slots.total_minutes(time_slots.day_masks([(0, 10, 40)])) == 60
+    assert time_slots.day_masks([(0, 23 * 60, 24 * 60)]) == {0: 0b11 << 46}
+
+    teacher = time_slots.slot_masks('["周一 19:00-21:00", "周三晚"]')
+    assert time_slots.overlap_minutes(teacher, time_slots.slot_masks('["周一晚"]')) == 120
+    assert time_slots.overlap_minutes(teacher, time_slots.slot_masks('["工作日 20:00-23:00"]')) == 60 + 120
+    assert time_slots.overlap_minutes(teacher, time_slots.slot_masks('["周末"]')) == 0
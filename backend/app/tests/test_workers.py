@@ -0,0 +1,83 @@
+import threading
+import time
+
+from app.db.session import SessionLocal
+from app.services import workers
+
+
+class _Ticker(workers.PeriodicWorker):
+    name = "test-ticker"
+
+    def __init__(self, fail_first: bool) -> None:
+        super().__init__()
+        self.ticks = 0
+        self.fail_first = fail_first
+        self.done = threading.Event()
+
+    def interval(self) -> float:
+        return 0.05
+
+    def tick(self, db) -> None:
+        self.ticks += 1
+        if self.ticks >= 2:
+            self.done.set()
+        if self.fail_first and self.ticks == 1:
+            raise RuntimeError("boom")
+
+
+def test_periodic_worker_survives_a_failed_tick():
+    worker = _Ticker(fail_first=True)
+    worker.start()
+    try:
+        assert worker.done.wait(5)
+        assert worker._thread.is_alive()
+    finally:
+        worker.stop()
+    assert worker._thread is None
+
+
+def test_periodic_worker_waits_one_interval_unless_run_at_start():
+    worker = _Ticker(fail_first=False)
+    worker.run_at_start = False
+    worker.interval = lambda: 60.0
+    worker.start()
+    try:
+        assert not worker.done.wait(0.2)
+        assert worker.ticks == 0
+    finally:
+        worker.stop()
+
+
+def test_queue_worker_uses_its_session_factory():
+    sessions = []
+
+    def factory():
+        session = SessionLocal()
+        sessions.append(session)
+        return session
+
+    handled = []
+
+    class _Queue(workers.QueueWorker):
+        def poll_seconds(self) -> float:
+            return 60.0
+
+        def handle(self, db, item_id) -> None:
+            handled.append((db, item_id))
+
+    _Queue(session_factory=factory)._process("x")
+    assert handled == [(sessions[0], "x")]
+
+
+def test_queue_worker_stops_without_waiting_for_the_next_scan():
+    class _Idle(workers.QueueWorker):
+        def poll_seconds(self) -> float:
+            return 60.0
+
+    worker = _Idle()
+    worker.start()
+    thread = worker._thread
+    started = time.monotonic()
+    worker.stop()
+    assert time.monotonic() - started < 1
+    assert not thread.is_alive()
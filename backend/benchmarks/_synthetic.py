@@ -0,0 +1,130 @@
+"""
+基准脚本共用的合成数据工具：临时数据库、合成师资池、分位数统计。
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+DAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日", "工作日", "周末"]
+
+
+def use_temp_database(prefix="match_bench_"):
+    """在导入 app 之前调用：把 DATABASE_URL 指向临时 SQLite 文件，返回文件路径。"""
+    path = os.path.join(tempfile.mkdtemp(prefix=prefix), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def create_tables():
+    from app.db.session import Base, engine
+    from app.models import association, content, conversation, core, files, match, notification, teacher_pool, user  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+
+
+def tag_vocabulary(extra_tags=40):
+    """initial_data 中的演示标签 + 合成标签。"""
+    from app.initial_data import TAG_DATA
+
+    return [t["name"] for t in TAG_DATA] + [f"标签{i}" for i in range(extra_tags)]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def random_slots(rng):
+    start = rng.randint(8, 20)
+    return [f"{rng.choice(DAYS)} {start}:00-{start + rng.randint(1, 3)}:00"]
+
+
+def random_request_fields(rng, tags, scheduled):
+    return {
+        "tags": json.dumps(rng.sample(tags, rng.randint(0 if scheduled else 1, 3)), ensure_ascii=False),
+        "channel": "text",
+        "time_mode": "schedule" if scheduled else "now",
+        "time_slots": json.dumps(random_slots(rng), ensure_ascii=False) if scheduled else None,
+    }
+
+
+def seed_pool(db, teachers, tags, rng=None, batch_size=5000):
+    """
+    批量写入 teachers 位已认证讲师及其师资条目，并直接写入标签/时间索引行
+    (与 teacher_index 的结果一致)，避免大规模数据下逐条 reindex。返回讲师 ID 列表。
+    """
+    from app.models.teacher_pool import TeacherPoolEntry, TeacherPoolSlot, TeacherPoolTag
+    from app.models.user import User
+    from app.services import time_slots
+
+    rng = rng or random.Random(42)
+    teacher_ids = []
+    for start in range(0, teachers, batch_size):
+        users, entries, tag_rows, slot_rows = [], [], [], []
+        for i in range(start, min(teachers, start + batch_size)):
+            uid = f"bench_t{i}"
+            eid = str(uuid.UUID(int=rng.getrandbits(128)))
+            entry_tags = sorted(set(rng.sample(tags, rng.randint(1, min(4, len(tags))))))
+            slots = random_slots(rng)
+            teacher_ids.append(uid)
+            users.append(
+                {
+                    "id": uid,
+                    "username": uid,
+                    "email": f"{uid}@bench.local",
+                    "full_name": uid,
+                    "role": "volunteer_teacher",
+                    "school_id": "BENCH",
+                    "is_active": True,
+                    "teacher_verification": "verified",
+                    "student_verification": "none",
+                }
+            )
+            entries.append(
+                {
+                    "id": eid,
+                    "user_id": uid,
+                    "school_id": "BENCH",
+                    "tags": json.dumps(entry_tags, ensure_ascii=False),
+                    "time_slots": json.dumps(slots, ensure_ascii=False),
+                    "in_pool": True,
+                }
+            )
+            tag_rows.extend({"tag": t, "entry_id": eid, "user_id": uid, "school_id": "BENCH"} for t in entry_tags)
+            slot_rows.extend(
+                {"entry_id": eid, "weekday": day, "mask": mask, "user_id": uid, "school_id": "BENCH"}
+                for day, mask in time_slots.slot_masks(slots).items()
+            )
+        db.bulk_insert_mappings(User, users)
+        db.bulk_insert_mappings(TeacherPoolEntry, entries)
+        db.bulk_insert_mappings(TeacherPoolTag, tag_rows)
+        db.bulk_insert_mappings(TeacherPoolSlot, slot_rows)
+        db.commit()
+    return teacher_ids
+
+
+def seed_student(db, user_id="bench_student"):
+    from app.models.user import User
+
+    db.add(
+        User(
+            id=user_id,
+            username=user_id,
+            email=f"{user_id}@bench.local",
+            role="university_student",
+            is_active=True,
+            student_verification="none",
+            teacher_verification="none",
+        )
+    )
+    db.commit()
+    return user_id
@@ -0,0 +1,189 @@
+"""
+匹配引擎基准套件 (Matching Benchmark Suite)
+
+用法 (在 backend 目录下)：
+    python benchmarks/match_bench.py                              # 1k / 10k / 100k / 1M 讲师
+    python benchmarks/match_bench.py --sizes 1000,10000 --out bench.json
+
+每个规模在独立子进程和临时 SQLite 数据库中运行：生成合成讲师/师资条目 (标签取自
+initial_data) 与求助单，逐个测量以下操作的耗时与 SQL 语句数：
+- candidates_cold：read_match_candidates，候选缓存为空
+- candidates_warm：read_match_candidates，同一请求再次查看 (命中缓存)
+- create_offer：create_match_offer
+- accept_offer：accept_match_offer
+结果输出为 JSON (含 git 提交号)，可用于跨提交对比。
+设置 DATABASE_URL 环境变量并加 --keep-database-url 可在 PostgreSQL 上运行 (需为空库)。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from _synthetic import (
+    BACKEND_DIR,
+    create_tables,
+    percentile,
+    random_request_fields,
+    seed_pool,
+    seed_student,
+    tag_vocabulary,
+    use_temp_database,
+)
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+
+
+def summarize(samples):
+    timings = [ms for ms, _ in samples]
+    queries = [q for _, q in samples]
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(statistics.mean(timings), 3) if timings else 0.0,
+        "queries_p50": percentile(queries, 50),
+        "queries_max": max(queries) if queries else 0,
+    }
+
+
+def run_single(args):
+    """在当前进程中对一个规模运行全部操作，返回结果字典。"""
+    if not args.keep_database_url:
+        use_temp_database()
+
+    from sqlalchemy import event
+
+    from app.api.v1.endpoints import match as match_api
+    from app.db.session import SessionLocal, engine
+    from app.models.match import MatchRequest
+    from app.models.user import User
+    from app.services import candidate_cache
+
+    rng = random.Random(args.seed)
+    tags = tag_vocabulary(args.extra_tags)
+    create_tables()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    seed_pool(db, args.teachers, tags, rng)
+    student_id = seed_student(db)
+    request_ids = []
+    for i in range(args.requests):
+        req = MatchRequest(id=f"bench_r{i}", student_id=student_id, status="pending", **random_request_fields(rng, tags, i % 2 == 0))
+        db.add(req)
+        request_ids.append(req.id)
+    db.commit()
+    db.close()
+    seed_seconds = time.perf_counter() - started
+
+    counter = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_):
+        counter["n"] += 1
+
+    def measure(fn, user_id):
+        db = SessionLocal()
+        try:
+            # 当前用户的加载 (鉴权依赖) 不计入被测操作
+            user = db.query(User).filter(User.id == user_id).first()
+            counter["n"] = 0
+            t0 = time.perf_counter()
+            result = fn(db, user)
+            elapsed = (time.perf_counter() - t0) * 1000
+            return result, (elapsed, counter["n"])
+        finally:
+            db.close()
+
+    samples = {"candidates_cold": [], "candidates_warm": [], "create_offer": [], "accept_offer": []}
+    offers = []
+    for rid in request_ids:
+        def candidates(db, user):
+            return match_api.read_match_candidates(id=rid, limit=args.limit, db=db, current_user=user)
+
+        candidate_cache.clear()
+        cands, sample = measure(candidates, student_id)
+        samples["candidates_cold"].append(sample)
+        _, sample = measure(candidates, student_id)
+        samples["candidates_warm"].append(sample)
+        if not cands:
+            continue
+        teacher_id = cands[0]["user_id"]
+        offer_id, sample = measure(
+            lambda db, user: match_api.create_match_offer(id=rid, teacher_id=teacher_id, db=db, current_user=user).id,
+            student_id,
+        )
+        samples["create_offer"].append(sample)
+        offers.append((offer_id, teacher_id))
+
+    for offer_id, teacher_id in offers:
+        _, sample = measure(
+            lambda db, user: match_api.accept_match_offer(offer_id=offer_id, db=db, current_user=user), teacher_id
+        )
+        samples["accept_offer"].append(sample)
+
+    return {
+        "teachers": args.teachers,
+        "requests": args.requests,
+        "limit": args.limit,
+        "seed_seconds": round(seed_seconds, 2),
+        "operations": {name: summarize(values) for name, values in samples.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔的讲师规模")
+    parser.add_argument("--teachers", type=int, help="仅运行单个规模 (由父进程内部调用)")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--extra-tags", type=int, default=40, help="在 initial_data 标签之外追加的合成标签数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep-database-url", action="store_true", help="使用环境变量 DATABASE_URL 而非临时 SQLite")
+    parser.add_argument("--out", help="结果 JSON 写入路径，不指定时只打印")
+    args = parser.parse_args()
+
+    if args.teachers:
+        print(json.dumps(run_single(args), ensure_ascii=False))
+        return
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        cmd = [sys.executable, os.path.abspath(__file__), "--teachers", str(size)]
+        cmd += ["--requests", str(args.requests), "--limit", str(args.limit)]
+        cmd += ["--extra-tags", str(args.extra_tags), "--seed", str(args.seed)]
+        if args.keep_database_url:
+            cmd.append("--keep-database-url")
+        print(f"[match_bench] teachers={size} ...", file=sys.stderr)
+        out = subprocess.run(cmd, cwd=BACKEND_DIR, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    report = {
+        "git_commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "database": "env" if args.keep_database_url else "sqlite-temp",
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+匹配打分基准：倒排索引打分 (matching.score_candidates) vs 向量化引擎 (match_vector)
+
+用法 (在 backend 目录下)：
+    python benchmarks/vector_scoring.py --teachers 100000 --requests 50
+
+脚本在临时 SQLite 数据库中生成合成师资池，对同一批求助单分别用两种实现取前 k 个候选，
+校验排序完全一致，并输出两者的 p50/p99 耗时。需要安装 numpy。
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from _synthetic import (
+    create_tables,
+    percentile,
+    random_request_fields,
+    seed_pool,
+    tag_vocabulary,
+    use_temp_database,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--extra-tags", type=int, default=40, help="在 initial_data 标签之外追加的合成标签数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    use_temp_database()
+
+    from app.core.config import settings
+    from app.db.session import SessionLocal
+    from app.models.match import MatchRequest
+    from app.services import match_vector, matching
+
+    if not match_vector.np:
+        print("未安装 numpy，无法运行向量化引擎基准")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    tags = tag_vocabulary(args.extra_tags)
+    create_tables()
+    db = SessionLocal()
+
+    started = time.perf_counter()
+    seed_pool(db, args.teachers, tags, rng)
+    print(f"生成 {args.teachers} 条师资：{time.perf_counter() - started:.1f}s")
+
+    requests = []
+    for i in range(args.requests):
+        requests.append(
+            MatchRequest(id=f"bench_r{i}", student_id="bench_student", **random_request_fields(rng, tags, i % 2 == 0))
+        )
+
+    def run(use_vector):
+        settings.MATCH_VECTOR_ENGINE = use_vector
+        timings, rankings = [], []
+        for req in requests:
+            t0 = time.perf_counter()
+            ranked = matching.rank_candidates(db, req, args.limit)
+            timings.append((time.perf_counter() - t0) * 1000)
+            rankings.append([(score, e.id) for score, e, _ in ranked])
+        return timings, rankings
+
+    started = time.perf_counter()
+    match_vector.snapshot(db)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    index_ms, index_rank = run(False)
+    vector_ms, vector_rank = run(True)
+    mismatches = sum(1 for a, b in zip(index_rank, vector_rank) if a != b)
+
+    result = {
+        "teachers": args.teachers,
+        "requests": args.requests,
+        "limit": args.limit,
+        "snapshot_build_ms": round(build_ms, 2),
+        "index": {"p50_ms": round(percentile(index_ms, 50), 3), "p99_ms": round(percentile(index_ms, 99), 3),
+                  "mean_ms": round(statistics.mean(index_ms), 3)},
+        "vector": {"p50_ms": round(percentile(vector_ms, 50), 3), "p99_ms": round(percentile(vector_ms, 99), 3),
+                   "mean_ms": round(statistics.mean(vector_ms), 3)},
+        "ranking_mismatches": mismatches,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    db.close()
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ import { Input } from '@/components/ui/input'
 import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
 import { useUser } from '@/lib/user-context'
 import { apiClient } from '@/lib/api-client'
+import { connectRealtime, type RealtimeConnection } from '@/lib/realtime'
 
 function formatTime(value: string) {
   const parsed = new Date(value)
@@ -29,7 +30,10 @@ export default function ChatPage() {
   const [messages, setMessages] = useState<any[]>([])
   const [inputValue, setInputValue] = useState('')
   const [loadingMessages, setLoadingMessages] = useState(false)
+  const [peerTyping, setPeerTyping] = useState(false)
   const scrollRef = useRef<HTMLDivElement>(null)
+  const realtimeRef = useRef<RealtimeConnection | null>(null)
+  const lastTypingSentRef = useRef(0)
 
   useEffect(() => {
     if (isLoading) return
@@ -69,6 +73,41 @@ export default function ChatPage() {
       .finally(() => setLoadingMessages(false))
   }, [conversationId, isLoading, isLoggedIn])
 
+  // 实时通道：新消息、对方输入状态
+  useEffect(() => {
+    if (isLoading || !isLoggedIn || !conversationId) return
+    const token = localStorage.getItem('token') || undefined
+    if (!token) return
+    let typingTimer: number | undefined
+    const conn = connectRealtime(token, (event) => {
+      if (!('conversation_id' in event) || event.conversation_id !== conversationId) return
+      if (event.type === 'message.created') {
+        setMessages((prev) => (prev.some((m) => String(m.id) === String(event.message.id)) ? prev : [...prev, event.message]))
+        setPeerTyping(false)
+        if (String(event.message?.sender?.id ?? '') !== String(user?.id ?? '')) {
+          apiClient.post(`/conversations/${encodeURIComponent(conversationId)}/read`, {}, token).catch(() => null)
+        }
+      } else if (event.type === 'typing') {
+        setPeerTyping(true)
+        window.clearTimeout(typingTimer)
+        typingTimer = window.setTimeout(() => setPeerTyping(false), 4000)
+      }
+    })
+    realtimeRef.current = conn
+    return () => {
+      window.clearTimeout(typingTimer)
+      realtimeRef.current = null
+      conn.close()
+    }
+  }, [conversationId, isLoading, isLoggedIn, user?.id])
+
+  const notifyTyping = () => {
+    const now = Date.now()
+    if (now - lastTypingSentRef.current < 2000) return
+    lastTypingSentRef.current = now
+    realtimeRef.current?.send({ type: 'typing', conversation_id: conversationId })
+  }
+
   const canSend = useMemo(() => inputValue.trim().length > 0, [inputValue])
 
   if (isLoading || !isLoggedIn || !user) {
@@ -83,7 +122,7 @@ export default function ChatPage() {
     setInputValue('')
     try {
       const created = await apiClient.post<any>(`/conversations/${encodeURIComponent(conversationId)}/messages`, { content }, token)
-      setMessages(prev => [...prev, created])
+      setMessages(prev => (prev.some((m) => String(m.id) === String(created.id)) ? prev : [...prev, created]))
     } catch (e) {
       console.error(e)
       alert('发送失败')
@@ -115,7 +154,9 @@ export default function ChatPage() {
                   <span className="font-semibold text-foreground">{peerName}</span>
                   <Badge variant="outline" className="text-xs">私聊</Badge>
                 </div>
-                <div className="text-xs text-muted-foreground">会话 ID：{conversationId}</div>
+                <div className="text-xs text-muted-foreground">
+                  {peerTyping ? '对方正在输入...' : `会话 ID：${conversationId}`}
+                </div>
               </div>
             </div>
           </div>
@@ -197,7 +238,10 @@ export default function ChatPage() {
             <div className="relative flex-1">
               <Input
                 value={inputValue}
-                onChange={(e) => setInputValue(e.target.value)}
+                onChange={(e) => {
+                  setInputValue(e.target.value)
+                  notifyTyping()
+                }}
                 onKeyDown={(e) => e.key === 'Enter' && handleSend()}
                 placeholder="输入消息..."
                 className="pr-10"
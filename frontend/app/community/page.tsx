@@ -68,6 +68,35 @@ const TRENDING_TOPICS = [
   { tag: '志愿者招募', count: 323 },
 ]
 
+// 每页帖子数；下一页以当前最后一条帖子的 cursor 作为 before 参数 (键集分页)
+const PAGE_SIZE = 20
+
+const toPostItem = (p: any) => {
+  const authorName = String(p.author?.full_name || p.author?.username || '用户')
+  const tags = (() => {
+    try {
+      const v = JSON.parse(String(p.tags ?? '[]'))
+      return Array.isArray(v) ? v : []
+    } catch {
+      return []
+    }
+  })()
+  return {
+    id: String(p.id),
+    cursor: p.cursor ? String(p.cursor) : null,
+    author: { name: authorName, avatar: undefined, role: 'user', university: '', school: '' },
+    content: String(p.content || ''),
+    images: [],
+    likes: Number(p.likes_count ?? 0),
+    comments: Number(p.comments_count ?? 0),
+    shares: Number(p.shares_count ?? 0),
+    createdAt: new Date(String(p.created_at || '')).toLocaleString('zh-CN'),
+    tags,
+    liked: false,
+    bookmarked: false,
+  }
+}
+
 export default function CommunityPage() {
   const { user, isLoggedIn } = useUser()
   const [searchQuery, setSearchQuery] = useState('')
@@ -75,6 +104,8 @@ export default function CommunityPage() {
   const [composeText, setComposeText] = useState('')
   const [posts, setPosts] = useState<any[]>([])
   const [postsLoading, setPostsLoading] = useState(false)
+  const [hasMore, setHasMore] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [publishing, setPublishing] = useState(false)
   const [annLoading, setAnnLoading] = useState(false)
   const [announcements, setAnnouncements] = useState<AnnouncementItem[]>([])
@@ -100,36 +131,12 @@ export default function CommunityPage() {
     const doLoad = async () => {
       setPostsLoading(true)
       try {
-        const raw = await apiClient.get<any[]>(`/content/community/posts?skip=0&limit=50`)
+        const raw = await apiClient.get<any[]>(`/content/community/posts?limit=${PAGE_SIZE}`)
         console.log('[Community] loadPosts raw:', raw)
         const list = Array.isArray(raw) ? raw : []
         setLoadError(null)
-        setPosts(
-          list.map((p) => {
-            const authorName = String(p.author?.full_name || p.author?.username || '用户')
-            const tags = (() => {
-              try {
-                const v = JSON.parse(String(p.tags ?? '[]'))
-                return Array.isArray(v) ? v : []
-              } catch {
-                return []
-              }
-            })()
-            return {
-              id: String(p.id),
-              author: { name: authorName, avatar: undefined, role: 'user', university: '', school: '' },
-              content: String(p.content || ''),
-              images: [],
-              likes: Number(p.likes_count ?? 0),
-              comments: Number(p.comments_count ?? 0),
-              shares: Number(p.shares_count ?? 0),
-              createdAt: new Date(String(p.created_at || '')).toLocaleString('zh-CN'),
-              tags,
-              liked: false,
-              bookmarked: false,
-            }
-          }),
-        )
+        setPosts(list.map(toPostItem))
+        setHasMore(list.length === PAGE_SIZE)
       } catch (e) {
         console.error('[Community] loadPosts error:', e)
         setLoadError('网络波动：帖子加载失败')
@@ -145,34 +152,10 @@ export default function CommunityPage() {
   // 发帖后刷新列表
   const reloadPosts = async () => {
     try {
-      const raw = await apiClient.get<any[]>(`/content/community/posts?skip=0&limit=50`)
+      const raw = await apiClient.get<any[]>(`/content/community/posts?limit=${PAGE_SIZE}`)
       const list = Array.isArray(raw) ? raw : []
-      setPosts(
-        list.map((p) => {
-          const authorName = String(p.author?.full_name || p.author?.username || '用户')
-          const tags = (() => {
-            try {
-              const v = JSON.parse(String(p.tags ?? '[]'))
-              return Array.isArray(v) ? v : []
-            } catch {
-              return []
-            }
-          })()
-          return {
-            id: String(p.id),
-            author: { name: authorName, avatar: undefined, role: 'user', university: '', school: '' },
-            content: String(p.content || ''),
-            images: [],
-            likes: Number(p.likes_count ?? 0),
-            comments: Number(p.comments_count ?? 0),
-            shares: Number(p.shares_count ?? 0),
-            createdAt: new Date(String(p.created_at || '')).toLocaleString('zh-CN'),
-            tags,
-            liked: false,
-            bookmarked: false,
-          }
-        }),
-      )
+      setPosts(list.map(toPostItem))
+      setHasMore(list.length === PAGE_SIZE)
       return true
     } catch (e) {
       console.error('[Community] reloadPosts error:', e)
@@ -180,6 +163,29 @@ export default function CommunityPage() {
     }
   }
 
+  // 加载下一页
+  const loadMorePosts = async () => {
+    const cursor = [...posts].reverse().find((p) => p.cursor)?.cursor
+    if (loadingMore || !cursor) return
+    setLoadingMore(true)
+    try {
+      const raw = await apiClient.get<any[]>(
+        `/content/community/posts?limit=${PAGE_SIZE}&before=${encodeURIComponent(cursor)}`,
+      )
+      const list = Array.isArray(raw) ? raw : []
+      setPosts((prev) => {
+        const seen = new Set(prev.map((p) => p.id))
+        return [...prev, ...list.map(toPostItem).filter((p) => !seen.has(p.id))]
+      })
+      setHasMore(list.length === PAGE_SIZE)
+    } catch (e) {
+      console.error('[Community] loadMorePosts error:', e)
+      setLoadError('网络波动：帖子加载失败')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const announcementList = useMemo(() => {
     const items = announcements.filter(a => a.scope === 'public')
     return [...items].sort((a, b) => {
@@ -429,6 +435,13 @@ export default function CommunityPage() {
                 ))
               )}
             </StaggerContainer>
+            {!postsLoading && hasMore && (
+              <div className="mt-6 text-center">
+                <Button variant="outline" onClick={loadMorePosts} disabled={loadingMore}>
+                  {loadingMore ? '加载中...' : '加载更多'}
+                </Button>
+              </div>
+            )}
 
             {/* Load More */}
             <div className="mt-8 text-center">
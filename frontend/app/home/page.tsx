@@ -19,7 +19,9 @@ import { Badge } from '@/components/ui/badge'
 import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
 import { Progress } from '@/components/ui/progress'
 import { useUser, canAccessTeacherFeatures } from '@/lib/user-context'
-import { apiClient } from '@/lib/api-client'
+import { apiClient, type MeSummary } from '@/lib/api-client'
+import { subscribeNotifications } from '@/lib/notification-stream'
+import { connectRealtime } from '@/lib/realtime'
 
 export default function HomePage() {
   const router = useRouter()
@@ -82,10 +84,13 @@ export default function HomePage() {
       }
     }
     run()
-    const timer = setInterval(run, 10000)
+    // 邀约的创建/接受/拒绝/过期都会产生 match_* 通知，收到时刷新收件箱
+    const unsubscribe = subscribeNotifications(token, (event) => {
+      if (event.type === 'notification' && String(event.notification?.type || '').startsWith('match_')) run()
+    })
     return () => {
       alive = false
-      clearInterval(timer)
+      unsubscribe()
     }
   }, [isLoggedIn, isTeacher])
 
@@ -112,26 +117,48 @@ export default function HomePage() {
     }
     const token = localStorage.getItem('token') || undefined
     if (!token) return
+    // 通知未读数由 SSE 推送；实时通道收到消息/已读事件时重新拉取角标汇总
     let cancelled = false
-    const load = async () => {
+    let refreshTimer: number | undefined
+    let notificationsUnread = 0
+    let conversationsUnread = 0
+    const update = () => setUnreadTotal(Math.max(0, notificationsUnread + conversationsUnread))
+    const loadConversations = async () => {
       try {
-        const [n, c] = await Promise.all([
-          apiClient.get<{ unread_count: number }>('/notifications/unread-count', token),
-          apiClient.get<{ unread_conversations_count: number }>('/conversations/unread-count', token),
-        ])
+        const c = await apiClient.get<MeSummary>('/me/summary', token)
         if (cancelled) return
-        const total = Number(n?.unread_count ?? 0) + Number(c?.unread_conversations_count ?? 0)
-        setUnreadTotal(Math.max(0, total))
+        conversationsUnread = Number(c?.unread_conversations ?? 0)
+        notificationsUnread = Number(c?.unread_notifications ?? 0)
+        update()
       } catch (e) {
         if (cancelled) return
         console.error(e)
       }
     }
-    load()
-    const t = window.setInterval(load, 10_000)
+    const refreshConversations = () => {
+      window.clearTimeout(refreshTimer)
+      refreshTimer = window.setTimeout(loadConversations, 300)
+    }
+    loadConversations()
+    const unsubscribe = subscribeNotifications(token, (event) => {
+      if (event.type !== 'unread_count') return
+      notificationsUnread = event.unread_count
+      update()
+    })
+    const conn = connectRealtime(
+      token,
+      (event) => {
+        if (event.type === 'message.created' || event.type === 'conversation.read') refreshConversations()
+      },
+      (connected) => {
+        if (connected) refreshConversations()
+      },
+    )
     return () => {
       cancelled = true
-      window.clearInterval(t)
+      window.clearTimeout(refreshTimer)
+      unsubscribe()
+      conn.close()
     }
   }, [isLoggedIn])
 
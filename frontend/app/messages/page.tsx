@@ -29,6 +29,8 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
 import { useUser } from '@/lib/user-context'
 import { apiClient } from '@/lib/api-client'
+import { subscribeNotifications } from '@/lib/notification-stream'
+import { connectRealtime } from '@/lib/realtime'
 
 function formatTime(value?: string) {
   if (!value) return ''
@@ -37,12 +39,20 @@ function formatTime(value?: string) {
   return parsed.toLocaleString('zh-CN')
 }
 
+// 合并通知：显示最近的触发者，多于一次时附带总次数
+function describeActors(n: Record<string, any> | undefined, fallback: string) {
+  const count = Number(n?.count || 1)
+  const names = Array.isArray(n?.actors) ? n!.actors.map((a: any) => a?.name).filter(Boolean) : []
+  const shown = names.length > 0 ? names.join('、') : fallback
+  return count > 1 ? `${shown} 等 ${count} 次` : shown
+}
+
 const NOTIFICATION_CONFIG: Record<string, {
   title: string
   icon: React.ElementType
   iconColor: string
   getLink?: (payload: Record<string, any>) => string | undefined
-  getContent: (payload: Record<string, any>) => string
+  getContent: (payload: Record<string, any>, notification?: Record<string, any>) => string
 }> = {
   // 社交互动类
   post_commented: {
@@ -50,7 +60,7 @@ const NOTIFICATION_CONFIG: Record<string, {
     icon: MessageSquare,
     iconColor: 'text-blue-500',
     getLink: (p) => p.scope === 'campus' && p.school_id ? `/campus/community?school_id=${p.school_id}&post=${p.post_id}` : `/community/posts/${p.post_id}`,
-    getContent: (p) => `${p.commenter_name} 评论了你的帖子："${p.comment_preview}"`
+    getContent: (p, n) => `${describeActors(n, p.commenter_name)} 评论了你的帖子："${p.comment_preview}"`
   },
   // 问答互动类
   question_answered: {
@@ -58,7 +68,7 @@ const NOTIFICATION_CONFIG: Record<string, {
     icon: HelpCircle,
     iconColor: 'text-purple-500',
     getLink: (p) => `/qa/${p.question_id}`,
-    getContent: (p) => `${p.answerer_name} 回答了你的问题《${p.question_title}》`
+    getContent: (p, n) => `${describeActors(n, p.answerer_name)} 回答了你的问题《${p.question_title}》`
   },
   answer_accepted: {
     title: '回答被采纳',
@@ -196,17 +206,45 @@ export default function MessagesPage() {
     const token = localStorage.getItem('token') || undefined
     if (!token) return
     loadConversations(token)
-    const t = window.setInterval(() => loadConversations(token), 10_000)
-    return () => window.clearInterval(t)
+    // 实时通道推送新消息/已读变化时刷新会话列表；仅在断线期间回退到轮询
+    let refreshTimer: number | undefined
+    let pollTimer: number | undefined
+    const refresh = () => {
+      window.clearTimeout(refreshTimer)
+      refreshTimer = window.setTimeout(() => loadConversations(token), 300)
+    }
+    const conn = connectRealtime(
+      token,
+      (event) => {
+        if (event.type === 'message.created' || event.type === 'conversation.read') refresh()
+      },
+      (connected) => {
+        window.clearInterval(pollTimer)
+        if (connected) refresh()
+        else pollTimer = window.setInterval(() => loadConversations(token), 30_000)
+      },
+    )
+    return () => {
+      window.clearTimeout(refreshTimer)
+      window.clearInterval(pollTimer)
+      conn.close()
+    }
   }, [isLoading, isLoggedIn])
 
   useEffect(() => {
     if (isLoading || !isLoggedIn) return
     const token = localStorage.getItem('token') || undefined
     if (!token) return
-    loadNotificationsUnreadCount(token)
-    const t = window.setInterval(() => loadNotificationsUnreadCount(token), 10_000)
-    return () => window.clearInterval(t)
+    // 未读数与新通知由 SSE 推送 (连接建立时会先推送一次未读数)
+    return subscribeNotifications(token, (event) => {
+      if (event.type === 'unread_count') {
+        setNotificationsUnreadCount(event.unread_count)
+        return
+      }
+      const n = event.notification
+      // 合并通知沿用原 ID 推送更新，替换旧条目并移到最前
+      setNotifications((prev) => [n, ...prev.filter((x) => x?.id !== n?.id)])
+    })
   }, [isLoading, isLoggedIn])
 
   useEffect(() => {
@@ -215,12 +253,6 @@ export default function MessagesPage() {
     const token = localStorage.getItem('token') || undefined
     if (!token) return
     loadNotifications(token)
-    loadNotificationsUnreadCount(token)
-    const t = window.setInterval(() => {
-      loadNotifications(token)
-      loadNotificationsUnreadCount(token)
-    }, 10_000)
-    return () => window.clearInterval(t)
   }, [activeTab, isLoading, isLoggedIn])
 
   const markRead = async (id: string) => {
@@ -409,7 +441,7 @@ export default function MessagesPage() {
                                     </Button>
                                   </div>
                                   <div className="mt-1 text-sm text-muted-foreground">
-                                    {config.getContent(payload)}
+                                    {config.getContent(payload, n)}
                                   </div>
                                   <div className="mt-2 flex items-center justify-between">
                                     <span className="text-xs text-muted-foreground">{formatTime(String(n.created_at || ''))}</span>
@@ -455,7 +487,7 @@ export default function MessagesPage() {
                                 <div className="min-w-0 flex-1">
                                   <div className="font-medium text-foreground">{config.title}</div>
                                   <div className="mt-1 text-sm text-muted-foreground">
-                                    {config.getContent(payload)}
+                                    {config.getContent(payload, n)}
                                   </div>
                                   <div className="mt-2 flex items-center justify-between">
                                     <span className="text-xs text-muted-foreground">{formatTime(String(n.created_at || ''))}</span>
@@ -1,7 +1,7 @@
 'use client'
 
 import Link from 'next/link'
-import { useEffect, useMemo, useState } from 'react'
+import { useEffect, useState } from 'react'
 import { useRouter } from 'next/navigation'
 import { ArrowLeft, Award, Hash, HelpCircle } from 'lucide-react'
 import { Navbar } from '@/components/navigation/navbar'
@@ -13,13 +13,13 @@ import { Badge } from '@/components/ui/badge'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
 import { useUser } from '@/lib/user-context'
 import { apiClient } from '@/lib/api-client'
-import { getTags, getUserPoints, nowIso, setUserPoints, setQaQuestions, getQaQuestions, uid, appendUserPointTxn } from '@/lib/client-store'
+import { getTags, uid } from '@/lib/client-store'
 
 const SUBJECTS = ['数学', '物理', '化学', '生物', '英语', '语文', '历史', '地理', '政治', '编程']
 
 export default function AskQuestionPage() {
   const router = useRouter()
-  const { user, isLoggedIn, updateUser } = useUser()
+  const { user, isLoggedIn, refreshUser } = useUser()
 
   const [subject, setSubject] = useState<string>('数学')
   const [title, setTitle] = useState('')
@@ -48,10 +48,8 @@ export default function AskQuestionPage() {
     })
   }, [])
 
-  const points = useMemo(() => {
-    if (!user) return 0
-    return getUserPoints(user.id, user.points)
-  }, [user])
+  // 积分余额以后端账本为准 (悬赏在发布时由后端冻结)
+  const points = user?.points ?? 0
 
   const toggleTag = (tag: string) => {
     setSelectedTags(prev => {
@@ -70,7 +68,6 @@ export default function AskQuestionPage() {
     if (submitting) return
 
     setSubmitting(true)
-    const createdAt = nowIso()
 
     try {
       const token = localStorage.getItem('token') || undefined
@@ -95,26 +92,19 @@ export default function AskQuestionPage() {
 
       const questionId = created?.id || uid('q')
 
-      // 本地积分扣减（待后端完善后可移除）
       if (reward > 0) {
-        const nextPoints = points - reward
-        setUserPoints(user.id, nextPoints)
-        updateUser({ points: nextPoints })
-
-        appendUserPointTxn(user.id, {
-          id: uid('ptx'),
-          type: 'reward_out',
-          title: `发布悬赏提问：${title.trim()}`,
-          points: -reward,
-          createdAt,
-          meta: { questionId },
-        })
+        await refreshUser()
       }
 
       router.push(`/qa/${questionId}`)
     } catch (e: any) {
       console.error(e)
-      alert('发布失败，请稍后重试')
+      if (e?.status === 400 && e?.message === 'Insufficient points') {
+        alert('积分不足，无法发布该悬赏')
+        await refreshUser()
+      } else {
+        alert('发布失败，请稍后重试')
+      }
     } finally {
       setSubmitting(false)
     }
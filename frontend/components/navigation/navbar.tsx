@@ -23,7 +23,9 @@ import {
 } from '@/components/ui/dropdown-menu'
 import { Badge } from '@/components/ui/badge'
 import { useUser, canAccessTeacherFeatures } from '@/lib/user-context'
-import { apiClient } from '@/lib/api-client'
+import { apiClient, type MeSummary } from '@/lib/api-client'
+import { subscribeNotifications } from '@/lib/notification-stream'
+import { connectRealtime } from '@/lib/realtime'
 
 const iconMap = {
   Home, Users, MessageCircle, Heart, BookOpen, 
@@ -53,27 +55,43 @@ export function Navbar() {
     const token = localStorage.getItem('token') || undefined
     if (!token) return
 
+    // 通知未读数由 SSE 推送；实时通道收到消息/已读事件时重新拉取角标汇总
     let cancelled = false
-    const load = async () => {
+    let refreshTimer: number | undefined
+    const loadConversations = async () => {
       try {
-        const [n, c] = await Promise.all([
-          apiClient.get<{ unread_count: number }>('/notifications/unread-count', token),
-          apiClient.get<{ unread_conversations_count: number }>('/conversations/unread-count', token),
-        ])
+        const c = await apiClient.get<MeSummary>('/me/summary', token)
         if (cancelled) return
-        setUnreadNotifications(Number(n?.unread_count ?? 0))
-        setUnreadConversations(Number(c?.unread_conversations_count ?? 0))
+        setUnreadConversations(Number(c?.unread_conversations ?? 0))
+        setUnreadNotifications(Number(c?.unread_notifications ?? 0))
       } catch (e) {
         if (cancelled) return
         console.error(e)
       }
     }
+    const refreshConversations = () => {
+      window.clearTimeout(refreshTimer)
+      refreshTimer = window.setTimeout(loadConversations, 300)
+    }
 
-    load()
-    const t = window.setInterval(load, 10_000)
+    loadConversations()
+    const unsubscribe = subscribeNotifications(token, (event) => {
+      if (event.type === 'unread_count') setUnreadNotifications(event.unread_count)
+    })
+    const conn = connectRealtime(
+      token,
+      (event) => {
+        if (event.type === 'message.created' || event.type === 'conversation.read') refreshConversations()
+      },
+      (connected) => {
+        if (connected) refreshConversations()
+      },
+    )
     return () => {
       cancelled = true
-      window.clearInterval(t)
+      window.clearTimeout(refreshTimer)
+      unsubscribe()
+      conn.close()
     }
   }, [isLoggedIn])
 
@@ -1,5 +1,5 @@
 import { test, expect } from '@playwright/test'
-import { apiBase, apiLogin, uiLogin } from './utils'
+import { apiBase, apiDeleteUserByUsername, apiGetPointsBalance, apiLogin, apiSignupUser, uiLogin } from './utils'
 
 test.describe('问答完整流程', () => {
   test('发布问题 → 在广场显示 → 点击进入详情 → 提交回答 → 采纳答案', async ({ page, request }) => {
@@ -9,8 +9,14 @@ test.describe('问答完整流程', () => {
     const questionTitle = `E2E完整测试_${suffix}`
     const questionContent = `这是E2E完整流程测试的问题内容_${suffix}`
 
-    // 1. 用户 A (student_pku) 通过 API 发布问题
-    const userAToken = await apiLogin(request, 'student_pku', '123456')
+    // 1. 新注册的用户 A 通过 API 发布问题。后端启用 POINTS_SIGNUP_BONUS 时新用户有初始积分，
+    //    此时发布悬赏并校验冻结与结算；未启用时余额为 0，悬赏为 0
+    const superToken = await apiLogin(request, 'superadmin', '123456')
+    const userA = `e2e_qa_a_${suffix}`
+    await apiSignupUser(request, userA, 'E2E提问者')
+    const userAToken = await apiLogin(request, userA, '123456')
+    const balanceA = await apiGetPointsBalance(request, userAToken)
+    const reward = balanceA >= 10 ? 10 : 0
     const createQRes = await request.post(`${apiBase}/content/qa/questions`, {
       headers: { Authorization: `Bearer ${userAToken}` },
       data: {
@@ -18,16 +24,17 @@ test.describe('问答完整流程', () => {
         title: questionTitle,
         content: questionContent,
         tags: JSON.stringify(['学习方法']),
-        reward_points: 10,
+        reward_points: reward,
       },
     })
     expect(createQRes.ok()).toBeTruthy()
     const question = await createQRes.json()
     const questionId = question.id
     console.log('[E2E] 创建的问题 ID:', questionId)
+    expect(await apiGetPointsBalance(request, userAToken)).toBe(balanceA - reward)
 
     // 2. UI: 用户 A 登录后在广场验证问题显示
-    await uiLogin(page, 'student_pku', '123456')
+    await uiLogin(page, userA, '123456')
     await page.goto('/qa')
     await page.waitForTimeout(2000)
     await expect(page.getByText(questionTitle).first()).toBeVisible({ timeout: 10_000 })
@@ -41,6 +48,7 @@ test.describe('问答完整流程', () => {
 
     // 4. 用户 B (teacher_pku) 通过 API 提交回答
     const userBToken = await apiLogin(request, 'teacher_pku', '123456')
+    const balanceB = await apiGetPointsBalance(request, userBToken)
     const answerContent = `这是用户 B 的回答_${suffix}`
     const createARes = await request.post(`${apiBase}/content/qa/questions/${questionId}/answers`, {
       headers: { Authorization: `Bearer ${userBToken}` },
@@ -64,6 +72,8 @@ test.describe('问答完整流程', () => {
     })
     expect(acceptRes.ok()).toBeTruthy()
     console.log('[E2E] 采纳回答成功')
+    expect(await apiGetPointsBalance(request, userBToken)).toBe(balanceB + reward)
+    console.log('[E2E] 悬赏积分已结算给用户 B')
 
     // 7. 验证通知
     await page.waitForTimeout(1000)
@@ -87,6 +97,7 @@ test.describe('问答完整流程', () => {
     expect(foundB).toBeTruthy()
     console.log('[E2E] 用户 B 收到采纳通知')
 
+    await apiDeleteUserByUsername(request, superToken, userA)
     console.log('[E2E] ✅ 问答完整流程测试通过')
   })
 })
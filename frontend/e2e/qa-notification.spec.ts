@@ -1,13 +1,18 @@
 import { test, expect } from '@playwright/test'
-import { apiBase, apiLogin, uiLogin } from './utils'
+import { apiBase, apiDeleteUserByUsername, apiGetPointsBalance, apiLogin, apiSignupUser, uiLogin } from './utils'
 
 test.describe('问答互动通知', () => {
   test('回答问题后提问者收到通知，采纳后回答者收到通知', async ({ page, request }) => {
     test.setTimeout(180_000)
 
-    // 1. 用户 A (student_pku) 发布问题
-    const userAToken = await apiLogin(request, 'student_pku', '123456')
+    // 1. 新注册的用户 A 发布问题 (后端启用 POINTS_SIGNUP_BONUS 时带悬赏并校验冻结)
+    const superToken = await apiLogin(request, 'superadmin', '123456')
     const suffix = String(Date.now())
+    const userA = `e2e_qa_n_${suffix}`
+    await apiSignupUser(request, userA, 'E2E提问者')
+    const userAToken = await apiLogin(request, userA, '123456')
+    const balanceA = await apiGetPointsBalance(request, userAToken)
+    const reward = balanceA >= 10 ? 10 : 0
     const questionTitle = `E2E测试问题_${suffix}`
 
     // 发布问题
@@ -18,13 +23,14 @@ test.describe('问答互动通知', () => {
         title: questionTitle,
         content: '这是一道测试问题的内容，请帮忙解答。',
         tags: JSON.stringify(['学习方法']),
-        reward_points: 10,
+        reward_points: reward,
       },
     })
     expect(createQRes.ok()).toBeTruthy()
     const question = await createQRes.json()
     const questionId = question.id
     console.log('[E2E] 创建问题成功:', questionId)
+    expect(await apiGetPointsBalance(request, userAToken)).toBe(balanceA - reward)
 
     // 2. 用户 B (teacher_pku) 回答问题
     const userBToken = await apiLogin(request, 'teacher_pku', '123456')
@@ -74,10 +80,12 @@ test.describe('问答互动通知', () => {
     console.log('[E2E] 用户 B 收到 answer_accepted 通知:', foundB?.id)
 
     // 6. UI 验证：用户 A 登录后在消息页面看到通知
-    await uiLogin(page, 'student_pku', '123456')
+    await uiLogin(page, userA, '123456')
     await page.goto('/messages')
     await page.getByRole('tab', { name: /通知/ }).click()
     await expect(page.getByText('问题有新回答').first()).toBeVisible({ timeout: 15_000 })
     console.log('[E2E] UI 验证用户 A 看到通知成功')
+
+    await apiDeleteUserByUsername(request, superToken, userA)
   })
 })
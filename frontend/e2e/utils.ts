@@ -127,6 +127,12 @@ export async function apiCreateAnnouncement(
   return await res.json()
 }
 
+export async function apiGetPointsBalance(request: any, token: string) {
+  const res = await request.get(`${apiBase}/match/points/balance`, { headers: { Authorization: `Bearer ${token}` } })
+  expect(res.ok()).toBeTruthy()
+  return (await res.json()) as number
+}
+
 export async function uiLogin(page: any, username: string, password: string) {
   await page.goto('/login')
   await page.evaluate(() => localStorage.clear())
@@ -5,6 +5,15 @@ interface RequestOptions extends RequestInit {
   token?: string;
 }
 
+// GET /me/summary：导航栏与首页角标汇总
+export interface MeSummary {
+  unread_notifications: number;
+  unread_conversations: number;
+  unread_messages: number;
+  pending_offers: number;
+  version: string;
+}
+
 export class ApiError extends Error {
   status: number;
   data: any;
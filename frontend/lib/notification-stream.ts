@@ -0,0 +1,91 @@
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || '/api/v1'
+
+export type NotificationStreamEvent =
+  | { type: 'notification'; notification: any }
+  | { type: 'unread_count'; unread_count: number }
+
+type Listener = (event: NotificationStreamEvent) => void
+
+// 同一页面内的所有组件共用一个 EventSource
+let source: EventSource | null = null
+let sourceToken = ''
+let lastEventId = ''
+let retry = 0
+let retryTimer: number | undefined
+let latestUnread: number | null = null
+const listeners = new Set<Listener>()
+
+function streamUrl(token: string) {
+  const params = new URLSearchParams({ token })
+  if (lastEventId) params.set('last_event_id', lastEventId)
+  return `${API_BASE_URL}/notifications/stream?${params.toString()}`
+}
+
+function emit(event: NotificationStreamEvent) {
+  listeners.forEach((listener) => {
+    try {
+      listener(event)
+    } catch (err) {
+      console.error(err)
+    }
+  })
+}
+
+function open() {
+  source = new EventSource(streamUrl(sourceToken))
+  source.onopen = () => {
+    retry = 0
+  }
+  source.addEventListener('notification', (e) => {
+    const msg = e as MessageEvent
+    if (msg.lastEventId) lastEventId = msg.lastEventId
+    try {
+      emit({ type: 'notification', notification: JSON.parse(String(msg.data)) })
+    } catch (err) {
+      console.error(err)
+    }
+  })
+  source.addEventListener('unread_count', (e) => {
+    try {
+      latestUnread = Number(JSON.parse(String((e as MessageEvent).data))?.unread_count ?? 0)
+      emit({ type: 'unread_count', unread_count: latestUnread })
+    } catch (err) {
+      console.error(err)
+    }
+  })
+  source.onerror = () => {
+    // 浏览器会自行重连 (携带 Last-Event-ID)；连接被拒绝 (CLOSED) 时按指数退避重建
+    if (source?.readyState !== EventSource.CLOSED) return
+    source = null
+    retry += 1
+    retryTimer = window.setTimeout(() => {
+      if (listeners.size > 0 && !source) open()
+    }, Math.min(60_000, 1000 * 2 ** Math.min(retry, 6)))
+  }
+}
+
+function close() {
+  window.clearTimeout(retryTimer)
+  source?.close()
+  source = null
+  latestUnread = null
+}
+
+/**
+ * 订阅通知推送 (新通知与未读数)，返回取消订阅函数。
+ * 最后一个订阅者取消后关闭连接。
+ */
+export function subscribeNotifications(token: string, listener: Listener): () => void {
+  if (sourceToken !== token) {
+    close()
+    sourceToken = token
+    lastEventId = ''
+  }
+  listeners.add(listener)
+  if (!source) open()
+  else if (latestUnread !== null) listener({ type: 'unread_count', unread_count: latestUnread })
+  return () => {
+    listeners.delete(listener)
+    if (listeners.size === 0) close()
+  }
+}
@@ -0,0 +1,72 @@
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || '/api/v1'
+
+export type RealtimeEvent =
+  | { type: 'message.created'; conversation_id: string; message: any }
+  | { type: 'conversation.read'; conversation_id: string; user_id: string; last_read_at: string }
+  | { type: 'typing'; conversation_id: string; user_id: string }
+  | { type: 'pong' }
+
+export interface RealtimeConnection {
+  send: (data: Record<string, unknown>) => void
+  close: () => void
+}
+
+function websocketUrl(token: string) {
+  const base = API_BASE_URL.startsWith('http')
+    ? API_BASE_URL.replace(/^http/, 'ws')
+    : `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}${API_BASE_URL}`
+  return `${base}/conversations/ws?token=${encodeURIComponent(token)}`
+}
+
+/**
+ * 连接会话实时通道，断线后按指数退避自动重连。
+ * onStatus 用于在断线期间回退到轮询。
+ */
+export function connectRealtime(
+  token: string,
+  onEvent: (event: RealtimeEvent) => void,
+  onStatus?: (connected: boolean) => void,
+): RealtimeConnection {
+  let socket: WebSocket | null = null
+  let closed = false
+  let retry = 0
+  let retryTimer: number | undefined
+  let pingTimer: number | undefined
+
+  const open = () => {
+    if (closed) return
+    socket = new WebSocket(websocketUrl(token))
+    socket.onopen = () => {
+      retry = 0
+      onStatus?.(true)
+      pingTimer = window.setInterval(() => socket?.send(JSON.stringify({ type: 'ping' })), 30_000)
+    }
+    socket.onmessage = (e) => {
+      try {
+        onEvent(JSON.parse(String(e.data)))
+      } catch (err) {
+        console.error(err)
+      }
+    }
+    socket.onclose = () => {
+      window.clearInterval(pingTimer)
+      onStatus?.(false)
+      if (closed) return
+      retry += 1
+      retryTimer = window.setTimeout(open, Math.min(30_000, 1000 * 2 ** Math.min(retry, 5)))
+    }
+  }
+  open()
+
+  return {
+    send: (data) => {
+      if (socket?.readyState === WebSocket.OPEN) socket.send(JSON.stringify(data))
+    },
+    close: () => {
+      closed = true
+      window.clearTimeout(retryTimer)
+      window.clearInterval(pingTimer)
+      socket?.close()
+    },
+  }
+}
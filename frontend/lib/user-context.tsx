@@ -2,6 +2,7 @@
 
 import { createContext, useContext, useState, useCallback, type ReactNode, useEffect } from 'react'
 import { apiClient, ApiError } from './api-client'
+import { subscribeNotifications } from './notification-stream'
 
 import { useRouter, usePathname } from 'next/navigation'
 
@@ -220,19 +221,12 @@ export function UserProvider({ children }: { children: ReactNode }) {
   useEffect(() => {
     const token = localStorage.getItem('token') || undefined
     if (!token) return
-    const timer = setInterval(async () => {
-      try {
-        const raw = await apiClient.get<any[]>(`/notifications?unread_only=true&limit=20`, token)
-        if (!Array.isArray(raw) || raw.length === 0) return
-        const shouldRefresh = raw.some((n: any) =>
-          n && typeof n.type === 'string' && (n.type === 'verification_reviewed' || n.type === 'verification_revoked'),
-        )
-        if (shouldRefresh) await fetchUser(token)
-      } catch {
-        return
-      }
-    }, 10000)
-    return () => clearInterval(timer)
+    // 认证审核结果通过通知推送到达后刷新用户信息
+    return subscribeNotifications(token, (event) => {
+      if (event.type !== 'notification') return
+      const type = event.notification?.type
+      if (type === 'verification_reviewed' || type === 'verification_revoked') fetchUser(token)
+    })
   }, [fetchUser])
 
   const login = useCallback(async (userId: string, password: string): Promise<boolean> => {